@@ -0,0 +1,216 @@
+"""
+Boot sequence.
+
+Importing the application has no side effects on the database. Startup is
+split into:
+
+1. `init_schema`: create missing tables (the explicit init step; also
+   `python -m app.bootstrap`, which the container runs before uvicorn)
+2. `prepare_database`: once-per-deployment writes (demo seed when empty,
+   rollup rebuild, pruning, archive compaction), run under a cross-process
+   file lock so that `uvicorn --workers N` seeds exactly once
+3. `load_process_state`: the per-process in-memory services (registry,
+   dedup filter, model-health tracker, archive manifest)
+
+Each phase's duration is kept in `timings` and exported as
+`startup_phase_seconds`; "ready" is process start to ready to serve (the
+earliest a first request can be answered).
+"""
+
+import argparse
+import contextlib
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: byte-range lock through the C runtime instead of flock
+    fcntl = None
+    import msvcrt
+
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from . import models
+from .config import settings
+from .database import SQLALCHEMY_DATABASE_URL, SessionLocal, engine
+from .services import cache_service, health_service, rollup_service, telemetry_service
+from .services.archive_service import archive
+from .services.dedup_service import recent_keys
+from .services.registry_service import registry
+from .services.watermark_service import watermarks
+
+logger = logging.getLogger(__name__)
+
+timings: Dict[str, float] = {}
+
+
+def _process_started() -> float:
+    """Wall-clock start of this process (from /proc where available, else now)."""
+    try:
+        with open(f"/proc/{os.getpid()}/stat") as stat, open("/proc/uptime") as uptime:
+            start_ticks = int(stat.read().rsplit(")", 1)[1].split()[19])
+            uptime_seconds = float(uptime.read().split()[0])
+        return time.time() - uptime_seconds + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.time()
+
+
+PROCESS_STARTED = _process_started()
+
+
+@contextlib.contextmanager
+def _phase(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round(time.perf_counter() - started, 4)
+
+
+telemetry_service.register(telemetry_service.Gauge(
+    "startup_phase_seconds", "Duration of each boot phase of this process (ready = process start to ready to serve).",
+    lambda: {(phase,): seconds for phase, seconds in timings.items()}, ("phase",),
+))
+
+
+def lock_path() -> str:
+    """Boot lock file: next to a SQLite database, else in the temp dir keyed by the database URL."""
+    if settings.boot_lock_file:
+        return settings.boot_lock_file
+    if SQLALCHEMY_DATABASE_URL.startswith("sqlite:///") and ":memory:" not in SQLALCHEMY_DATABASE_URL:
+        return SQLALCHEMY_DATABASE_URL[len("sqlite:///"):] + ".boot.lock"
+    digest = hashlib.sha1(SQLALCHEMY_DATABASE_URL.encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"productivity-boot-{digest}.lock")
+
+
+def _lock_file(handle) -> None:
+    """Block until this process holds the exclusive lock on the open lock file."""
+    if fcntl is not None:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        return
+    handle.seek(0)  # msvcrt locks bytes from the current position: always the first one
+    while True:
+        try:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue  # LK_LOCK gives up after 10 one-second attempts; keep waiting as flock does
+
+
+def _unlock_file(handle) -> None:
+    if fcntl is not None:
+        fcntl.flock(handle, fcntl.LOCK_UN)
+        return
+    handle.seek(0)
+    msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def boot_lock() -> Iterator[None]:
+    """Exclusive lock shared by every process on this host booting against the same database."""
+    with open(lock_path(), "a+") as handle:
+        _lock_file(handle)
+        try:
+            yield
+        finally:
+            _unlock_file(handle)
+
+
+def init_schema() -> None:
+    """Create missing tables and indexes and drop retired indexes (idempotent)."""
+    with _phase("schema"):
+        models.Base.metadata.create_all(bind=engine)
+        # create_all skips existing tables, so index changes are applied here
+        with engine.begin() as connection:
+            existing = {
+                table: {index["name"] for index in inspect(connection).get_indexes(table)}
+                for table in models.RETIRED_INDEXES
+            }
+            for table, names in models.RETIRED_INDEXES.items():
+                for name in names:
+                    if name in existing[table]:
+                        logger.info(f"Dropping retired index {name}")
+                        connection.execute(text(f"DROP INDEX {name}"))
+            for table in models.Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(connection, checkfirst=True)
+        with SessionLocal() as db:
+            cache_service.ensure_generation_row(db)
+            db.commit()
+
+
+def prepare_database(db: Session, seed: Optional[bool] = None) -> None:
+    """
+    Once-per-deployment writes. Every step checks the database first, so the
+    processes that wait on the lock find the work done and return quickly.
+    """
+    seed = settings.seed_on_startup if seed is None else seed
+    with _phase("prepare"):
+        worker_count = db.query(models.Worker).count()
+        if worker_count == 0 and seed:
+            from .seed_data import seed_database
+
+            logger.info("Database is empty. Seeding with initial data...")
+            result = seed_database(db, clear_existing=False, hours_back=24)
+            logger.info(f"Seed complete: {result['workers_created']} workers, {result['workstations_created']} workstations, {result['events_created']} events")
+        else:
+            logger.info(f"Database already has {worker_count} workers. Skipping seed.")
+        if rollup_service.needs_rebuild(db):
+            logger.info("State rollups missing. Rebuilding from raw events...")
+            rollup_service.rebuild(db)
+        rollup_service.prune(db)
+        archive.compact(db)
+
+
+def load_process_state(db: Session) -> None:
+    """Load this process's in-memory services from the database."""
+    with _phase("load"):
+        archive.load(db)
+        registry.load(db)
+        recent_keys.load(db)
+        health_service.tracker.load(db)
+        watermarks.load(db)
+
+
+def boot() -> None:
+    """Full startup of one API process: init and prepare under the boot lock, then load."""
+    timings["before_startup"] = round(time.time() - PROCESS_STARTED, 4)  # interpreter, imports, server setup
+    db = SessionLocal()
+    try:
+        waiting = time.perf_counter()
+        with boot_lock():
+            timings["lock_wait"] = round(time.perf_counter() - waiting, 4)
+            if settings.init_schema_on_startup:
+                init_schema()
+            prepare_database(db)
+        load_process_state(db)
+    finally:
+        db.close()
+    timings["ready"] = round(time.time() - PROCESS_STARTED, 4)
+    logger.info(f"Ready to serve {timings['ready']:.2f}s after process start ({timings})")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Create the schema and prepare the database before starting the API")
+    parser.add_argument("--no-seed", action="store_true", help="Do not seed demo data into an empty database")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, settings.log_level))
+    with boot_lock():
+        init_schema()
+        db = SessionLocal()
+        try:
+            prepare_database(db, seed=not args.no_seed)
+        finally:
+            db.close()
+    logger.info(f"Database prepared ({timings})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Celery backend for the pre-aggregation scheduler (SCHEDULER_BACKEND=celery).
+
+For multi-node deployments: beat schedules every job each
+PRECOMPUTE_INTERVAL_SECONDS on the CELERY_BROKER_URL broker and any worker
+runs it against the shared database. The job lease in `scheduled_jobs` still
+applies, so a duplicate delivery or a local loop left on is skipped rather
+than run twice.
+
+    celery -A app.celery_app worker --beat --loglevel=info
+"""
+
+from .config import settings
+from .services import scheduler_service
+
+try:
+    from celery import Celery  # type: ignore
+except ImportError:
+    # Fallback if celery not installed: only the local and standalone scheduler backends are available
+    Celery = None
+
+celery_app = None
+
+if Celery is not None:
+    celery_app = Celery(
+        "productivity",
+        broker=settings.celery_broker_url,
+        backend=settings.celery_result_backend,
+    )
+    celery_app.conf.beat_schedule = {
+        f"precompute-{name}": {
+            "task": "precompute.run_job",
+            "schedule": float(settings.precompute_interval_seconds),
+            "args": (name,),
+        }
+        for name in scheduler_service.JOBS
+    }
+
+    @celery_app.task(name="precompute.run_job", ignore_result=True)
+    def run_precompute_job(name: str):
+        return scheduler_service.run_job(name)
@@ -11,6 +11,7 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = "sqlite:///./productivity.db"
+    database_async: bool = False  # Ingest through SQLAlchemy asyncio (aiosqlite / asyncpg)
     
     # API
     api_title: str = "AI Worker Productivity Dashboard API"
@@ -35,8 +36,64 @@ class Settings(BaseSettings):
     
     # Metrics
     min_confidence: float = 0.7
+    metrics_use_rollups: bool = True  # False = recompute every window from raw events
+    rollup_minute_retention_hours: int = 192  # Minute buckets kept/used this far back (8 days: 7-day sub-hour heatmaps)
+    rollup_hour_retention_days: int = 90  # Hour buckets kept/used this far back; day buckets are permanent
+    event_retention_days: int = 0  # Raw events older than this move to the cold archive; 0 = keep all in ai_events
+    event_partition: str = "day"  # Archive partition size: "day" or "week"
+    event_archive_dir: str = "./archive"  # Compressed columnar partition files
+    metrics_cache_size: int = 256  # Cached metrics results (LRU); 0 disables the cache
+    metrics_cache_ttl_seconds: int = 5  # Recompute interval for windows that end "now"
+    cache_generation_refresh_ms: int = 250  # How often a process re-reads the shared ingest generation (others' ingests)
+
+    # Model health (/api/metrics/model-health)
+    health_window: int = 100  # Newest confidences kept per camera, worker and overall
+    health_ewma_alpha: float = 0.1  # EWMA weight of each new confidence
+    health_min_samples: int = 30  # Window size before an entity is judged for drift
+    health_drift_z: float = 4.0  # Flag an entity whose EWMA is this many standard errors below its peers
+    health_reload_seconds: int = 30  # Reload from the database at most this often when data changed (other workers' ingests)
+
+    # Ingestion queue (single writer, group commit)
+    ingest_queue_enabled: bool = True  # False = each request writes its own transaction
+    ingest_ack: str = "commit"  # "commit" = respond after the batch commits, "enqueue" = respond once queued
+    ingest_batch_max: int = 1000  # Commit when a batch reaches this many events...
+    ingest_flush_ms: int = 20  # ...or this long after its first event
+    ingest_queue_max: int = 10000  # Queued events before producers wait
+    ingest_stream_chunk: int = 1000  # Records per chunk for /api/events/stream
+
+    # Recent dedup-key filter (skips the duplicate lookup for new events)
+    dedup_filter_enabled: bool = True
+    dedup_recent_minutes: int = 10  # Exact key set covers this far behind the newest event
+    dedup_bloom_capacity: int = 1_000_000  # Keys per Bloom generation
+    dedup_bloom_error_rate: float = 0.01  # Bloom false-positive rate at capacity
+    dedup_bloom_generations: int = 2  # Generations kept before the oldest is dropped
+    dedup_preload_keys: int = 100_000  # Newest stored keys loaded at startup
+
+    # Late data (see services/watermark_service.py)
+    allowed_lateness_seconds: int = 300  # Events further behind the ingest watermark are late; the buckets they rewrite are stale
+
+    # Live stream (/api/stream)
+    stream_tick_seconds: float = 1.0  # How often the broadcaster checks for changes
+    stream_keepalive_seconds: int = 15  # Idle interval before a keep-alive comment
+    stream_retry_ms: int = 3000  # Client reconnect delay sent to EventSource
+    stream_overlap_seconds: float = 10.0  # Re-read ids this recent: a smaller id may commit after a larger one
+
+    # Prometheus exposition (/metrics)
+    metrics_enabled: bool = True  # False = no request/SQL instrumentation and /metrics answers 404
     
-    # Celery / Redis (for async event processing)
+    # Boot sequence (see app.bootstrap)
+    init_schema_on_startup: bool = True  # False = tables are created by `python -m app.bootstrap` only
+    seed_on_startup: bool = True  # Seed demo data into an empty database
+    boot_lock_file: str = ""  # Cross-process boot lock; "" = next to the SQLite file, else in the temp dir
+
+    # Pre-aggregation scheduler (see services/scheduler_service.py)
+    scheduler_backend: str = "local"  # "local" = in-process loop leased through the database, "celery" = beat + workers, "off"
+    scheduler_tick_seconds: float = 5.0  # How often the local loop looks for due jobs
+    scheduler_lease_seconds: int = 300  # A claimed job becomes claimable again after this long (crashed runner)
+    precompute_interval_seconds: int = 60  # Refresh interval of each precomputed aggregate
+    precompute_max_age_seconds: int = 180  # Older results are ignored and the aggregate is computed in the request
+
+    # Celery / Redis (optional scheduler backend, SCHEDULER_BACKEND=celery)
     celery_broker_url: str = "redis://localhost:6379/0"
     celery_result_backend: str = "redis://localhost:6379/0"
     
@@ -9,8 +9,10 @@ Provides functions for:
 
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy import and_, func, insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import Iterable, List, Optional, Dict, Any, Set, Tuple
 import logging
 
 from . import models, schemas
@@ -22,6 +24,19 @@ logger = logging.getLogger(__name__)
 # Worker Operations
 # ========================================
 
+EventKey = Tuple[datetime, str, str]
+
+
+def event_key(timestamp: datetime, worker_id: str, event_type: str) -> EventKey:
+    """
+    Build the deduplication key (timestamp, worker_id, event_type).
+
+    Timestamps are stored naive, so any tzinfo is dropped to match what the
+    database hands back on read.
+    """
+    return (timestamp.replace(tzinfo=None), worker_id, event_type)
+
+
 def get_worker(db: Session, worker_id: str) -> Optional[models.Worker]:
     """Get worker by ID."""
     return db.query(models.Worker).filter(models.Worker.id == worker_id).first()
@@ -32,12 +47,23 @@ def get_workers(db: Session) -> List[models.Worker]:
     return db.query(models.Worker).order_by(models.Worker.id).all()
 
 
+def get_existing_worker_ids(db: Session, worker_ids: Iterable[str]) -> Set[str]:
+    """Return the subset of worker_ids present in the database (one query)."""
+    ids = set(worker_ids)
+    if not ids:
+        return set()
+    return set(db.scalars(select(models.Worker.id).where(models.Worker.id.in_(ids))))
+
+
 def create_worker(db: Session, worker: schemas.WorkerCreate) -> models.Worker:
-    """Create a new worker."""
+    """Create a new worker and add it to the in-memory registry."""
+    from .services.registry_service import registry
+
     db_worker = models.Worker(**worker.dict())
     db.add(db_worker)
     db.commit()
     db.refresh(db_worker)
+    registry.add_worker(db_worker)
     return db_worker
 
 
@@ -55,12 +81,23 @@ def get_workstations(db: Session) -> List[models.Workstation]:
     return db.query(models.Workstation).order_by(models.Workstation.id).all()
 
 
+def get_existing_workstation_ids(db: Session, workstation_ids: Iterable[str]) -> Set[str]:
+    """Return the subset of workstation_ids present in the database (one query)."""
+    ids = set(workstation_ids)
+    if not ids:
+        return set()
+    return set(db.scalars(select(models.Workstation.id).where(models.Workstation.id.in_(ids))))
+
+
 def create_workstation(db: Session, workstation: schemas.WorkstationCreate) -> models.Workstation:
-    """Create a new workstation."""
+    """Create a new workstation and add it to the in-memory registry."""
+    from .services.registry_service import registry
+
     db_workstation = models.Workstation(**workstation.dict())
     db.add(db_workstation)
     db.commit()
     db.refresh(db_workstation)
+    registry.add_workstation(db_workstation)
     return db_workstation
 
 
@@ -68,9 +105,21 @@ def create_workstation(db: Session, workstation: schemas.WorkstationCreate) -> m
 # AI Event Operations
 # ========================================
 
-def create_ai_event(db: Session, event: schemas.AIEventCreate) -> Optional[models.AIEvent]:
+# SQLite names the columns instead of the index in its error message
+DEDUP_VIOLATION_MARKERS = ("uix_event_dedup_worker_type", "ai_events.timestamp, ai_events.worker_id, ai_events.event_type")
+
+
+def _is_dedup_violation(exc: IntegrityError) -> bool:
+    message = str(exc)
+    return any(marker in message for marker in DEDUP_VIOLATION_MARKERS)
+
+
+def create_ai_event(db: Session, event: schemas.AIEventCreate, commit: bool = True) -> Optional[models.AIEvent]:
     """
     Create a new AI event with deduplication.
+
+    With commit=False the row is only flushed, so callers can update derived
+    tables in the same transaction before committing.
     
     Returns:
         - AIEvent if created successfully
@@ -83,12 +132,15 @@ def create_ai_event(db: Session, event: schemas.AIEventCreate) -> Optional[model
     try:
         db_event = models.AIEvent(**event.dict())
         db.add(db_event)
+        if not commit:
+            db.flush()
+            return db_event
         db.commit()
         db.refresh(db_event)
         return db_event
     except IntegrityError as e:
         db.rollback()
-        if "uix_event_dedup_worker_type" in str(e):
+        if _is_dedup_violation(e):
             logger.debug(f"Duplicate event ignored: {event.dict()}")
             return None
         logger.error(f"Event creation error: {e}")
@@ -108,29 +160,213 @@ def get_event_by_identity(db: Session, timestamp: datetime, worker_id: str, even
     )
 
 
+def get_existing_event_keys(db: Session, events: List[schemas.AIEventCreate]) -> Set[EventKey]:
+    """
+    Return the dedup keys from `events` that are already stored.
+
+    Issues a single range query bounded by the batch's min/max timestamp and
+    restricted to its workers, answered from `idx_worker_timeline` alone.
+    """
+    if not events:
+        return set()
+    keys = {event_key(e.timestamp, e.worker_id, e.event_type) for e in events}
+    timestamps = [k[0] for k in keys]
+    rows = db.execute(
+        select(models.AIEvent.timestamp, models.AIEvent.worker_id, models.AIEvent.event_type)
+        .where(
+            models.AIEvent.worker_id.in_({k[1] for k in keys}),
+            models.AIEvent.timestamp >= min(timestamps),
+            models.AIEvent.timestamp <= max(timestamps),
+        )
+    )
+    return {key for key in (event_key(*row) for row in rows) if key in keys}
+
+
+def get_recent_event_keys(db: Session, limit: int, chunk_size: int = 5000) -> Iterable[EventKey]:
+    """Dedup keys of the `limit` newest stored events, newest first (streamed)."""
+    stmt = (
+        select(models.AIEvent.timestamp, models.AIEvent.worker_id, models.AIEvent.event_type)
+        .order_by(models.AIEvent.timestamp.desc())
+        .limit(limit)
+    )
+    return (event_key(*row) for row in db.execute(stmt.execution_options(yield_per=chunk_size)))
+
+
+def bulk_create_ai_events(db: Session, events: List[schemas.AIEventCreate]) -> Set[EventKey]:
+    """
+    Insert many AI events in one statement without committing.
+
+    On SQLite and PostgreSQL the insert uses ON CONFLICT DO NOTHING against
+    `uix_event_dedup_worker_type`, so rows raced in by a concurrent writer are
+    skipped instead of aborting the batch.
+
+    Returns:
+        Dedup keys of the rows actually inserted. Events whose key is missing
+        from the result were duplicates.
+
+    Raises:
+        IntegrityError on other dialects if a duplicate slips through; the
+        caller is expected to roll back.
+    """
+    if not events:
+        return set()
+    rows = [event.dict() for event in events]
+    dialect = db.get_bind().dialect.name
+    columns = (models.AIEvent.timestamp, models.AIEvent.worker_id, models.AIEvent.event_type)
+
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = (
+            dialect_insert(models.AIEvent)
+            .on_conflict_do_nothing(index_elements=["timestamp", "worker_id", "event_type"])
+            .returning(*columns)
+        )
+        return {event_key(*row) for row in db.execute(stmt, rows)}
+
+    db.execute(insert(models.AIEvent), rows)
+    return {event_key(e.timestamp, e.worker_id, e.event_type) for e in events}
+
+
+EVENT_ROW_COLUMNS = (
+    models.AIEvent.id,
+    models.AIEvent.timestamp,
+    models.AIEvent.worker_id,
+    models.AIEvent.workstation_id,
+    models.AIEvent.event_type,
+    models.AIEvent.confidence,
+    models.AIEvent.count,
+    models.AIEvent.created_at,
+)
+
+
+def _event_filters(
+    worker_id: Optional[str] = None,
+    workstation_id: Optional[str] = None,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    before: Optional[Tuple[datetime, int]] = None,
+) -> List:
+    conditions = []
+    if worker_id:
+        conditions.append(models.AIEvent.worker_id == worker_id)
+    if workstation_id:
+        conditions.append(models.AIEvent.workstation_id == workstation_id)
+    if start_time:
+        conditions.append(models.AIEvent.timestamp >= start_time)
+    if end_time:
+        conditions.append(models.AIEvent.timestamp <= end_time)
+    if before:
+        ts, event_id = before
+        conditions.append(models.AIEvent.timestamp <= ts)  # seekable bound; the OR alone forces an index scan from the newest row
+        conditions.append(or_(
+            models.AIEvent.timestamp < ts,
+            and_(models.AIEvent.timestamp == ts, models.AIEvent.id < event_id),
+        ))
+    return conditions
+
+
 def get_events(
     db: Session,
     worker_id: Optional[str] = None,
     workstation_id: Optional[str] = None,
     start_time: Optional[datetime] = None,
     end_time: Optional[datetime] = None,
-    limit: int = 1000
+    limit: int = 1000,
+    before: Optional[Tuple[datetime, int]] = None,
 ) -> List[models.AIEvent]:
     """
     Get AI events with optional filters.
     
     Supports filtering by worker, workstation, and time range.
-    Results are ordered by timestamp (newest first).
+    Results are ordered by timestamp (newest first), then id.
+    `before` = (timestamp, id) of the last row of the previous page (keyset pagination).
     """
-    query = db.query(models.AIEvent)
-    
-    if worker_id:
-        query = query.filter(models.AIEvent.worker_id == worker_id)
-    if workstation_id:
-        query = query.filter(models.AIEvent.workstation_id == workstation_id)
-    if start_time:
-        query = query.filter(models.AIEvent.timestamp >= start_time)
-    if end_time:
-        query = query.filter(models.AIEvent.timestamp <= end_time)
-    
-    return query.order_by(models.AIEvent.timestamp.desc()).limit(limit).all()
+    return (
+        db.query(models.AIEvent)
+        .filter(*_event_filters(worker_id, workstation_id, start_time, end_time, before))
+        .order_by(models.AIEvent.timestamp.desc(), models.AIEvent.id.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+def get_event_rows(
+    db: Session,
+    worker_id: Optional[str] = None,
+    workstation_id: Optional[str] = None,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    limit: int = 1000,
+    before: Optional[Tuple[datetime, int]] = None,
+) -> List:
+    """
+    `get_events` as plain row tuples (EVENT_ROW_COLUMNS order): no ORM objects,
+    identity map or attribute instrumentation, for pages that are only serialized.
+    """
+    stmt = (
+        select(*EVENT_ROW_COLUMNS)
+        .where(*_event_filters(worker_id, workstation_id, start_time, end_time, before))
+        .order_by(models.AIEvent.timestamp.desc(), models.AIEvent.id.desc())
+        .limit(limit)
+    )
+    return list(db.execute(stmt))
+
+
+def stream_event_rows(
+    db: Session,
+    worker_id: Optional[str] = None,
+    workstation_id: Optional[str] = None,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    chunk_size: int = 5000,
+) -> Iterable:
+    """
+    Stream event rows (no ORM objects) in chronological order from a server-side
+    cursor, `chunk_size` rows per fetch; memory stays constant for any range.
+    """
+    stmt = (
+        select(*EVENT_ROW_COLUMNS)
+        .where(*_event_filters(worker_id, workstation_id, start_time, end_time))
+        .order_by(models.AIEvent.timestamp, models.AIEvent.id)
+    )
+    return db.execute(stmt.execution_options(yield_per=chunk_size))
+
+
+def get_events_after(db: Session, after_id: int, limit: int = 500) -> List[models.AIEvent]:
+    """Events with an id above `after_id`, in id order (not necessarily commit order, see stream_service)."""
+    return (
+        db.query(models.AIEvent)
+        .filter(models.AIEvent.id > after_id)
+        .order_by(models.AIEvent.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def get_max_event_id(db: Session) -> int:
+    """Id of the most recently stored event (0 when empty)."""
+    return db.query(func.max(models.AIEvent.id)).scalar() or 0
+
+
+def get_recent_confidences(db: Session, column: Optional[str] = None, limit: int = 100) -> List[Tuple[str, float]]:
+    """
+    (entity, confidence) of the `limit` newest events per worker_id or
+    workstation_id (`column`), or overall when `column` is None; oldest first.
+    """
+    order = (models.AIEvent.timestamp.desc(), models.AIEvent.id.desc())
+    if column is None:
+        stmt = select(models.AIEvent.timestamp, models.AIEvent.id, models.AIEvent.confidence).order_by(*order).limit(limit)
+        rows = db.execute(stmt).all()
+        return [("", confidence) for _, _, confidence in reversed(rows)]
+
+    entity = getattr(models.AIEvent, column)
+    rank = func.row_number().over(partition_by=entity, order_by=order).label("rank")
+    ranked = select(
+        entity.label("entity"), models.AIEvent.timestamp, models.AIEvent.id, models.AIEvent.confidence, rank
+    ).subquery()
+    stmt = (
+        select(ranked.c.entity, ranked.c.confidence)
+        .where(ranked.c.rank <= limit)
+        .order_by(ranked.c.timestamp, ranked.c.id)
+    )
+    return [(entity_id, confidence) for entity_id, confidence in db.execute(stmt)]
@@ -1,8 +1,17 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Iterator
+import contextlib
+import logging
 import os
 
+from .config import settings
+from .services import telemetry_service
+
+logger = logging.getLogger(__name__)
+
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./productivity.db")
 
 engine = create_engine(
@@ -10,10 +19,73 @@ engine = create_engine(
     connect_args={"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {}
 )
 
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite") and ":memory:" not in SQLALCHEMY_DATABASE_URL:
+    @event.listens_for(engine, "connect")
+    def _sqlite_wal(dbapi_connection, connection_record):
+        """
+        Write-ahead log: readers (such as `read_snapshot`) keep their snapshot
+        while an ingest commits, instead of blocking it on a SHARED lock. The
+        mode is stored in the database file, so every other connection to it
+        (bulk generator processes, the async engine) uses it as well.
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+if settings.metrics_enabled:
+    telemetry_service.instrument_engine(engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Async driver for each sync URL scheme (DATABASE_ASYNC=true)
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.database_async:
+    try:
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+        scheme, rest = SQLALCHEMY_DATABASE_URL.split("://", 1)
+        async_engine = create_async_engine(f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}")
+        AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+        if settings.metrics_enabled:
+            telemetry_service.instrument_engine(async_engine.sync_engine, name="async")
+    except ImportError as exc:
+        # Fallback if the async driver (aiosqlite / asyncpg) is not installed
+        logger.warning(f"Async database mode unavailable ({exc}); using the sync engine in a threadpool")
+
+
+@contextlib.contextmanager
+def read_snapshot(db: Session) -> Iterator[Session]:
+    """
+    A read-only session whose queries all see one consistent snapshot.
+
+    Reads that combine several statements (rollup sums, latest events, raw
+    edges) must not see an event commit in between. Each statement of `db`
+    otherwise sees the latest commit: pysqlite issues no BEGIN before a SELECT,
+    and PostgreSQL defaults to READ COMMITTED. The snapshot is a separate
+    connection in an explicit read transaction (SQLite, in WAL mode so that
+    writers do not wait for it) or REPEATABLE READ (PostgreSQL), rolled back at
+    the end; other databases use `db` as is.
+    """
+    bind = db.get_bind()
+    dialect = bind.dialect.name
+    if not isinstance(bind, Engine) or dialect not in ("sqlite", "postgresql"):
+        yield db
+        return
+    with bind.connect() as connection:
+        if dialect == "postgresql":
+            connection = connection.execution_options(isolation_level="REPEATABLE READ")
+        else:
+            connection.exec_driver_sql("BEGIN")  # shared lock held until the rollback
+        with Session(bind=connection, autoflush=False) as snapshot:
+            yield snapshot
+        connection.rollback()
+
 
 def get_db():
     db = SessionLocal()
@@ -21,3 +93,20 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_ingest_db():
+    """
+    Session for the async ingestion endpoints: an AsyncSession when async mode
+    is enabled, otherwise a regular Session that the service runs off the event loop.
+    """
+    if AsyncSessionLocal is None:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+        return
+
+    async with AsyncSessionLocal() as db:
+        yield db
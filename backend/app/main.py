@@ -13,23 +13,27 @@ Features:
 - Response compression for faster data transfer
 """
 
-from fastapi import FastAPI, HTTPException, Depends, Query, Request
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from typing import List, Optional
+from typing import Any, Callable, List, Optional
 from datetime import datetime
 import uvicorn
 import logging
 
-from . import models, schemas, crud
-from .database import engine, get_db
+from . import bootstrap, responses, schemas
+from .database import async_engine, get_db, get_ingest_db
 from .seed_data import seed_database
-from .services import events_service, metrics_service, seed_service
+from .services import bulk_ingest_service, cache_service, events_service, generator_service, metrics_service, queue_service, scheduler_service, seed_service, stream_service, telemetry_service
+from .services.archive_service import archive
+from .services.dedup_service import recent_keys
+from .services.registry_service import registry
+from .services.watermark_service import watermarks
 from .config import settings
-from .middleware import limiter
+from .middleware import RequestMetricsMiddleware, limiter
 
 try:
     from slowapi.errors import RateLimitExceeded  # type: ignore
@@ -45,9 +49,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
-
 app = FastAPI(
     title=settings.api_title,
     description="Production-grade API for tracking worker productivity via AI-powered CCTV events",
@@ -59,22 +60,21 @@ app = FastAPI(
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database with seed data on startup if empty."""
-    from .database import SessionLocal
-    db = SessionLocal()
+    """Create the schema and seed once across worker processes, then load in-memory state (see app.bootstrap)."""
     try:
-        # Check if database is empty
-        worker_count = db.query(models.Worker).count()
-        if worker_count == 0:
-            logger.info("Database is empty. Seeding with initial data...")
-            result = seed_database(db, clear_existing=False, hours_back=24)
-            logger.info(f"Seed complete: {result['workers_created']} workers, {result['workstations_created']} workstations, {result['events_created']} events")
-        else:
-            logger.info(f"Database already has {worker_count} workers. Skipping seed.")
+        bootstrap.boot()
     except Exception as e:
-        logger.error(f"Startup seeding failed: {e}")
-    finally:
-        db.close()
+        logger.error(f"Startup failed: {e}")
+    if settings.scheduler_backend == "local":
+        scheduler_service.scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the scheduler, flush the ingest queue and release pooled async connections."""
+    await scheduler_service.scheduler.stop()
+    await queue_service.ingest_queue.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 # Rate limiting
 app.state.limiter = limiter
@@ -96,10 +96,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
-    expose_headers=["X-Total-Count", "Cache-Control"],
+    expose_headers=["X-Total-Count", "Cache-Control", "ETag", "X-Next-Cursor"],
     max_age=600,
 )
 
+# Outermost, so latency covers compression and CORS handling too
+if settings.metrics_enabled:
+    app.add_middleware(RequestMetricsMiddleware)
+
 
 # ========================================
 # Health & Info Endpoints
@@ -136,21 +140,133 @@ async def health_check(request: Request, db: Session = Depends(get_db)):
         "status": "healthy" if db_status == "healthy" else "degraded",
         "timestamp": datetime.utcnow(),
         "database": db_status,
-        "environment": settings.environment
+        "environment": settings.environment,
+        "ingest": {
+            "queue_depth": queue_service.ingest_queue.depth(),
+            "dedup_filter": recent_keys.stats(),
+            "lateness": watermarks.stats(),
+        },
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text exposition: request latency, SQL usage, pool, ingest and metrics timings."""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Metrics exposition is disabled")
+    return PlainTextResponse(telemetry_service.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# Figures the services already keep, read at scrape time
+telemetry_service.register(telemetry_service.Gauge(
+    "ingest_queue_depth", "Events waiting in the write-behind ingest queue.",
+    lambda: {(): queue_service.ingest_queue.depth()},
+))
+telemetry_service.register(telemetry_service.Gauge(
+    "metrics_cache", "Metrics result cache (entries, hits, misses, generation).",
+    lambda: {(stat,): value for stat, value in cache_service.metrics_cache.stats().items()}, ("stat",),
+))
+telemetry_service.register(telemetry_service.Gauge(
+    "dedup_filter", "Recent dedup-key filter (sizes, hits, misses, false positives).",
+    lambda: {(stat,): value for stat, value in recent_keys.stats().items()}, ("stat",),
+))
+
+
+# ========================================
+# Cached Reads
+# ========================================
+
+def _cached(
+    request: Request,
+    response: Response,
+    compute: Callable[[], Any],
+    end_time: Optional[datetime] = None,
+    time_dependent: bool = True,
+):
+    """
+    Serve a read through the metrics cache with ETag revalidation.
+
+    A matching If-None-Match returns 304 before any database work; otherwise the
+    result is taken from (or stored in) the cache under the current ETag.
+    """
+    if settings.metrics_cache_size <= 0:
+        return compute()
+
+    etag = cache_service.etag_for(end_time, time_dependent)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if cache_service.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+    return cache_service.metrics_cache.get_or_compute(key, etag, compute)
+
+
+def _precomputed(
+    request: Request,
+    response: Response,
+    db: Session,
+    window: str,
+    key: Optional[str],
+    compute: Callable[[Optional[datetime]], Any],
+    select: Optional[Callable[[Any], Any]] = None,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+):
+    """
+    Serve a standard-window read (`window=24h`, ...) from the background-precomputed
+    results (see scheduler_service). Without a fresh result, `compute(window_start)`
+    runs in the request through the metrics cache. `select` maps the decoded
+    payload to this endpoint's response; without it the stored JSON is sent as is.
+    """
+    if start_time is not None or end_time is not None:
+        raise HTTPException(status_code=400, detail="window cannot be combined with start_time / end_time")
+    stored = scheduler_service.read(db, key)
+    if stored is None:
+        return _cached(request, response, lambda: compute(scheduler_service.window_start(window)))
+
+    etag = f'"{key}@{stored.computed_at.isoformat()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Computed-At": stored.computed_at.isoformat() + "Z"}
+    if cache_service.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if select is None:
+        return Response(content=stored.raw, media_type="application/json", headers=headers)
+    response.headers.update(headers)
+    return responses.json_bytes(responses.dumps(select(stored.payload())), response)
+
+
 # ========================================
 # AI Event Ingestion Endpoints
 # ========================================
 
+async def _ingest_queued_event(db, event: schemas.AIEventCreate):
+    """
+    Ingest one event through the write-behind queue.
+
+    With INGEST_ACK=enqueue, answers 202 as soon as the event is queued;
+    otherwise waits for its group commit and returns the stored row
+    (the existing one for a duplicate).
+    """
+    if settings.ingest_ack == "enqueue":
+        await queue_service.ingest_queue.enqueue([event])
+        return JSONResponse(status_code=202, content={"message": "Event queued", "queued": 1})
+
+    result = (await queue_service.ingest_queue.submit([event]))[0]
+    if result["status"] == "error":
+        raise HTTPException(status_code=result.get("code", 500), detail=result["detail"])
+    if result["status"] == "duplicate":
+        logger.debug(f"Duplicate event detected: {event.worker_id}@{event.workstation_id}")
+    return await events_service.lookup_event_async(db, event)
+
+
 @app.post("/api/events", response_model=schemas.AIEventResponse, status_code=201)
 @limiter.limit("100/minute")
-async def ingest_event(request: Request, event: schemas.AIEventCreate, db: Session = Depends(get_db)):
+async def ingest_event(request: Request, event: schemas.AIEventCreate, db=Depends(get_ingest_db)):
     """Ingest a single AI-generated event from CCTV system."""
     try:
         logger.info(f"Ingesting event: {event.worker_id}@{event.workstation_id} - {event.event_type}")
-        result = events_service.ingest_event(db, event)
+        if settings.ingest_queue_enabled:
+            return await _ingest_queued_event(db, event)
+        result = await events_service.ingest_event_async(db, event)
         if result["duplicate"]:
             logger.debug(f"Duplicate event detected: {event.worker_id}@{event.workstation_id}")
             return {"message": "Duplicate event ignored", "event": event.dict()}
@@ -164,25 +280,95 @@ async def ingest_event(request: Request, event: schemas.AIEventCreate, db: Sessi
 
 @app.post("/api/events/batch", response_model=schemas.AIEventBatchResponse)
 @limiter.limit("20/minute")
-async def ingest_events_batch(request: Request, batch: schemas.AIEventBatchCreate, db: Session = Depends(get_db)):
+async def ingest_events_batch(request: Request, batch: schemas.AIEventBatchCreate, db=Depends(get_ingest_db)):
     """Batch ingest multiple AI events."""
     logger.info(f"Batch ingesting {len(batch.events)} events")
-    result = events_service.ingest_batch(db, batch.events)
+    if settings.ingest_queue_enabled:
+        if settings.ingest_ack == "enqueue":
+            await queue_service.ingest_queue.enqueue(batch.events)
+            return JSONResponse(status_code=202, content={"message": "Events queued", "queued": len(batch.events)})
+        results = await queue_service.ingest_queue.submit(batch.events)
+        result = events_service.summarize_results(batch.events, results)
+    else:
+        result = await events_service.ingest_batch_async(db, batch.events)
     logger.info(f"Batch complete: {result.success_count} success, {result.duplicate_count} duplicates, {result.error_count} errors")
     return result
 
 
+@app.post("/api/events/stream", response_model=schemas.AIEventStreamResponse)
+@limiter.limit("20/minute")
+async def ingest_events_stream(request: Request, db=Depends(get_ingest_db)):
+    """
+    Stream-ingest NDJSON (application/x-ndjson) or MessagePack (application/msgpack).
+
+    Records are validated as they arrive and stored in chunks of
+    INGEST_STREAM_CHUNK, so large backfills never sit in memory as one batch.
+    Always waits for the commits and reports totals plus per-chunk counts and errors.
+    """
+    fmt = bulk_ingest_service.stream_format(request.headers.get("content-type"))
+
+    async def ingest_chunk(events: List[schemas.AIEventCreate]):
+        if settings.ingest_queue_enabled:
+            return await queue_service.ingest_queue.submit(events)
+        return await events_service.ingest_many_async(db, events)
+
+    result = await bulk_ingest_service.ingest_stream(request.stream(), fmt, ingest_chunk)
+    logger.info(
+        f"Stream ingest complete ({len(result.chunks)} chunks): {result.success_count} success, "
+        f"{result.duplicate_count} duplicates, {result.error_count} errors"
+    )
+    return result
+
+
 @app.get("/api/events", response_model=List[schemas.AIEventResponse])
 def get_events(
+    request: Request,
+    response: Response,
     worker_id: Optional[str] = Query(None),
     workstation_id: Optional[str] = Query(None),
     start_time: Optional[datetime] = Query(None),
     end_time: Optional[datetime] = Query(None),
     limit: int = Query(1000, ge=1, le=10000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     db: Session = Depends(get_db)
 ):
-    """Query AI events with optional filters."""
-    return crud.get_events(db, worker_id, workstation_id, start_time, end_time, limit)
+    """
+    Query AI events with optional filters, newest first.
+
+    When a full page is returned, the `X-Next-Cursor` header holds an opaque
+    cursor for the next (older) page; pass it back as `cursor`.
+    """
+    before = events_service.decode_cursor(cursor) if cursor else None
+
+    def page():
+        rows = events_service.fetch_events(db, worker_id, workstation_id, start_time, end_time, limit, before=before)
+        next_cursor = events_service.encode_cursor(rows[-1]) if len(rows) == limit else None
+        return responses.dump_rows(rows, events_service.EXPORT_COLUMNS), next_cursor
+
+    result = _cached(request, response, page, time_dependent=False)
+    if isinstance(result, Response):
+        return result
+    body, next_cursor = result
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return responses.json_bytes(body, response)
+
+
+@app.get("/api/events/export")
+def export_events(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    worker_id: Optional[str] = Query(None),
+    workstation_id: Optional[str] = Query(None),
+    start_time: Optional[datetime] = Query(None),
+    end_time: Optional[datetime] = Query(None),
+):
+    """Stream every matching event as NDJSON or CSV, oldest first, with constant memory."""
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        events_service.export_events(format, worker_id, workstation_id, start_time, end_time),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="events.{format}"'},
+    )
 
 
 # ========================================
@@ -191,56 +377,216 @@ def get_events(
 
 @app.get("/api/metrics/workers", response_model=List[schemas.WorkerMetrics])
 def get_worker_metrics(
+    request: Request,
+    response: Response,
     worker_id: Optional[str] = Query(None),
     start_time: Optional[datetime] = Query(None),
     end_time: Optional[datetime] = Query(None),
+    window: Optional[str] = Query(None, pattern=scheduler_service.WINDOW_PATTERN, description="Standard window ending now (precomputed)"),
     db: Session = Depends(get_db)
 ):
     """Get worker-level productivity metrics."""
-    return metrics_service.worker_metrics(db, worker_id, start_time, end_time)
+    if window:
+        return _precomputed(
+            request, response, db, window, f"summary:{window}",
+            lambda start: metrics_service.worker_metrics(db, worker_id, start),
+            lambda summary: [w for w in summary["workers"] if not worker_id or w["worker_id"] == worker_id],
+            start_time, end_time,
+        )
+    return responses.json_bytes(_cached(
+        request, response, lambda: responses.dumps(metrics_service.worker_metrics(db, worker_id, start_time, end_time)), end_time
+    ), response)
 
 
 @app.get("/api/metrics/workstations", response_model=List[schemas.WorkstationMetrics])
 def get_workstation_metrics(
+    request: Request,
+    response: Response,
     workstation_id: Optional[str] = Query(None),
     start_time: Optional[datetime] = Query(None),
     end_time: Optional[datetime] = Query(None),
+    window: Optional[str] = Query(None, pattern=scheduler_service.WINDOW_PATTERN, description="Standard window ending now (precomputed)"),
     db: Session = Depends(get_db)
 ):
     """Get workstation-level productivity metrics."""
-    return metrics_service.workstation_metrics(db, workstation_id, start_time, end_time)
+    if window:
+        return _precomputed(
+            request, response, db, window, f"summary:{window}",
+            lambda start: metrics_service.workstation_metrics(db, workstation_id, start),
+            lambda summary: [s for s in summary["workstations"] if not workstation_id or s["workstation_id"] == workstation_id],
+            start_time, end_time,
+        )
+    return responses.json_bytes(_cached(
+        request, response, lambda: responses.dumps(metrics_service.workstation_metrics(db, workstation_id, start_time, end_time)), end_time
+    ), response)
 
 
 @app.get("/api/metrics/factory", response_model=schemas.FactoryMetrics)
 def get_factory_metrics(
+    request: Request,
+    response: Response,
     start_time: Optional[datetime] = Query(None),
     end_time: Optional[datetime] = Query(None),
+    window: Optional[str] = Query(None, pattern=scheduler_service.WINDOW_PATTERN, description="Standard window ending now (precomputed)"),
     db: Session = Depends(get_db)
 ):
     """Get factory-level aggregate metrics."""
-    return metrics_service.factory_metrics(db, start_time, end_time)
+    if window:
+        return _precomputed(
+            request, response, db, window, f"summary:{window}",
+            lambda start: metrics_service.factory_metrics(db, start),
+            lambda summary: summary["factory"],
+            start_time, end_time,
+        )
+    return _cached(request, response, lambda: metrics_service.factory_metrics(db, start_time, end_time), end_time)
+
+
+@app.get("/api/metrics/summary", response_model=schemas.MetricsSummary)
+def get_metrics_summary(
+    request: Request,
+    response: Response,
+    start_time: Optional[datetime] = Query(None),
+    end_time: Optional[datetime] = Query(None),
+    window: Optional[str] = Query(None, pattern=scheduler_service.WINDOW_PATTERN, description="Standard window ending now (precomputed)"),
+    db: Session = Depends(get_db)
+):
+    """Get factory, worker and workstation metrics together from one shared pass."""
+    if window:
+        return _precomputed(
+            request, response, db, window, f"summary:{window}",
+            lambda start: metrics_service.metrics_summary(db, start),
+            start_time=start_time, end_time=end_time,
+        )
+    # The cache keeps the model here: the live stream shares this entry (stream_service.SNAPSHOT_CACHE_KEY)
+    summary = _cached(request, response, lambda: metrics_service.metrics_summary(db, start_time, end_time), end_time)
+    return responses.json_bytes(summary if isinstance(summary, Response) else responses.dumps(summary), response)
+
+
+@app.get("/api/metrics/leaderboard", response_model=schemas.Leaderboard)
+def get_leaderboard(
+    request: Request,
+    response: Response,
+    window: str = Query("24h", pattern=scheduler_service.WINDOW_PATTERN),
+    metric: str = Query("units_per_hour", pattern="^(units_per_hour|utilization_percentage)$"),
+    limit: int = Query(10, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Workers ranked by units per hour or utilization over a standard window (precomputed)."""
+    return _precomputed(
+        request, response, db, window, f"leaderboard:{window}:{metric}",
+        lambda start: scheduler_service.leaderboard(
+            [w.model_dump() for w in metrics_service.worker_metrics(db, None, start)], window, metric, datetime.utcnow(), limit
+        ),
+        lambda board: {**board, "entries": board["entries"][:limit]},
+    )
+
+
+@app.get("/api/metrics/aggregate", response_model=schemas.AggregateMetrics)
+def get_aggregate_metrics(
+    request: Request,
+    response: Response,
+    group_by: Optional[str] = Query(
+        None, pattern="^(department|shift|location|type)(,(department|shift|location|type))*$",
+        description="Comma-separated dimensions, e.g. department,shift",
+    ),
+    start_time: Optional[datetime] = Query(None),
+    end_time: Optional[datetime] = Query(None),
+    bucket_minutes: Optional[int] = Query(None, ge=1, le=10080, description="Also return a series of buckets this wide per group"),
+    db: Session = Depends(get_db)
+):
+    """
+    Utilization, units and units/hour per department, shift, workstation location
+    or type (any combination), summed from the state rollups in one grouped query.
+    """
+    dimensions = group_by.split(",") if group_by else []
+    return responses.json_bytes(_cached(
+        request,
+        response,
+        lambda: responses.dumps(metrics_service.aggregate_metrics(db, dimensions, start_time, end_time, bucket_minutes)),
+        end_time,
+    ), response)
 
 
 @app.get("/api/metrics/model-health")
-def get_model_health(db: Session = Depends(get_db)):
+def get_model_health(request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Monitor AI model health and detect potential model drift.
     
     Analyzes confidence scores from recent events to identify degradation.
     Returns status (Healthy/Warning) and recommendations.
     """
-    return metrics_service.get_model_health_status(db)
+    return _cached(request, response, lambda: metrics_service.get_model_health_status(db), time_dependent=False)
+
+
+@app.get("/api/metrics/lateness")
+def get_lateness():
+    """
+    Late data sent by the edge devices, as seen by this process since it started.
+
+    Events are counted by arrival against the ingest watermark (in order,
+    reordered within ALLOWED_LATENESS_SECONDS, late), per workstation, with the
+    final rollup buckets that late events rewrote (stale buckets).
+    """
+    return watermarks.report()
 
 
 @app.get("/api/metrics/efficiency-heatmap")
-def get_efficiency_heatmap(db: Session = Depends(get_db)):
+def get_efficiency_heatmap(
+    request: Request,
+    response: Response,
+    start_time: Optional[datetime] = Query(None),
+    end_time: Optional[datetime] = Query(None),
+    bucket_minutes: int = Query(60, ge=1, le=1440),
+    group_by: Optional[str] = Query(None, pattern="^(worker|workstation|location)$"),
+    window: Optional[str] = Query(None, pattern=scheduler_service.HEATMAP_WINDOW_PATTERN, description="Standard window ending now (24h and 7d hourly are precomputed)"),
+    db: Session = Depends(get_db)
+):
     """
-    Get time-series heatmap showing productivity patterns by hour.
+    Get time-series heatmap showing productivity patterns per time bucket.
     
     Helps identify shift bottlenecks and peak productivity times.
-    Returns hourly utilization data for the last 24 hours.
+    Returns time-weighted utilization per bucket (default: hourly, last 24 hours),
+    optionally split per worker, workstation or workstation location.
+    """
+    if window:
+        return _precomputed(
+            request, response, db, window, scheduler_service.heatmap_key(window, bucket_minutes, group_by),
+            lambda start: metrics_service.get_efficiency_heatmap(db, start, None, bucket_minutes, group_by),
+            start_time=start_time, end_time=end_time,
+        )
+    return _cached(
+        request,
+        response,
+        lambda: metrics_service.get_efficiency_heatmap(db, start_time, end_time, bucket_minutes, group_by),
+        end_time,
+    )
+
+
+# ========================================
+# Live Stream
+# ========================================
+
+@app.get("/api/stream")
+async def live_stream(
+    request: Request,
+    worker_id: Optional[str] = Query(None),
+    workstation_id: Optional[str] = Query(None),
+):
     """
-    return metrics_service.get_efficiency_heatmap(db)
+    Server-Sent Events stream replacing dashboard polling.
+
+    Sends a `snapshot` (factory, workers, workstations) and the latest `events`
+    on connect, then a new snapshot whenever metrics change and only the events
+    stored since the previous message. One computation is shared by all
+    subscribers; `worker_id` / `workstation_id` narrow what this client receives.
+    """
+    subscriber = await stream_service.broadcaster.connect(worker_id, workstation_id)
+    return StreamingResponse(
+        stream_service.sse_messages(request, subscriber),
+        media_type="text/event-stream",
+        # identity encoding keeps GZipMiddleware from buffering the stream
+        headers={"Cache-Control": "no-cache", "Content-Encoding": "identity", "X-Accel-Buffering": "no"},
+    )
 
 
 # ========================================
@@ -249,14 +595,14 @@ def get_efficiency_heatmap(db: Session = Depends(get_db)):
 
 @app.get("/api/workers", response_model=List[schemas.Worker])
 def list_workers(db: Session = Depends(get_db)):
-    """List all workers."""
-    return crud.get_workers(db)
+    """List all workers (from the in-memory registry)."""
+    return registry.workers(db)
 
 
 @app.get("/api/workstations", response_model=List[schemas.Workstation])
 def list_workstations(db: Session = Depends(get_db)):
-    """List all workstations."""
-    return crud.get_workstations(db)
+    """List all workstations (from the in-memory registry)."""
+    return registry.workstations(db)
 
 
 @app.post("/api/seed", response_model=schemas.SeedResponse)
@@ -274,17 +620,38 @@ def seed_data(
 @app.post("/api/admin/seed", response_model=schemas.SeedResponse)
 def admin_seed(
     clear_existing: bool = Query(False),
+    mode: str = Query("ingest", pattern="^(ingest|bulk)$", description="ingest = regular ingest path, bulk = bulk generator"),
+    workers: int = Query(6, ge=1, le=10_000),
+    workstations: int = Query(6, ge=1, le=10_000),
+    hours: float = Query(24, gt=0, le=24 * 366),
+    interval_minutes: int = Query(5, ge=1, le=60),
+    processes: int = Query(1, ge=1, le=32, description="Generator processes (bulk mode)"),
+    seed: Optional[int] = Query(None, description="RNG seed for a reproducible data set"),
     db: Session = Depends(get_db),
 ):
-    """Dynamic Faker-driven seeding for the last 24 hours with realistic constraints."""
-    result = seed_service.admin_seed(db, clear_existing)
+    """Realistic seeding (lunch dip, slow start, production only while working) at a chosen scale."""
+    spec = generator_service.GeneratorSpec(
+        workers=workers, workstations=workstations, hours=hours, interval_minutes=interval_minutes, seed=seed,
+    )
+    result = seed_service.admin_seed(db, clear_existing, spec, mode, processes)
     return schemas.SeedResponse(
         message="Admin seed completed",
-        workers_created=6,
-        workstations_created=6,
+        workers_created=result["workers_created"],
+        workstations_created=result["workstations_created"],
         events_created=result["events_created"],
     )
 
 
+@app.post("/api/admin/archive", response_model=schemas.ArchiveResponse)
+def admin_archive(db: Session = Depends(get_db)):
+    """Move raw events older than EVENT_RETENTION_DAYS to the cold archive (also run at startup)."""
+    result = archive.compact(db)
+    return schemas.ArchiveResponse(
+        partitions_archived=result["partitions"],
+        events_archived=result["events"],
+        horizon=archive.horizon(db),
+    )
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
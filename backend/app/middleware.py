@@ -1,7 +1,51 @@
-"""Rate limiting middleware configuration"""
+"""Rate limiting and request instrumentation middleware"""
+
+import time
 
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
+from .services import telemetry_service
+
 # Initialize rate limiter
 limiter = Limiter(key_func=get_remote_address, default_limits=["200 per minute"])
+
+
+class RequestMetricsMiddleware:
+    """
+    Pure ASGI middleware recording request count, latency and SQL usage per
+    route template (e.g. /api/metrics/workers/{worker_id}), so path parameters
+    do not explode the label set. Unmatched paths share the "unmatched" label.
+    """
+
+    def __init__(self, app, skip_paths=("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = telemetry_service.start_request()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            telemetry_service.finish_request(
+                token,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status,
+                time.perf_counter() - started,
+            )
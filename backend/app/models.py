@@ -5,12 +5,15 @@ This module defines SQLAlchemy models for:
 - Workers: Individual workers with metadata
 - Workstations: Physical workstations in the factory
 - AIEvents: Time-series events from AI-powered CCTV cameras
+- StateRollups: Minute/hour/day pre-aggregated state durations derived from AIEvents
+- EventPartitions: Manifest of raw events archived past the retention window
+- PrecomputedResults / ScheduledJobs: Aggregates refreshed by the background scheduler
 
 All events are append-only for audit trail and time-series analysis.
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, UniqueConstraint
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, Text, UniqueConstraint
+from sqlalchemy.orm import relationship, declared_attr
 from datetime import datetime
 
 from .database import Base
@@ -75,10 +78,10 @@ class AIEvent(Base):
     __tablename__ = "ai_events"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    timestamp = Column(DateTime, nullable=False, index=True)  # Indexed for time-range queries
-    worker_id = Column(String, ForeignKey("workers.id"), nullable=False, index=True)
-    workstation_id = Column(String, ForeignKey("workstations.id"), nullable=False, index=True)
-    event_type = Column(String, nullable=False, index=True)  # working, idle, absent, product_count - indexed for filtering
+    timestamp = Column(DateTime, nullable=False)  # Time ranges use the dedup key (timestamp first)
+    worker_id = Column(String, ForeignKey("workers.id"), nullable=False)
+    workstation_id = Column(String, ForeignKey("workstations.id"), nullable=False)
+    event_type = Column(String, nullable=False)  # working, idle, absent, product_count
     confidence = Column(Float, nullable=False)  # AI model confidence (0.0 - 1.0)
     count = Column(Integer, default=1)  # Product count for product_count events
     created_at = Column(DateTime, default=datetime.utcnow)  # When record was inserted
@@ -87,10 +90,141 @@ class AIEvent(Base):
     worker = relationship("Worker", back_populates="events")
     workstation = relationship("Workstation", back_populates="events")
     
-    # Composite index for efficient time-series queries
+    # Three indexes, each serving a family of hot queries (plans pinned by tests/test_query_plans.py)
     __table_args__ = (
-        Index('idx_worker_timestamp', 'worker_id', 'timestamp'),
-        Index('idx_workstation_timestamp', 'workstation_id', 'timestamp'),
-        # Prevent duplicates per worker + event type at same timestamp
+        # Per-worker / per-station timelines: rollup spans and boundaries, filtered event
+        # pages and exports, the batch duplicate lookup, per-entity metrics scans.
+        # event_type, count and the other entity make the timeline reads index-only.
+        Index('idx_worker_timeline', 'worker_id', 'timestamp', 'event_type', 'count', 'workstation_id'),
+        Index('idx_workstation_timeline', 'workstation_id', 'timestamp', 'event_type', 'count', 'worker_id'),
+        # Prevent duplicates per worker + event type at same timestamp; timestamp first, so it
+        # also serves unfiltered time ranges, newest-first pages and the dedup preload
         UniqueConstraint('timestamp', 'worker_id', 'event_type', name='uix_event_dedup_worker_type'),
     )
+
+
+# Indexes of earlier releases, dropped from existing databases by bootstrap.init_schema
+RETIRED_INDEXES = {
+    "ai_events": (
+        "ix_ai_events_timestamp",  # prefix of the dedup key
+        "ix_ai_events_worker_id",  # prefix of idx_worker_timeline
+        "ix_ai_events_workstation_id",  # prefix of idx_workstation_timeline
+        "ix_ai_events_event_type",  # four values; no query filters on it alone
+        "idx_worker_timestamp",  # superseded by the covering idx_worker_timeline
+        "idx_workstation_timestamp",  # superseded by the covering idx_workstation_timeline
+    ),
+}
+
+
+class StateRollupMixin:
+    """
+    Columns shared by the minute/hour/day state rollup tables.
+
+    Each row holds the state time and event facts falling inside one bucket for a
+    (worker, workstation) pair on one timeline:
+    - timeline 'worker': intervals between consecutive events of the same worker
+    - timeline 'workstation': intervals between consecutive events at the same station
+    An interval is attributed to the worker/workstation of the event that opens it
+    and split across the buckets it overlaps. Only closed intervals (followed by a
+    later event) are stored; the open tail after the latest event is added at query
+    time.
+
+    Rows are maintained incrementally at ingest (see services/rollup_service.py).
+    """
+    timeline = Column(String, primary_key=True)  # "worker" or "workstation"
+    worker_id = Column(String, primary_key=True)
+    workstation_id = Column(String, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)  # UTC, aligned to the table's resolution
+    working_seconds = Column(Float, nullable=False, default=0.0)
+    idle_seconds = Column(Float, nullable=False, default=0.0)
+    absent_seconds = Column(Float, nullable=False, default=0.0)
+    units = Column(Integer, nullable=False, default=0)  # Sum of product_count events in the bucket
+    event_count = Column(Integer, nullable=False, default=0)
+    first_event_at = Column(DateTime)
+    last_event_at = Column(DateTime)
+
+    @declared_attr
+    def __table_args__(cls):
+        # Window queries filter by timeline and bucket range, then group by entity
+        return (Index(f"idx_{cls.__tablename__}_bucket", "timeline", "bucket_start"),)
+
+
+class StateRollupMinute(StateRollupMixin, Base):
+    """1-minute state rollups."""
+    __tablename__ = "state_rollups_minute"
+
+
+class StateRollupHour(StateRollupMixin, Base):
+    """1-hour state rollups."""
+    __tablename__ = "state_rollups_hour"
+
+
+class StateRollupDay(StateRollupMixin, Base):
+    """1-day state rollups."""
+    __tablename__ = "state_rollups_day"
+
+
+class EventPartition(Base):
+    """
+    A day or week of raw events moved out of `ai_events` into the cold archive.
+
+    The events live in one compressed columnar file per partition (see
+    services/archive_service.py); their state time stays in the rollups. The
+    entity lists let readers skip partitions that cannot hold a requested
+    worker or workstation.
+    """
+    __tablename__ = "event_partitions"
+
+    partition_start = Column(DateTime, primary_key=True)  # UTC, inclusive
+    partition_end = Column(DateTime, nullable=False)  # UTC, exclusive
+    path = Column(String, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    worker_ids = Column(String, nullable=False)  # Comma-separated
+    workstation_ids = Column(String, nullable=False)  # Comma-separated
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
+class PrecomputedResult(Base):
+    """
+    An aggregate refreshed in the background for a standard window (see
+    services/scheduler_service.py), stored as the endpoint's JSON response.
+    """
+    __tablename__ = "precomputed_results"
+
+    key = Column(String, primary_key=True)  # e.g. "summary:24h", "heatmap:7d:location"
+    payload = Column(Text, nullable=False)  # JSON
+    window_start = Column(DateTime)  # UTC; NULL = all history
+    window_end = Column(DateTime, nullable=False)  # UTC
+    computed_at = Column(DateTime, nullable=False)
+    compute_ms = Column(Float)
+
+
+class ScheduledJob(Base):
+    """
+    Schedule and lease of one background job. A runner claims a due job with a
+    conditional UPDATE, so every API process can run the scheduler loop and each
+    job still runs once per interval.
+    """
+    __tablename__ = "scheduled_jobs"
+
+    name = Column(String, primary_key=True)
+    next_run_at = Column(DateTime, nullable=False)
+    leased_until = Column(DateTime)  # NULL = not running
+    leased_by = Column(String)
+    last_finished_at = Column(DateTime)
+    last_duration_ms = Column(Float)
+    last_error = Column(String)
+    run_count = Column(Integer, nullable=False, default=0)
+
+
+class DataGeneration(Base):
+    """
+    Single-row counter of committed data changes, shared by every API process
+    (see services/cache_service.py). The epoch is new whenever the row is
+    created, so tags from a recreated database never match old ones.
+    """
+    __tablename__ = "data_generation"
+
+    id = Column(Integer, primary_key=True)  # Always 1
+    epoch = Column(String, nullable=False)
+    generation = Column(Integer, nullable=False, default=0)
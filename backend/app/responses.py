@@ -0,0 +1,51 @@
+"""
+Fast JSON encoding for trusted database output.
+
+Large read responses (event pages, metrics lists) skip FastAPI's
+response_model round trip, which validates every row through Pydantic again
+and walks the result with jsonable_encoder before `json.dumps`. Rows are
+encoded straight to bytes instead, and the bytes are what the metrics cache
+keeps, so a cache hit does no encoding at all. The routes keep their
+response_model for the OpenAPI schema; the output is byte-for-byte the same.
+"""
+
+from typing import Any, Iterable, Sequence
+
+import pydantic_core
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import orjson  # type: ignore
+except ImportError:
+    # Fallback if orjson not installed: pydantic-core's encoder (native too, slower on plain dicts)
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Compact JSON bytes of dicts, lists, datetimes and Pydantic models."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return pydantic_core.to_json(content)
+
+
+def dump_rows(rows: Iterable[Sequence[Any]], columns: Sequence[str]) -> bytes:
+    """A JSON array with one object per row tuple, keyed by `columns`."""
+    return dumps([dict(zip(columns, row)) for row in rows])
+
+
+def json_bytes(body: Any, response: Response) -> Response:
+    """
+    Send already-encoded JSON with the headers set on the endpoint's `response`
+    (a returned Response replaces it). Responses from the cache helpers, such
+    as a 304, pass through.
+    """
+    if isinstance(body, Response):
+        return body
+    return Response(content=body, media_type="application/json", headers=dict(response.headers))
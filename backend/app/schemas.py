@@ -8,7 +8,7 @@ Defines data validation models for:
 """
 
 from pydantic import BaseModel, Field, field_validator
-from typing import List, Optional, Literal
+from typing import Dict, List, Optional, Literal
 from datetime import datetime
 
 
@@ -62,6 +62,11 @@ class AIEventBatchResponse(BaseModel):
     errors: List[str] = []
 
 
+class AIEventStreamResponse(AIEventBatchResponse):
+    """Response for streaming ingestion: totals plus counts per ingested chunk."""
+    chunks: List[AIEventBatchResponse] = Field(default_factory=list, description="Per-chunk counts and errors, in stream order")
+
+
 # ========================================
 # Worker Schemas
 # ========================================
@@ -151,9 +156,70 @@ class FactoryMetrics(BaseModel):
     time_range_end: Optional[datetime] = None
 
 
+class MetricsSummary(BaseModel):
+    """Factory, worker and workstation metrics computed from one shared pass."""
+    factory: FactoryMetrics
+    workers: List[WorkerMetrics]
+    workstations: List[WorkstationMetrics]
+
+
+class AggregateValues(BaseModel):
+    """Metrics of one group (or one bucket of it) in /api/metrics/aggregate."""
+    working_hours: float
+    idle_hours: float
+    absent_hours: float
+    utilization_percentage: float = Field(..., description="Working time / observed (working + idle + absent) time * 100")
+    total_units_produced: int
+    units_per_hour: float = Field(..., description="Units / working hours")
+
+
+class AggregateBucket(AggregateValues):
+    bucket_start: datetime
+
+
+class AggregateGroup(AggregateValues):
+    group: Dict[str, str] = Field(..., description="Dimension -> value ('Unassigned' when not set)")
+    buckets: Optional[List[AggregateBucket]] = None
+
+
+class AggregateMetrics(BaseModel):
+    """Metrics grouped by worker / workstation dimensions over a window."""
+    group_by: List[str]
+    timeline: str = Field(..., description="'worker' or 'workstation' time")
+    start: datetime = Field(..., description="Window start, aligned to the rollup buckets used")
+    end: datetime
+    bucket_minutes: Optional[int] = None
+    groups: List[AggregateGroup]
+
+
+class LeaderboardEntry(BaseModel):
+    """One ranked worker."""
+    rank: int
+    worker_id: str
+    worker_name: str
+    units_per_hour: float
+    utilization_percentage: float
+    total_units_produced: int
+
+
+class Leaderboard(BaseModel):
+    """Workers ranked by one metric over a standard window."""
+    window: str
+    metric: str
+    computed_at: datetime
+    entries: List[LeaderboardEntry]
+
+
 class SeedResponse(BaseModel):
     """Response for seed data operation."""
     message: str
     workers_created: int
     workstations_created: int
     events_created: int
+
+
+class ArchiveResponse(BaseModel):
+    """Response for an archive compaction run."""
+    partitions_archived: int
+    events_archived: int
+    horizon: Optional[datetime] = None  # Events before this are archived
@@ -10,6 +10,11 @@ from datetime import datetime, timedelta
 import random
 
 from . import models, schemas, crud
+from .services import cache_service, health_service, rollup_service, scheduler_service
+from .services.archive_service import archive
+from .services.dedup_service import recent_keys
+from .services.registry_service import registry
+from .services.watermark_service import watermarks
 from .constants import WORKER_IDS, WORKSTATION_IDS, SEED_INTERVAL_MINUTES
 
 
@@ -48,6 +53,9 @@ def seed_workers(db: Session) -> int:
             worker = schemas.WorkerCreate(**worker_data)
             crud.create_worker(db, worker)
             created_count += 1
+    if created_count:
+        cache_service.bump_generation(db)
+        db.commit()
     return created_count
 
 
@@ -63,6 +71,9 @@ def seed_workstations(db: Session) -> int:
             workstation = schemas.WorkstationCreate(**workstation_data)
             crud.create_workstation(db, workstation)
             created_count += 1
+    if created_count:
+        cache_service.bump_generation(db)
+        db.commit()
     return created_count
 
 
@@ -135,7 +146,7 @@ def seed_sample_events(db: Session, hours_back: int = 24) -> int:
     
     # Insert events using the service layer
     from .services.events_service import ingest_batch
-    result = ingest_batch(db, events)
+    result = ingest_batch(db, events, record_arrivals=False)
     return result.success_count
 
 
@@ -145,9 +156,17 @@ def clear_all_data(db: Session):
     WARNING: This deletes all data!
     """
     db.query(models.AIEvent).delete()
+    rollup_service.clear(db)
+    archive.clear(db)
+    scheduler_service.invalidate(db)
     db.query(models.Worker).delete()
     db.query(models.Workstation).delete()
+    cache_service.bump_generation(db)
     db.commit()
+    health_service.tracker.reset()
+    recent_keys.reset()
+    watermarks.reset()
+    registry.clear()
 
 
 def seed_database(db: Session, clear_existing: bool = False, hours_back: int = 24) -> dict:
@@ -0,0 +1,378 @@
+"""
+Event retention and cold archive.
+
+With `event_retention_days` > 0, raw events older than the retention window are
+moved out of `ai_events` one partition (a UTC day or ISO week, `event_partition`)
+at a time, so the table and its indexes only hold the hot window and inserts
+stop slowing down as history accumulates:
+
+1. the partition's rows are deleted with DELETE ... RETURNING (one statement, so
+   nothing inserted concurrently is lost between the read and the delete)
+2. they are written to one compressed columnar file per partition under
+   `event_archive_dir` (NumPy .npz, or gzip'd JSON columns without NumPy)
+3. a manifest row (`event_partitions`) records the range, file, row count and
+   the workers/workstations present, and the transaction commits
+
+A partition that is archived again (rows that reached the table after it was
+archived) is written to a new file; the old one is removed only after the
+manifest pointing at the new one commits, so a reader of the old manifest
+never sees a half-replaced file. The archive transaction bumps the shared
+data generation, and each process reloads its copy of the manifest when the
+generation has moved since its last load (as `health_service` does).
+
+State time is already in the rollups (day buckets are permanent), so whole days
+of an archived range are answered from the rollups. Readers of raw events
+(window edges and boundaries in rollup_service, the raw metrics scan, event
+listing and export) merge in archived rows only when the requested range
+reaches below the archive horizon, reading just the overlapping partitions.
+Events older than the horizon are rejected at ingest: archived partitions are
+immutable.
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    # Fallback if numpy not installed: partitions are stored as gzip'd JSON columns
+    np = None
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..config import settings
+from . import cache_service
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+CACHED_PARTITIONS = 8  # Decoded partitions kept in memory
+NO_TIME = -1  # created_at missing
+
+COLUMNS = ("id", "timestamp", "worker_id", "workstation_id", "event_type", "confidence", "count", "created_at")
+
+
+class ArchivedEvent(NamedTuple):
+    """A raw event read back from the archive (same fields as the export columns)."""
+    id: int
+    timestamp: datetime
+    worker_id: str
+    workstation_id: str
+    event_type: str
+    confidence: float
+    count: int
+    created_at: Optional[datetime]
+
+
+class Partition(NamedTuple):
+    start: datetime
+    end: datetime
+    path: str
+    workers: frozenset
+    workstations: frozenset
+
+
+def timeline_order(row) -> tuple:
+    """Sort key of the rollup timelines: timestamp, then most recently inserted first."""
+    return (row.timestamp, -row.id)
+
+
+def partition_start(value: datetime) -> datetime:
+    day = datetime(value.year, value.month, value.day)
+    if settings.event_partition == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def partition_end(start: datetime) -> datetime:
+    return start + timedelta(days=7 if settings.event_partition == "week" else 1)
+
+
+# ========================================
+# File format
+# ========================================
+
+def _micros(value: Optional[datetime]) -> int:
+    return NO_TIME if value is None else (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(value: int) -> Optional[datetime]:
+    return None if value == NO_TIME else EPOCH + timedelta(microseconds=int(value))
+
+
+def _write_file(path: str, rows: List[ArchivedEvent]) -> None:
+    """Write rows column by column; the file appears atomically under `path`."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    if np is not None:
+        with open(tmp, "wb") as handle:
+            np.savez_compressed(
+                handle,
+                id=np.array([r.id for r in rows], dtype=np.int64),
+                timestamp=np.array([_micros(r.timestamp) for r in rows], dtype=np.int64),
+                worker_id=np.array([r.worker_id for r in rows], dtype=str),
+                workstation_id=np.array([r.workstation_id for r in rows], dtype=str),
+                event_type=np.array([r.event_type for r in rows], dtype=str),
+                confidence=np.array([r.confidence for r in rows], dtype=np.float64),
+                count=np.array([r.count for r in rows], dtype=np.int64),
+                created_at=np.array([_micros(r.created_at) for r in rows], dtype=np.int64),
+            )
+    else:
+        columns: Dict[str, List[Any]] = {name: [] for name in COLUMNS}
+        for row in rows:
+            for name, value in zip(COLUMNS, row):
+                columns[name].append(_micros(value) if name in ("timestamp", "created_at") else value)
+        with gzip.open(tmp, "wt", encoding="utf-8") as handle:
+            json.dump(columns, handle, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _read_file(path: str) -> List[ArchivedEvent]:
+    if path.endswith(".npz"):
+        if np is None:
+            raise RuntimeError(f"{path} needs NumPy to read")
+        with np.load(path, allow_pickle=False) as data:
+            columns = {name: data[name].tolist() for name in COLUMNS}
+    else:
+        with gzip.open(path, "rt", encoding="utf-8") as handle:
+            columns = json.load(handle)
+    columns["timestamp"] = [_from_micros(v) for v in columns["timestamp"]]
+    columns["created_at"] = [_from_micros(v) for v in columns["created_at"]]
+    return [ArchivedEvent(*values) for values in zip(*(columns[name] for name in COLUMNS))]
+
+
+# ========================================
+# Archive
+# ========================================
+
+class EventArchive:
+    """Manifest of archived partitions plus an LRU of decoded partition files."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._partitions: List[Partition] = []  # by start
+        # path -> (rows in timeline order, their timestamps for bisection)
+        self._cache: "OrderedDict[str, Tuple[List[ArchivedEvent], List[datetime]]]" = OrderedDict()
+        self._loaded = False
+        self._generation = -1
+
+    def load(self, db: Session) -> None:
+        # Read with the manifest, so it is never newer than the rows: a change meanwhile reloads again
+        generation = db.scalar(select(models.DataGeneration.generation).where(models.DataGeneration.id == 1)) or 0
+        rows = db.scalars(select(models.EventPartition).order_by(models.EventPartition.partition_start)).all()
+        partitions = [
+            Partition(
+                r.partition_start, r.partition_end, r.path,
+                frozenset(filter(None, r.worker_ids.split(","))),
+                frozenset(filter(None, r.workstation_ids.split(","))),
+            )
+            for r in rows
+        ]
+        paths = {p.path for p in partitions}
+        with self._lock:
+            self._partitions = partitions
+            for path in [path for path in self._cache if path not in paths]:
+                del self._cache[path]  # files are never rewritten in place: the rest stay valid
+            self._loaded = True
+            self._generation = generation
+
+    def ensure_loaded(self, db: Session) -> None:
+        """Load on first use, and reload when data changed (possibly in another process) since the last load."""
+        if not self._loaded or cache_service.current_generation() != self._generation:
+            self.load(db)
+
+    def horizon(self, db: Session) -> Optional[datetime]:
+        """End of the newest archived partition: every event before it is archived. None = nothing archived."""
+        self.ensure_loaded(db)
+        partitions = self._partitions
+        return partitions[-1].end if partitions else None
+
+    def _partition_rows(self, db: Session, partition: Partition) -> Tuple[List[ArchivedEvent], List[datetime]]:
+        with self._lock:
+            cached = self._cache.get(partition.path)
+            if cached is not None:
+                self._cache.move_to_end(partition.path)
+                return cached
+        try:
+            rows = _read_file(partition.path)
+        except FileNotFoundError:
+            # Replaced by another process since our load: read the file its manifest now names
+            self.load(db)
+            current = next((p for p in self._partitions if p.start == partition.start), None)
+            if current is None or current.path == partition.path:
+                raise
+            return self._partition_rows(db, current)
+        rows = sorted(rows, key=timeline_order)
+        cached = (rows, [r.timestamp for r in rows])
+        with self._lock:
+            self._cache[partition.path] = cached
+            while len(self._cache) > CACHED_PARTITIONS:
+                self._cache.popitem(last=False)
+        return cached
+
+    def partition_chunks(
+        self,
+        db: Session,
+        lo: Optional[datetime],
+        hi: Optional[datetime],
+        inclusive: bool = True,
+        worker_id: Optional[str] = None,
+        workstation_id: Optional[str] = None,
+        newest_first: bool = False,
+    ) -> Iterator[List[ArchivedEvent]]:
+        """
+        Archived events in [lo, hi] (or [lo, hi)), one list per overlapping
+        partition in timeline order. Partitions outside the range, or without the
+        requested worker / workstation, are not read.
+        """
+        self.ensure_loaded(db)
+        partitions = reversed(self._partitions) if newest_first else list(self._partitions)
+        for partition in partitions:
+            if (lo is not None and partition.end <= lo) or (hi is not None and partition.start > hi):
+                continue
+            if (worker_id and worker_id not in partition.workers) or (
+                workstation_id and workstation_id not in partition.workstations
+            ):
+                continue
+            rows, stamps = self._partition_rows(db, partition)
+            first = bisect_left(stamps, lo) if lo is not None else 0
+            last = (bisect_right(stamps, hi) if inclusive else bisect_left(stamps, hi)) if hi is not None else len(rows)
+            yield [
+                row for row in rows[first:last]
+                if (not worker_id or row.worker_id == worker_id) and (not workstation_id or row.workstation_id == workstation_id)
+            ]
+
+    def rows(self, db: Session, lo: Optional[datetime], hi: Optional[datetime], inclusive: bool = True, **entity) -> List[ArchivedEvent]:
+        """All archived events of `partition_chunks` in one list, in timeline order."""
+        return [row for chunk in self.partition_chunks(db, lo, hi, inclusive, **entity) for row in chunk]
+
+    def last_before(self, db: Session, column: str, entities: Iterable[str], before: Optional[datetime]) -> Dict[str, ArchivedEvent]:
+        """
+        Last archived event in timeline order strictly before `before` (or overall)
+        for each of `entities` on `column` ("worker_id" / "workstation_id").
+        Partitions are read newest first and only while an entity is still missing.
+        """
+        self.ensure_loaded(db)
+        wanted: Set[str] = set(entities)
+        found: Dict[str, ArchivedEvent] = {}
+        for partition in reversed(self._partitions):
+            if not wanted:
+                break
+            if before is not None and partition.start >= before:
+                continue
+            present = partition.workers if column == "worker_id" else partition.workstations
+            if not wanted & present:
+                continue
+            for row in reversed(self._partition_rows(db, partition)[0]):
+                if before is not None and row.timestamp >= before:
+                    continue
+                entity = getattr(row, column)
+                if entity in wanted:
+                    found[entity] = row
+                    wanted.discard(entity)
+                    if not wanted:
+                        break
+        return found
+
+    def compact(self, db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Archive every partition that ended before the retention window and commit.
+
+        Returns {"partitions": archived partitions, "events": events moved}.
+        """
+        from . import rollup_service
+
+        if settings.event_retention_days <= 0:
+            return {"partitions": 0, "events": 0}
+        cutoff = partition_start((now or datetime.utcnow()) - timedelta(days=settings.event_retention_days))
+        if rollup_service.needs_rebuild(db):
+            rollup_service.rebuild(db)  # the rollups must hold the state time before raw rows go
+
+        moved = partitions = 0
+        while True:
+            oldest = db.scalar(select(func.min(models.AIEvent.timestamp)).where(models.AIEvent.timestamp < cutoff))
+            if oldest is None:
+                break
+            start = partition_start(oldest)
+            count = self._archive_partition(db, start, partition_end(start))
+            moved += count
+            partitions += 1
+        if partitions:
+            self.load(db)
+            logger.info(f"Archived {moved} events in {partitions} partition(s) older than {cutoff.isoformat()}")
+        return {"partitions": partitions, "events": moved}
+
+    def _archive_partition(self, db: Session, start: datetime, end: datetime) -> int:
+        table = models.AIEvent.__table__
+        columns = [table.c[name] for name in COLUMNS]
+        in_range = and_(table.c.timestamp >= start, table.c.timestamp < end)
+        if db.get_bind().dialect.delete_returning:
+            rows = db.execute(delete(table).where(in_range).returning(*columns)).all()
+        else:
+            rows = db.execute(select(*columns).where(in_range)).all()
+            db.execute(delete(table).where(in_range))
+        rows = moved = [ArchivedEvent(*row) for row in rows]
+
+        manifest = db.get(models.EventPartition, start)
+        old_path = None
+        if manifest is not None:
+            # Rows that reached the table after the partition was archived: merge them in
+            old_path = manifest.path
+            archived = _read_file(old_path)
+            stored = {(r.timestamp, r.worker_id, r.event_type) for r in archived}
+            rows = archived + [r for r in moved if (r.timestamp, r.worker_id, r.event_type) not in stored]
+        else:
+            manifest = models.EventPartition(partition_start=start, partition_end=end)
+            db.add(manifest)
+        # A new file per version: readers of the committed manifest keep a complete file
+        extension = ".npz" if np is not None else ".json.gz"
+        manifest.path = os.path.join(settings.event_archive_dir, f"events-{start:%Y%m%d}-{uuid.uuid4().hex[:8]}{extension}")
+        rows.sort(key=lambda r: (r.timestamp, r.id))
+        manifest.row_count = len(rows)
+        manifest.worker_ids = ",".join(sorted({r.worker_id for r in rows}))
+        manifest.workstation_ids = ",".join(sorted({r.workstation_id for r in rows}))
+        manifest.archived_at = datetime.utcnow()
+        cache_service.bump_generation(db)
+        path = manifest.path
+        try:
+            _write_file(path, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            raise
+        if old_path is not None:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+        return len(moved)
+
+    def clear(self, db: Session) -> None:
+        """Delete every archived partition and its file (without committing the manifest delete)."""
+        for partition in db.scalars(select(models.EventPartition)).all():
+            try:
+                os.remove(partition.path)
+            except FileNotFoundError:
+                pass
+        db.query(models.EventPartition).delete()
+        with self._lock:
+            self._partitions = []
+            self._cache.clear()
+            self._loaded = True
+
+
+archive = EventArchive()
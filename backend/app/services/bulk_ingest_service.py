@@ -0,0 +1,186 @@
+"""
+Streaming bulk ingestion (NDJSON / MessagePack).
+
+`/api/events/batch` parses the whole body into one list before any work
+starts. Here records are decoded from the request stream as bytes arrive,
+validated one by one against `AIEventCreate`, and handed to the ingestion path
+in chunks of `ingest_stream_chunk` events, so memory is bounded by one chunk
+and a long backfill makes progress while it uploads.
+
+Formats (by Content-Type):
+- NDJSON: one JSON object per line (`application/x-ndjson`)
+- MessagePack: a sequence of maps (`application/msgpack`); msgpack timestamps
+  and ISO strings are both accepted
+
+Every error names its NDJSON line or MessagePack record number, and each
+chunk's entry in the response lists the errors it counts.
+"""
+
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+try:
+    import msgpack  # type: ignore
+except ImportError:
+    # Fallback if msgpack not installed: NDJSON only
+    msgpack = None
+
+from .. import schemas
+from ..config import settings
+from . import events_service, telemetry_service
+
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl", "application/jsonlines"}
+MSGPACK_TYPES = {"application/msgpack", "application/x-msgpack", "application/vnd.msgpack"}
+# Largest single record accepted; a longer NDJSON line is rejected and skipped
+MAX_RECORD_BYTES = 64 * 1024
+# Error messages kept in the response (error_count stays exact)
+MAX_REPORTED_ERRORS = 1000
+
+Record = Tuple[int, Any]  # (1-based line / record number, decoded object or error message)
+IngestChunk = Callable[[List[schemas.AIEventCreate]], Awaitable[List[Dict[str, Any]]]]
+
+
+class _RecordError(str):
+    """Decoding error for one record, passed through the record stream."""
+
+
+def stream_format(content_type: Optional[str]) -> str:
+    """'ndjson' or 'msgpack' for a Content-Type header; HTTPException(415) otherwise."""
+    media_type = (content_type or "").split(";", 1)[0].strip().lower()
+    if media_type in NDJSON_TYPES:
+        return "ndjson"
+    if media_type in MSGPACK_TYPES:
+        if msgpack is None:
+            raise HTTPException(status_code=415, detail="MessagePack support is not installed (pip install msgpack)")
+        return "msgpack"
+    raise HTTPException(
+        status_code=415,
+        detail=f"Unsupported Content-Type {media_type or '(none)'}; use application/x-ndjson or application/msgpack",
+    )
+
+
+async def _ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    buffer = bytearray()
+    number = 0  # lines ended so far, blank ones included
+    skipping = False  # inside an oversized line
+
+    def decode(line: bytes):
+        if len(line) > MAX_RECORD_BYTES:
+            return _RecordError(f"record exceeds {MAX_RECORD_BYTES} bytes")
+        try:
+            return json.loads(line)
+        except ValueError as exc:
+            return _RecordError(f"invalid JSON ({exc})")
+
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            line = bytes(buffer[start:end]).strip()
+            start = end + 1
+            number += 1
+            if skipping:
+                skipping = False
+                continue
+            if line:
+                yield number, decode(line)
+        del buffer[:start]
+        if len(buffer) > MAX_RECORD_BYTES and not skipping:
+            yield number + 1, _RecordError(f"record exceeds {MAX_RECORD_BYTES} bytes")
+            skipping = True
+        if skipping:
+            buffer.clear()
+
+    line = bytes(buffer).strip()
+    if line and not skipping:
+        yield number + 1, decode(line)
+
+
+async def _msgpack_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    unpacker = msgpack.Unpacker(raw=False, timestamp=3, max_buffer_size=16 * 1024 * 1024)
+    number = 0
+    async for chunk in chunks:
+        unpacker.feed(chunk)
+        try:
+            for obj in unpacker:
+                number += 1
+                yield number, obj
+        except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError, ValueError) as exc:
+            # The frame boundary is lost; nothing after this point can be decoded
+            yield number + 1, _RecordError(f"invalid MessagePack data ({exc})")
+            return
+
+
+def _validation_message(exc: ValidationError) -> str:
+    error = exc.errors()[0]
+    location = ".".join(str(part) for part in error["loc"]) or "record"
+    return f"{location}: {error['msg']}"
+
+
+async def ingest_stream(chunks: AsyncIterator[bytes], fmt: str, ingest_chunk: IngestChunk) -> schemas.AIEventStreamResponse:
+    """
+    Decode, validate and ingest a record stream chunk by chunk.
+
+    `ingest_chunk` stores a list of events and returns one `ingest_many` outcome
+    per event (the write-behind queue or `ingest_many_async`). Records that fail
+    to decode or validate count as errors of the chunk they arrived in. Each
+    chunk entry lists all of its errors, in stream order; the top-level list
+    keeps the first MAX_REPORTED_ERRORS.
+    """
+    records = _ndjson_records(chunks) if fmt == "ndjson" else _msgpack_records(chunks)
+    label = "line" if fmt == "ndjson" else "record"
+    chunk_size = max(settings.ingest_stream_chunk, 1)
+    summaries: List[schemas.AIEventBatchResponse] = []
+    errors: List[str] = []
+    pending: List[schemas.AIEventCreate] = []
+    numbers: List[int] = []  # line / record number of each pending event
+    rejected: List[Tuple[int, str]] = []
+
+    async def flush() -> None:
+        results = await ingest_chunk(pending) if pending else []
+        telemetry_service.record_rejected("invalid_record", len(rejected))
+        summary = events_service.summarize_results(pending, results)
+        failed = [number for number, result in zip(numbers, results) if result["status"] == "error"]
+        chunk_errors = [
+            f"{label} {number}: {message}" for number, message in sorted(rejected + list(zip(failed, summary.errors)))
+        ]
+        errors.extend(chunk_errors[: max(MAX_REPORTED_ERRORS - len(errors), 0)])
+        summaries.append(schemas.AIEventBatchResponse(
+            success_count=summary.success_count,
+            duplicate_count=summary.duplicate_count,
+            error_count=len(chunk_errors),
+            errors=chunk_errors,
+        ))
+        pending.clear()
+        numbers.clear()
+        rejected.clear()
+
+    async for number, obj in records:
+        if isinstance(obj, _RecordError):
+            rejected.append((number, str(obj)))
+        elif not isinstance(obj, dict):
+            rejected.append((number, "expected an object"))
+        else:
+            try:
+                pending.append(schemas.AIEventCreate.model_validate(obj))
+                numbers.append(number)
+            except ValidationError as exc:
+                rejected.append((number, _validation_message(exc)))
+        if len(pending) + len(rejected) >= chunk_size:
+            await flush()
+    if pending or rejected:
+        await flush()
+
+    return schemas.AIEventStreamResponse(
+        success_count=sum(s.success_count for s in summaries),
+        duplicate_count=sum(s.duplicate_count for s in summaries),
+        error_count=sum(s.error_count for s in summaries),
+        errors=errors,
+        chunks=summaries,
+    )
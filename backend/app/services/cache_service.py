@@ -0,0 +1,198 @@
+"""
+Metrics result cache.
+
+Dashboards poll the metrics endpoints every few seconds, usually with nothing
+new ingested in between. Results are cached per (endpoint, query parameters)
+in a bounded LRU and tagged with the ingest generation: a counter that
+`events_service` bumps in every transaction that stores events, and the seed /
+clear paths bump when they change data. A changed generation makes every cached
+entry stale at once, without tracking which windows an event touched.
+
+Windows that end in the future (including the default "until now") keep
+growing while nothing is ingested, so their tag also carries a time slot of
+`metrics_cache_ttl_seconds`; they are recomputed at most once per slot.
+
+The tag doubles as the HTTP ETag, so an unchanged poll is answered with
+304 Not Modified before any database work (other than the generation read).
+
+The generation lives in the `data_generation` row, so an ingest on one
+`uvicorn --workers N` process invalidates the others too. The writer marks its
+transaction, and the row is incremented right after that commits, in a short
+transaction of its own: holding the row lock for a whole ingest transaction
+would queue concurrent writers (on PostgreSQL) behind each other. Between the
+two commits a result may be computed from the new data under the old tag; the
+increment then makes it stale, so a tag is never newer than its data. Each
+process re-reads the row at most every `cache_generation_refresh_ms`, and at
+once after its own increments.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import event, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..config import settings
+from ..database import engine
+
+logger = logging.getLogger(__name__)
+
+# (epoch, generation) last read from the data_generation row, and when
+_shared: Tuple[Optional[str], int] = (None, 0)
+_read_at = 0.0
+_shared_lock = threading.Lock()
+
+
+def bump_generation(db: Session) -> None:
+    """
+    Mark every cached result stale in every process once `db` commits. Call
+    inside the transaction that changes the data, before its commit; the
+    shared generation is incremented right after the commit (see `_increment`),
+    and not at all if it rolls back.
+    """
+    db.info["data_changed"] = True
+
+
+def _increment(bind) -> None:
+    """Increment the shared generation in its own short transaction."""
+    table = models.DataGeneration
+    with bind.begin() as connection:
+        if connection.execute(update(table).where(table.id == 1).values(generation=table.generation + 1)).rowcount == 0:
+            # Normally created by app.bootstrap
+            connection.execute(table.__table__.insert().values(id=1, epoch=uuid.uuid4().hex[:12], generation=1))
+
+
+def ensure_generation_row(db: Session) -> None:
+    """Create the generation row if it is missing (boot sequence). The caller commits."""
+    if db.get(models.DataGeneration, 1) is None:
+        db.add(models.DataGeneration(id=1, epoch=uuid.uuid4().hex[:12], generation=0))
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    if session.info.pop("data_changed", False):
+        try:
+            _increment(session.get_bind())
+        except SQLAlchemyError as exc:
+            # The data is committed; cached results catch up at the next increment
+            logger.warning(f"Could not advance the data generation: {exc}")
+        _expire()
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop("data_changed", None)
+
+
+def _expire() -> None:
+    global _read_at
+    _read_at = 0.0
+
+
+def _current() -> Tuple[Optional[str], int]:
+    """The shared (epoch, generation), re-read when older than cache_generation_refresh_ms."""
+    global _shared, _read_at
+    if time.monotonic() - _read_at < settings.cache_generation_refresh_ms / 1000:
+        return _shared
+    with _shared_lock:
+        now = time.monotonic()
+        if now - _read_at >= settings.cache_generation_refresh_ms / 1000:
+            try:
+                with engine.connect() as connection:
+                    row = connection.execute(
+                        select(models.DataGeneration.epoch, models.DataGeneration.generation).where(models.DataGeneration.id == 1)
+                    ).first()
+                _shared = (row.epoch, row.generation) if row is not None else (None, 0)
+            except SQLAlchemyError:
+                pass  # table not created yet: keep the last value
+            _read_at = now
+        return _shared
+
+
+def current_generation() -> int:
+    return _current()[1]
+
+
+def _is_open_window(end_time: Optional[datetime]) -> bool:
+    if end_time is None:
+        return True
+    if end_time.tzinfo is not None:
+        end_time = end_time.astimezone(timezone.utc).replace(tzinfo=None)
+    return end_time >= datetime.utcnow()
+
+
+def etag_for(end_time: Optional[datetime] = None, time_dependent: bool = True) -> str:
+    """
+    ETag for a result computed now: the ingest generation, plus the current time
+    slot when a time-dependent window is still open.
+
+    Read it *before* computing so a concurrent ingest can only make the tag
+    older than the data, never newer.
+    """
+    epoch, generation = _current()
+    tag = f"{epoch}-{generation}"
+    if time_dependent and _is_open_window(end_time):
+        slot = int(time.time() // max(settings.metrics_cache_ttl_seconds, 1))
+        tag = f"{tag}-{slot}"
+    return f'W/"{tag}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match header value names `etag` (or is `*`)."""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or etag[2:] in candidates
+
+
+class MetricsCache:
+    """
+    Bounded LRU of computed results, one entry per key, each stored with the
+    ETag it was computed under. An entry whose tag differs from the current
+    one is recomputed and replaced.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, etag: str, compute: Callable[[], Any]) -> Any:
+        if self.max_entries <= 0:
+            return compute()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == etag:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = (etag, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "generation": current_generation()}
+
+
+metrics_cache = MetricsCache(settings.metrics_cache_size)
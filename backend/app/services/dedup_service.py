@@ -0,0 +1,196 @@
+"""
+Recent dedup-key filter.
+
+Edge devices retry events from the last few minutes, so almost every new
+event is new and the per-event identity lookup finds nothing. This filter
+remembers the dedup keys (timestamp, worker_id, event_type) of stored events
+and answers for a key:
+
+- SEEN:  in the recent set, i.e. stored; no query needed
+- NEW:   definitely not stored; insert without looking it up
+- MAYBE: possibly stored; check the database as before
+
+Keys within `dedup_recent_minutes` of the newest timestamp seen live in an
+exact hash set, bucketed by minute. Older keys move to a Bloom filter (no
+false negatives, ~`dedup_bloom_error_rate` false positives). A full Bloom
+generation starts a new one; once more than `dedup_bloom_generations` exist,
+the oldest is dropped and every key not newer than its newest timestamp
+becomes MAYBE again (the filter's floor).
+
+The filter is warmed with the newest `dedup_preload_keys` stored keys (older
+ones are below the floor), only learns keys after their commit, and is per
+process. Keys written by another process are not known here, so a NEW answer
+can still hit `uix_event_dedup_worker_type`; ingestion treats that as a
+duplicate.
+"""
+
+import hashlib
+import math
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from .. import crud
+from ..config import settings
+
+NEW = "new"
+SEEN = "seen"
+MAYBE = "maybe"
+
+
+def _encode(key: crud.EventKey) -> bytes:
+    timestamp, worker_id, event_type = key
+    return f"{timestamp.isoformat()}|{worker_id}|{event_type}".encode()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over dedup keys (double hashing on one blake2b digest)."""
+
+    __slots__ = ("bits", "size", "hashes", "count", "max_timestamp")
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.max_timestamp: Optional[datetime] = None
+
+    def _positions(self, key: crud.EventKey) -> List[int]:
+        digest = hashlib.blake2b(_encode(key), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: crud.EventKey) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+        if self.max_timestamp is None or key[0] > self.max_timestamp:
+            self.max_timestamp = key[0]
+
+    def __contains__(self, key: crud.EventKey) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+
+class RecentKeyFilter:
+    """Time-windowed hash set of recent dedup keys backed by rotating Bloom filters."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.hits = 0
+        self.bloom_hits = 0
+        self.below_floor = 0
+        self.misses = 0
+        self.false_positives = 0
+        self._reset(None)
+
+    def _reset(self, floor: Optional[datetime]) -> None:
+        self._buckets: Dict[datetime, Set[crud.EventKey]] = {}
+        self._watermark: Optional[datetime] = None
+        self._blooms: List[BloomFilter] = [self._new_bloom()]
+        # Keys with a timestamp <= floor may be stored without being known here
+        self._floor = floor
+
+    @staticmethod
+    def _new_bloom() -> BloomFilter:
+        return BloomFilter(settings.dedup_bloom_capacity, settings.dedup_bloom_error_rate)
+
+    def load(self, db: Session) -> None:
+        """Rebuild from the newest `dedup_preload_keys` stored keys."""
+        limit = settings.dedup_preload_keys
+        keys = list(crud.get_recent_event_keys(db, limit))
+        with self._lock:
+            self._reset(keys[-1][0] if len(keys) >= limit else None)
+            self._add_keys(reversed(keys))
+            self._loaded = True
+
+    def ensure_loaded(self, db: Session) -> None:
+        if not self._loaded:
+            self.load(db)
+
+    def reset(self) -> None:
+        """Forget everything; the next check reloads from the database."""
+        with self._lock:
+            self._reset(None)
+            self._loaded = False
+
+    def check(self, db: Session, keys: Iterable[crud.EventKey]) -> Dict[crud.EventKey, str]:
+        """NEW / SEEN / MAYBE for each key (see module docstring)."""
+        if not settings.dedup_filter_enabled:
+            return {key: MAYBE for key in keys}
+        self.ensure_loaded(db)
+        statuses: Dict[crud.EventKey, str] = {}
+        with self._lock:
+            for key in keys:
+                bucket = self._buckets.get(key[0].replace(second=0, microsecond=0))
+                if bucket is not None and key in bucket:
+                    statuses[key] = SEEN
+                    self.hits += 1
+                elif self._floor is not None and key[0] <= self._floor:
+                    statuses[key] = MAYBE
+                    self.below_floor += 1
+                elif any(key in bloom for bloom in self._blooms):
+                    statuses[key] = MAYBE
+                    self.bloom_hits += 1
+                else:
+                    statuses[key] = NEW
+                    self.misses += 1
+        return statuses
+
+    def add(self, keys: Iterable[crud.EventKey]) -> None:
+        """Remember keys of committed events."""
+        with self._lock:
+            if self._loaded:
+                self._add_keys(keys)
+
+    def record_false_positives(self, count: int) -> None:
+        """Count MAYBE answers the database lookup found to be new."""
+        with self._lock:
+            self.false_positives += count
+
+    def _add_keys(self, keys: Iterable[crud.EventKey]) -> None:
+        window = timedelta(minutes=settings.dedup_recent_minutes)
+        for key in keys:
+            if self._watermark is None or key[0] > self._watermark:
+                self._watermark = key[0]
+            if key[0] >= self._watermark - window:
+                self._buckets.setdefault(key[0].replace(second=0, microsecond=0), set()).add(key)
+            else:
+                self._to_bloom(key)
+        self._expire(window)
+
+    def _expire(self, window: timedelta) -> None:
+        if self._watermark is None:
+            return
+        cutoff = self._watermark - window
+        for bucket in [b for b in self._buckets if b + timedelta(minutes=1) <= cutoff]:
+            for key in self._buckets.pop(bucket):
+                self._to_bloom(key)
+
+    def _to_bloom(self, key: crud.EventKey) -> None:
+        bloom = self._blooms[-1]
+        if bloom.count >= settings.dedup_bloom_capacity:
+            bloom = self._new_bloom()
+            self._blooms.append(bloom)
+            if len(self._blooms) > settings.dedup_bloom_generations:
+                dropped = self._blooms.pop(0)
+                if dropped.max_timestamp is not None and (self._floor is None or dropped.max_timestamp > self._floor):
+                    self._floor = dropped.max_timestamp
+        bloom.add(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "recent_keys": sum(len(bucket) for bucket in self._buckets.values()),
+            "bloom_keys": sum(bloom.count for bloom in self._blooms),
+            "hits": self.hits,
+            "bloom_hits": self.bloom_hits,
+            "below_floor": self.below_floor,
+            "misses": self.misses,
+            "false_positives": self.false_positives,
+        }
+
+
+recent_keys = RecentKeyFilter()
@@ -5,22 +5,53 @@ Provides ingestion with deduplication, validation, and batch handling.
 Separates API routes from business logic for clarity and testability.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
 from datetime import datetime
+import base64
+import csv
+import io
+import itertools
+import json
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+import logging
+
+try:
+    from sqlalchemy.ext.asyncio import AsyncSession
+except ImportError:
+    # Fallback if SQLAlchemy asyncio support (greenlet) is not installed
+    AsyncSession = None  # type: ignore
 
 from .. import crud, schemas
+from ..database import SessionLocal
+from . import cache_service, dedup_service, health_service, rollup_service, telemetry_service
+from .archive_service import archive
+from .dedup_service import recent_keys
+from .registry_service import registry
+from .watermark_service import watermarks
+
+logger = logging.getLogger(__name__)
 
 
 def _validate_worker_and_station(db: Session, worker_id: str, workstation_id: str) -> None:
-    """Ensure referenced worker/workstation exist."""
-    if not crud.get_worker(db, worker_id):
+    """Ensure referenced worker/workstation exist (registry lookup, see registry_service)."""
+    if not registry.known_worker_ids(db, [worker_id]):
+        telemetry_service.record_rejected("unknown_worker")
         raise HTTPException(status_code=404, detail=f"Worker {worker_id} not found. Seed data first.")
-    if not crud.get_workstation(db, workstation_id):
+    if not registry.known_workstation_ids(db, [workstation_id]):
+        telemetry_service.record_rejected("unknown_workstation")
         raise HTTPException(status_code=404, detail=f"Workstation {workstation_id} not found. Seed data first.")
 
 
+def _archived_detail(db: Session, timestamp: datetime) -> Optional[str]:
+    """Rejection message for an event older than the archive horizon (see archive_service), else None."""
+    horizon = archive.horizon(db)
+    if horizon is not None and timestamp.replace(tzinfo=None) < horizon:
+        return f"Events before {horizon.isoformat()} are archived and can no longer be ingested."
+    return None
+
+
 def ingest_event(db: Session, event: schemas.AIEventCreate) -> Dict[str, Any]:
     """
     Ingest a single AI event with idempotent deduplication.
@@ -32,6 +63,8 @@ def ingest_event(db: Session, event: schemas.AIEventCreate) -> Dict[str, Any]:
     **Design**:
     - If the same (timestamp, worker_id, event_type) tuple exists in the database,
       the duplicate is silently ignored and the existing record is returned.
+    - The lookup is skipped when the recent-key filter (see dedup_service) knows
+      the key is new; the UNIQUE INDEX still catches a concurrent duplicate.
     - Uniqueness is enforced at the database layer via SQL UNIQUE INDEX, ensuring
       consistency even under concurrent writes.
     - This approach is idempotent: multiple POST calls with identical events yield
@@ -53,26 +86,52 @@ def ingest_event(db: Session, event: schemas.AIEventCreate) -> Dict[str, Any]:
     
     **Raises**:
     - HTTPException(404) if worker or workstation not found
+    - HTTPException(409) if the event is older than the archive horizon
     - IntegrityError if database constraint violations occur
     """
     _validate_worker_and_station(db, event.worker_id, event.workstation_id)
+    archived = _archived_detail(db, event.timestamp)
+    if archived:
+        telemetry_service.record_rejected("archived")
+        raise HTTPException(status_code=409, detail=archived)
 
-    duplicate = crud.get_event_by_identity(db, event.timestamp, event.worker_id, event.event_type)
-    if duplicate:
+    key = crud.event_key(event.timestamp, event.worker_id, event.event_type)
+    status = recent_keys.check(db, [key])[key]
+    if status != dedup_service.NEW:
+        duplicate = crud.get_event_by_identity(db, event.timestamp, event.worker_id, event.event_type)
+        if duplicate:
+            telemetry_service.ingest_events.inc(("duplicate", ""))
+            return {"duplicate": True, "event": duplicate}
+        recent_keys.record_false_positives(1)
+
+    watermarks.ensure_loaded(db)  # before the insert, so the marks do not include the event
+    created = crud.create_ai_event(db, event, commit=False)
+    if created is None:
+        # Stored by another writer since the check; the unique index caught it
+        duplicate = crud.get_event_by_identity(db, event.timestamp, event.worker_id, event.event_type)
+        telemetry_service.ingest_events.inc(("duplicate", ""))
         return {"duplicate": True, "event": duplicate}
 
-    created = crud.create_ai_event(db, event)
+    arrivals = rollup_service.apply_events(db, [created])
+    cache_service.bump_generation(db)
+    db.commit()
+    db.refresh(created)
+    recent_keys.add([key])
+    health_service.tracker.observe([created])
+    watermarks.observe(arrivals)
+    telemetry_service.ingest_events.inc(("created", ""))
     return {"duplicate": False, "event": created}
 
 
-def ingest_batch(db: Session, events: List[schemas.AIEventCreate]) -> schemas.AIEventBatchResponse:
+def ingest_batch(db: Session, events: List[schemas.AIEventCreate], record_arrivals: bool = True) -> schemas.AIEventBatchResponse:
     """
     Batch ingest multiple events with atomic-per-event error handling.
     
     **Batch Processing Strategy**:
-    This function processes events sequentially, maintaining granular error tracking.
-    Each event is independently evaluated for duplicates and validation errors,
-    allowing partial success (e.g., 50 new events ingested, 10 duplicates skipped, 5 errors logged).
+    Events are processed as a set (see `ingest_many`): IDs are validated once per
+    batch, duplicates are found with one query, and all new rows are inserted in a
+    single transaction. Each event still gets its own outcome, allowing partial
+    success (e.g., 50 new events ingested, 10 duplicates skipped, 5 errors logged).
     
     **Use Case**:
     When edge devices batch-upload events (e.g., 100 events collected over 1 hour),
@@ -100,8 +159,8 @@ def ingest_batch(db: Session, events: List[schemas.AIEventCreate]) -> schemas.AI
       - errors: list of error messages for debugging
     
     **Performance**:
-    O(n * m) where n = batch size, m = avg. dedup query time (~1ms per event).
-    For n=1000, expect ~1–2 seconds end-to-end including database writes.
+    A constant number of queries (4) and one commit per batch, independent of n.
+    For n=1000 this replaces ~5,000 round trips and 1,000 commits.
     
     **Example Response**:
     {
@@ -115,21 +174,18 @@ def ingest_batch(db: Session, events: List[schemas.AIEventCreate]) -> schemas.AI
       ]
     }
     """
-    success = 0
-    duplicate = 0
-    errors: List[str] = []
-
-    for ev in events:
-        try:
-            result = ingest_event(db, ev)
-            if result["duplicate"]:
-                duplicate += 1
-            else:
-                success += 1
-        except HTTPException as exc:  # validation issues
-            errors.append(f"{ev.worker_id}@{ev.workstation_id} {ev.timestamp}: {exc.detail}")
-        except Exception as exc:
-            errors.append(f"{ev.worker_id}@{ev.workstation_id} {ev.timestamp}: {str(exc)}")
+    return summarize_results(events, ingest_many(db, events, record_arrivals))
+
+
+def summarize_results(events: List[schemas.AIEventCreate], results: List[Dict[str, Any]]) -> schemas.AIEventBatchResponse:
+    """Aggregate per-event outcomes from `ingest_many` into a batch response."""
+    success = sum(1 for r in results if r["status"] == "created")
+    duplicate = sum(1 for r in results if r["status"] == "duplicate")
+    errors = [
+        f"{ev.worker_id}@{ev.workstation_id} {ev.timestamp}: {r['detail']}"
+        for ev, r in zip(events, results)
+        if r["status"] == "error"
+    ]
 
     return schemas.AIEventBatchResponse(
         success_count=success,
@@ -139,6 +195,125 @@ def ingest_batch(db: Session, events: List[schemas.AIEventCreate]) -> schemas.AI
     )
 
 
+def ingest_many(db: Session, events: List[schemas.AIEventCreate], record_arrivals: bool = True) -> List[Dict[str, Any]]:
+    """
+    Set-based ingestion returning one outcome per input event, in input order.
+
+    **Steps** (constant number of round trips regardless of batch size):
+    1. Validate all referenced worker and workstation IDs against the in-memory
+       registry (a query only for IDs it has not seen).
+    2. Drop duplicates inside the batch (first occurrence wins).
+    3. Ask the recent-key filter (see dedup_service) which keys are new; look up
+       only the possibly-stored ones, in one range query.
+    4. Insert the remaining events in one statement, fold them into the state
+       rollups, commit once, invalidate cached metrics, and feed the
+       model-health tracker and the ingest watermarks (record_arrivals=False,
+       for seed data, advances the marks without counting late arrivals).
+
+    **Returns**:
+    - List of {"status": "created" | "duplicate" | "error", "detail": Optional[str]};
+      errors also carry "code" (404 unknown worker/workstation, 409 archived range,
+      500 storage failure) and "reason" ("unknown_worker", "unknown_workstation",
+      "archived", "storage_error")
+    """
+    results: List[Dict[str, Any]] = [{"status": "error", "detail": None} for _ in events]
+    if not events:
+        return results
+
+    known_workers = registry.known_worker_ids(db, {e.worker_id for e in events})
+    known_stations = registry.known_workstation_ids(db, {e.workstation_id for e in events})
+    horizon = archive.horizon(db)
+
+    candidates: Dict[crud.EventKey, int] = {}
+    for i, ev in enumerate(events):
+        if ev.worker_id not in known_workers:
+            results[i] = {"status": "error", "detail": f"Worker {ev.worker_id} not found. Seed data first.", "code": 404, "reason": "unknown_worker"}
+            continue
+        if ev.workstation_id not in known_stations:
+            results[i] = {"status": "error", "detail": f"Workstation {ev.workstation_id} not found. Seed data first.", "code": 404, "reason": "unknown_workstation"}
+            continue
+        if horizon is not None and ev.timestamp.replace(tzinfo=None) < horizon:
+            results[i] = {"status": "error", "detail": _archived_detail(db, ev.timestamp), "code": 409, "reason": "archived"}
+            continue
+        key = crud.event_key(ev.timestamp, ev.worker_id, ev.event_type)
+        if key in candidates:
+            results[i] = {"status": "duplicate", "detail": None}
+            continue
+        candidates[key] = i
+
+    try:
+        statuses = recent_keys.check(db, candidates.keys())
+        for key, status in statuses.items():
+            if status == dedup_service.SEEN:
+                results[candidates.pop(key)] = {"status": "duplicate", "detail": None}
+        lookup = [events[candidates[key]] for key, status in statuses.items() if status == dedup_service.MAYBE]
+        existing = crud.get_existing_event_keys(db, lookup)
+        recent_keys.record_false_positives(len(lookup) - len(existing))
+        for key in existing:
+            results[candidates.pop(key)] = {"status": "duplicate", "detail": None}
+
+        watermarks.ensure_loaded(db)  # before the insert, so the marks do not include the batch
+        inserted = crud.bulk_create_ai_events(db, [events[i] for i in candidates.values()])
+        stored = [events[i] for key, i in candidates.items() if key in inserted]
+        arrivals = rollup_service.apply_events(db, stored)
+        if inserted:
+            cache_service.bump_generation(db)
+        db.commit()
+        if inserted:
+            recent_keys.add(inserted)
+            health_service.tracker.observe(stored)
+            watermarks.observe(arrivals, count=record_arrivals)
+    except Exception as exc:
+        db.rollback()
+        logger.error(f"Bulk event ingestion failed: {exc}")
+        for i in candidates.values():
+            results[i] = {"status": "error", "detail": str(exc), "code": 500, "reason": "storage_error"}
+        telemetry_service.record_ingest(results)
+        return results
+
+    for key, i in candidates.items():
+        results[i] = {"status": "created" if key in inserted else "duplicate", "detail": None}
+    telemetry_service.record_ingest(results)
+    return results
+
+
+# ========================================
+# Async entry points
+# ========================================
+
+async def _run(db: Union[Session, "AsyncSession"], fn, *args):
+    """
+    Run a sync service function without blocking the event loop.
+
+    With an AsyncSession (DATABASE_ASYNC=true) the function runs through
+    `AsyncSession.run_sync`, so every query and commit it issues is awaited on
+    the async driver. With a regular Session it runs in the threadpool.
+    """
+    if AsyncSession is not None and isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args)
+    return await run_in_threadpool(fn, db, *args)
+
+
+async def ingest_event_async(db: Union[Session, "AsyncSession"], event: schemas.AIEventCreate) -> Dict[str, Any]:
+    """Async counterpart of `ingest_event`, for `async def` endpoints."""
+    return await _run(db, ingest_event, event)
+
+
+async def ingest_batch_async(db: Union[Session, "AsyncSession"], events: List[schemas.AIEventCreate]) -> schemas.AIEventBatchResponse:
+    """Async counterpart of `ingest_batch`, for `async def` endpoints."""
+    return await _run(db, ingest_batch, events)
+
+
+async def ingest_many_async(db: Union[Session, "AsyncSession"], events: List[schemas.AIEventCreate]) -> List[Dict[str, Any]]:
+    """Async counterpart of `ingest_many`, for `async def` endpoints."""
+    return await _run(db, ingest_many, events)
+
+
+async def lookup_event_async(db: Union[Session, "AsyncSession"], event: schemas.AIEventCreate):
+    """Stored event with the same dedup key as `event`, or None."""
+    return await _run(db, crud.get_event_by_identity, event.timestamp, event.worker_id, event.event_type)
+
+
 def fetch_events(
     db: Session,
     worker_id: Optional[str] = None,
@@ -147,9 +322,96 @@ def fetch_events(
     end_time: Optional[datetime] = None,
     limit: int = 1000,
     chronological: bool = False,
+    before: Optional[Tuple[datetime, int]] = None,
 ):
-    """Wrapper to fetch events with optional chronological order."""
-    events = crud.get_events(db, worker_id, workstation_id, start_time, end_time, limit)
+    """
+    Event rows (EXPORT_COLUMNS order) newest first, or oldest first with
+    `chronological`; `before` is a (timestamp, id) keyset as in crud.get_events.
+
+    A page that runs out of stored events continues into the archive, newest
+    partition first, reading only partitions that overlap the filters.
+    """
+    events = crud.get_event_rows(db, worker_id, workstation_id, start_time, end_time, limit, before)
+    if len(events) < limit and archive.horizon(db) is not None:
+        for chunk in archive.partition_chunks(
+            db, start_time, end_time, worker_id=worker_id, workstation_id=workstation_id, newest_first=True
+        ):
+            older = sorted(chunk, key=lambda e: (e.timestamp, e.id), reverse=True)
+            if before:
+                older = [e for e in older if (e.timestamp, e.id) < before]
+            events.extend(older[: limit - len(events)])
+            if len(events) >= limit:
+                break
     if chronological:
-        return list(reversed(events))  # crud returns newest first
+        return list(reversed(events))  # newest first above
     return events
+
+
+# ========================================
+# Pagination & export
+# ========================================
+
+EXPORT_COLUMNS = ["id", "timestamp", "worker_id", "workstation_id", "event_type", "confidence", "count", "created_at"]
+EXPORT_FLUSH_ROWS = 1000  # Rows per chunk written to the response
+
+
+def encode_cursor(event) -> str:
+    """Opaque keyset cursor pointing after `event` (anything with timestamp and id)."""
+    raw = f"{event.timestamp.isoformat()}|{event.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of `encode_cursor`; raises HTTPException(400) for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, event_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(event_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def export_events(
+    fmt: str,
+    worker_id: Optional[str] = None,
+    workstation_id: Optional[str] = None,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+) -> Iterator[str]:
+    """
+    Yield matching events as NDJSON lines or CSV (with header), oldest first.
+
+    Rows come from a server-side cursor and are written in chunks of
+    EXPORT_FLUSH_ROWS, so memory does not grow with the export size. Archived
+    partitions in range are read one at a time before the stored rows. The
+    generator owns its session because it outlives the request's dependencies.
+    """
+    db = SessionLocal()
+    try:
+        archived = (
+            row
+            for chunk in archive.partition_chunks(db, start_time, end_time, worker_id=worker_id, workstation_id=workstation_id)
+            for row in sorted(chunk, key=lambda e: (e.timestamp, e.id))
+        )
+        rows = itertools.chain(archived, crud.stream_event_rows(db, worker_id, workstation_id, start_time, end_time))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if fmt == "csv" else None
+        if writer is not None:
+            writer.writerow(EXPORT_COLUMNS)
+
+        for n, row in enumerate(rows, 1):
+            values = [v.isoformat() if isinstance(v, datetime) else v for v in row]
+            if writer is not None:
+                writer.writerow(values)
+            else:
+                buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, values)), separators=(",", ":")))
+                buffer.write("\n")
+            if n % EXPORT_FLUSH_ROWS == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        db.close()
@@ -0,0 +1,312 @@
+"""
+High-volume synthetic data generator.
+
+Produces the same shop-floor patterns as the admin seed (lunch dip at 13:00,
+slow start 06:00-06:30, product_count only while working) at any scale, and
+writes them as plain rows straight into chunked multi-row inserts: no
+Pydantic model per event, no per-batch dedup lookup or rollup fold. Rollups
+are rebuilt once at the end and the in-memory services reloaded.
+
+Each worker draws from its own RNG seeded with (seed, worker id), so the
+output is identical however the workers are split across processes.
+
+    python -m app.services.generator_service --workers 1000 --days 30 --processes 4 --clear
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..config import settings
+from ..seed_data import WORKERS_DATA, WORKSTATIONS_DATA
+from . import cache_service, health_service, rollup_service
+from .dedup_service import recent_keys
+from .registry_service import registry
+from .watermark_service import watermarks
+
+logger = logging.getLogger(__name__)
+
+SHIFTS = ("morning", "evening", "night")
+DEPARTMENTS = ("Assembly", "Quality Control", "Packaging")
+STATION_TYPES = ("assembly", "inspection", "packaging")
+INSERT_CHUNK_ROWS = 20_000  # Rows per INSERT ... VALUES executemany and per commit
+
+# (timestamp, worker_id, workstation_id, event_type, confidence, count)
+Row = Tuple[datetime, str, str, str, float, int]
+EVENT_COLUMNS = ("timestamp", "worker_id", "workstation_id", "event_type", "confidence", "count")
+
+
+@dataclass
+class GeneratorSpec:
+    """Scale of a generated data set."""
+    workers: int = 6
+    workstations: int = 6
+    hours: float = 24
+    interval_minutes: int = 5  # One state observation per worker per interval
+    seed: Optional[int] = None  # None = different data on every run
+    end: Optional[datetime] = None  # Newest interval boundary; defaults to now (UTC)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# ========================================
+# Patterns
+# ========================================
+
+def next_state(rng, previous: str, is_lunch_break: bool, is_slow_start: bool) -> str:
+    """Next worker state for one interval (shared with seed_service.admin_seed)."""
+    roll = rng.random()
+    # Lunch break overrides all - everyone goes absent/idle
+    if is_lunch_break:
+        return "absent" if roll < 0.7 else "idle"
+    # Slow start - reduced productivity, more idle time
+    if is_slow_start:
+        if previous == "absent":
+            return "idle" if roll < 0.6 else "working"
+        return "idle" if roll < 0.5 else "working"
+    # Normal operation - weighted state transitions
+    if previous == "absent":
+        return "working" if roll < 0.8 else "idle"
+    if roll < 0.65:
+        return "working"
+    if roll < 0.9:
+        return "idle"
+    return "absent"
+
+
+def product_count(rng, is_slow_start: bool) -> Optional[int]:
+    """Units finished in a working interval, or None when nothing was produced."""
+    production_chance = 0.3 if is_slow_start else 0.6
+    if rng.random() < production_chance:
+        return rng.randint(1, 2 if is_slow_start else 3)
+    return None
+
+
+def worker_ids(spec: GeneratorSpec) -> List[str]:
+    return [f"W{i}" for i in range(1, spec.workers + 1)]
+
+
+def worker_rows(spec: GeneratorSpec) -> List[Dict[str, Any]]:
+    """The six demo workers first, then generated ones."""
+    rows = [dict(w) for w in WORKERS_DATA[: spec.workers]]
+    for i in range(len(rows) + 1, spec.workers + 1):
+        rows.append({
+            "id": f"W{i}", "name": f"Worker {i}",
+            "shift": SHIFTS[i % len(SHIFTS)], "department": DEPARTMENTS[i % len(DEPARTMENTS)],
+        })
+    return rows
+
+
+def workstation_rows(spec: GeneratorSpec) -> List[Dict[str, Any]]:
+    """The six demo workstations first, then generated ones."""
+    rows = [dict(s) for s in WORKSTATIONS_DATA[: spec.workstations]]
+    for i in range(len(rows) + 1, spec.workstations + 1):
+        rows.append({
+            "id": f"S{i}", "name": f"Station {i}",
+            "location": f"Floor {chr(65 + i % 4)}", "type": STATION_TYPES[i % len(STATION_TYPES)],
+        })
+    return rows
+
+
+def generate_rows(spec: GeneratorSpec, workers: List[str]) -> Iterator[Row]:
+    """Events of `workers` over the spec's window, worker by worker, oldest first."""
+    end = spec.end or datetime.utcnow()
+    step = timedelta(minutes=spec.interval_minutes)
+    total_intervals = int(spec.hours * 60 / spec.interval_minutes)
+    grid = []
+    for i in range(total_intervals):
+        ts = end - step * (total_intervals - i)
+        # "Lunch Dip" - 45min break at 13:00; "Slow Start" - first 30min of the 06:00 shift
+        grid.append((ts, ts.hour == 13 and ts.minute < 45, ts.hour == 6 and ts.minute < 30))
+
+    for worker_id in workers:
+        number = int(worker_id[1:])
+        rng = random.Random(f"{spec.seed}:{worker_id}") if spec.seed is not None else random.Random()
+        station_id = f"S{(number - 1) % spec.workstations + 1}"
+        state = "absent"
+        for ts, is_lunch_break, is_slow_start in grid:
+            state = next_state(rng, state, is_lunch_break, is_slow_start)
+            yield ts, worker_id, station_id, state, round(rng.uniform(0.88, 0.99), 3), 1
+            # product_count ONLY during 'working'
+            if state == "working" and not is_lunch_break:
+                units = product_count(rng, is_slow_start)
+                if units is not None:
+                    yield ts, worker_id, station_id, "product_count", round(rng.uniform(0.9, 0.99), 3), units
+
+
+# ========================================
+# Writing
+# ========================================
+
+def _insert_statement(dialect: str):
+    """Multi-row event insert that skips keys already stored (SQLite / PostgreSQL)."""
+    table = models.AIEvent.__table__
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        return dialect_insert(table).on_conflict_do_nothing(index_elements=["timestamp", "worker_id", "event_type"])
+    return insert(table)
+
+
+def _insert_chunk(connection, stmt, chunk: List[Dict[str, Any]]) -> int:
+    """Execute one multi-row insert; returns the rows inserted (keys already stored are skipped)."""
+    dialect = connection.dialect
+    if dialect.supports_sane_multi_rowcount:
+        return connection.execute(stmt, chunk).rowcount
+    if dialect.insert_executemany_returning:
+        # psycopg2 reports no rowcount for executemany; count the returned ids instead
+        return len(connection.execute(stmt.returning(models.AIEvent.__table__.c.id), chunk).all())
+    connection.execute(stmt, chunk)
+    return len(chunk)  # plain INSERT: a stored key raises instead of being skipped
+
+
+def write_rows(connection, rows: Iterator[Row], chunk_rows: int = INSERT_CHUNK_ROWS) -> Tuple[int, int]:
+    """Insert `rows` in chunks, committing after each. Returns (rows submitted, rows inserted)."""
+    stmt = _insert_statement(connection.dialect.name)
+    created_at = datetime.utcnow()
+    submitted = inserted = 0
+    chunk: List[Dict[str, Any]] = []
+    for row in rows:
+        values = dict(zip(EVENT_COLUMNS, row))
+        values["created_at"] = created_at
+        chunk.append(values)
+        if len(chunk) >= chunk_rows:
+            inserted += _insert_chunk(connection, stmt, chunk)
+            connection.commit()
+            submitted += len(chunk)
+            chunk = []
+    if chunk:
+        inserted += _insert_chunk(connection, stmt, chunk)
+        connection.commit()
+        submitted += len(chunk)
+    return submitted, inserted
+
+
+def _write_partition(url: str, spec: GeneratorSpec, workers: List[str]) -> Tuple[int, int]:
+    """Process-pool entry point: generate and write one range of workers."""
+    connect_args = {"timeout": 300} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    try:
+        with engine.connect() as connection:
+            return write_rows(connection, generate_rows(spec, workers))
+    finally:
+        engine.dispose()
+
+
+def ensure_entities(db: Session, spec: GeneratorSpec) -> Tuple[int, int]:
+    """Insert missing workers and workstations in bulk. Returns (workers, workstations) created."""
+    created = []
+    for model, rows in ((models.Worker, worker_rows(spec)), (models.Workstation, workstation_rows(spec))):
+        existing = set(db.scalars(select(model.id)))
+        missing = [row for row in rows if row["id"] not in existing]
+        if missing:
+            db.execute(insert(model), missing)
+        created.append(len(missing))
+    db.commit()
+    return created[0], created[1]
+
+
+def bulk_generate(db: Session, spec: GeneratorSpec, processes: int = 1) -> Dict[str, Any]:
+    """
+    Generate and store `spec`'s data set, then rebuild rollups and reload the
+    in-memory services.
+
+    With processes > 1 the workers are split into contiguous ranges, each
+    generated and written by its own process over its own connection
+    (on SQLite the writes still serialize on the database lock; the
+    generation runs in parallel).
+
+    Returns counts and timings; `events_submitted` includes the rows skipped
+    as already stored, `events_created` only the rows inserted.
+    """
+    started = time.perf_counter()
+    workers_created, workstations_created = ensure_entities(db, spec)
+    ids = worker_ids(spec)
+
+    processes = max(1, min(processes, len(ids)))
+    if processes == 1:
+        with db.get_bind().connect() as connection:
+            submitted, inserted = write_rows(connection, generate_rows(spec, ids))
+    else:
+        url = db.get_bind().url.render_as_string(hide_password=False)
+        size = -(-len(ids) // processes)
+        spec = GeneratorSpec(**{**spec.as_dict(), "end": spec.end or datetime.utcnow()})  # one grid for all
+        # spawn, not fork: the API process has threads (and possibly held locks)
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [pool.submit(_write_partition, url, spec, ids[i:i + size]) for i in range(0, len(ids), size)]
+            counts = [f.result() for f in futures]
+        submitted, inserted = sum(c[0] for c in counts), sum(c[1] for c in counts)
+    written_seconds = time.perf_counter() - started
+    logger.info(
+        f"Bulk generator wrote {inserted} of {submitted} events for {len(ids)} workers in {written_seconds:.1f}s; rebuilding rollups"
+    )
+
+    rollup_service.rebuild(db)
+    cache_service.bump_generation(db)
+    db.commit()
+    registry.load(db)
+    recent_keys.load(db)
+    health_service.tracker.load(db)
+    watermarks.load(db)
+
+    return {
+        "workers_created": workers_created,
+        "workstations_created": workstations_created,
+        "events_submitted": submitted,
+        "events_created": inserted,
+        "write_seconds": round(written_seconds, 3),
+        "total_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    defaults = GeneratorSpec()
+    parser = argparse.ArgumentParser(description="Bulk-generate realistic factory data into DATABASE_URL")
+    parser.add_argument("--workers", type=int, default=defaults.workers)
+    parser.add_argument("--workstations", type=int, default=defaults.workstations)
+    parser.add_argument("--days", type=float, default=None, help="Shorthand for --hours days*24")
+    parser.add_argument("--hours", type=float, default=defaults.hours)
+    parser.add_argument("--interval-minutes", type=int, default=defaults.interval_minutes)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--clear", action="store_true", help="Delete all existing events, workers and workstations first")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=getattr(logging, settings.log_level))
+    from ..bootstrap import init_schema
+    from ..database import SessionLocal
+    from ..seed_data import clear_all_data
+
+    init_schema()
+    spec = GeneratorSpec(
+        workers=args.workers,
+        workstations=args.workstations,
+        hours=args.days * 24 if args.days is not None else args.hours,
+        interval_minutes=args.interval_minutes,
+        seed=args.seed,
+    )
+    db = SessionLocal()
+    try:
+        if args.clear:
+            clear_all_data(db)
+        result = bulk_generate(db, spec, args.processes)
+    finally:
+        db.close()
+    logger.info(f"Bulk generation complete: {result}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
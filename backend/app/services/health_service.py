@@ -0,0 +1,198 @@
+"""
+Incremental model-health tracker.
+
+Confidence statistics are maintained at ingest time instead of re-reading the
+newest events on every request. One `ConfidenceStats` is kept globally, per
+workstation (camera) and per worker:
+
+- a ring buffer of the last `health_window` confidences with a running sum and
+  sum of squares (window mean / standard deviation in O(1))
+- an EWMA of the confidence (`health_ewma_alpha`), which reacts to a drop
+  within a few dozen events
+
+Drift is judged per entity against its peers: an entity is flagged when its
+window average is below the warning threshold, or when its EWMA sits more than
+`health_drift_z` standard errors below the average of the other entities of
+the same kind. The noise used for that standard error is the pooled
+within-entity variance, so one drifting camera does not widen the band it is
+compared against (as it would with the global spread).
+
+The tracker is per process and warms itself from the newest stored events on
+first use; `events_service` feeds it after each commit and the clear paths
+reset it. Under `uvicorn --workers N` the other processes' ingests reach it
+by a reload from the database, at most every `health_reload_seconds` and only
+once the shared data generation has moved since the last load.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from .. import crud
+from ..config import settings
+from . import cache_service
+
+# Global status thresholds on the window average confidence
+WARNING_CONFIDENCE = 0.75
+CAUTION_CONFIDENCE = 0.85
+
+SCOPES = ("workstation", "worker")
+
+
+class ConfidenceStats:
+    """Ring-buffer window statistics plus an EWMA for one entity."""
+
+    __slots__ = ("window", "total", "total_sq", "ewma")
+
+    def __init__(self, size: int):
+        self.window: deque = deque(maxlen=size)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.ewma: Optional[float] = None
+
+    def add(self, value: float, alpha: float) -> None:
+        if len(self.window) == self.window.maxlen:
+            oldest = self.window[0]
+            self.total -= oldest
+            self.total_sq -= oldest * oldest
+        self.window.append(value)
+        self.total += value
+        self.total_sq += value * value
+        self.ewma = value if self.ewma is None else self.ewma + alpha * (value - self.ewma)
+
+    @property
+    def samples(self) -> int:
+        return len(self.window)
+
+    @property
+    def mean(self) -> float:
+        return self.total / len(self.window) if self.window else 0.0
+
+    @property
+    def variance(self) -> float:
+        n = len(self.window)
+        if n < 2:
+            return 0.0
+        return max((self.total_sq - self.total * self.total / n) / (n - 1), 0.0)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "avg_confidence": round(self.mean, 4),
+            "ewma_confidence": round(self.ewma or 0.0, 4),
+            "std_confidence": round(math.sqrt(self.variance), 4),
+            "samples": self.samples,
+        }
+
+
+class ModelHealthTracker:
+    """Global, per-workstation and per-worker confidence statistics."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._generation = -1
+        self._reset()
+
+    def _reset(self) -> None:
+        self.overall = ConfidenceStats(settings.health_window)
+        self.entities: Dict[str, Dict[str, ConfidenceStats]] = {scope: {} for scope in SCOPES}
+
+    def _add(self, worker_id: str, workstation_id: str, confidence: float) -> None:
+        alpha = settings.health_ewma_alpha
+        self.overall.add(confidence, alpha)
+        for scope, entity_id in (("workstation", workstation_id), ("worker", worker_id)):
+            stats = self.entities[scope].get(entity_id)
+            if stats is None:
+                stats = self.entities[scope][entity_id] = ConfidenceStats(settings.health_window)
+            stats.add(confidence, alpha)
+
+    def load(self, db: Session) -> None:
+        """Rebuild from the newest `health_window` stored events of every entity."""
+        window = settings.health_window
+        alpha = settings.health_ewma_alpha
+        generation = cache_service.current_generation()  # before the reads: a change meanwhile reloads again
+        overall = crud.get_recent_confidences(db, None, window)
+        per_scope = {
+            "workstation": crud.get_recent_confidences(db, "workstation_id", window),
+            "worker": crud.get_recent_confidences(db, "worker_id", window),
+        }
+        with self._lock:
+            self._reset()
+            for _, confidence in overall:
+                self.overall.add(float(confidence), alpha)
+            for scope, rows in per_scope.items():
+                for entity_id, confidence in rows:
+                    stats = self.entities[scope].get(entity_id)
+                    if stats is None:
+                        stats = self.entities[scope][entity_id] = ConfidenceStats(window)
+                    stats.add(float(confidence), alpha)
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+            self._generation = generation
+
+    def ensure_loaded(self, db: Session) -> None:
+        """Load on first use, and reload when data changed (possibly in another process) since an old load."""
+        if not self._loaded:
+            self.load(db)
+        elif time.monotonic() - self._loaded_at >= settings.health_reload_seconds and cache_service.current_generation() != self._generation:
+            self.load(db)
+
+    def observe(self, events: Iterable) -> None:
+        """Fold newly stored events (anything with worker_id, workstation_id, confidence) in."""
+        with self._lock:
+            if not self._loaded:
+                return  # the first load reads them from the database
+            for event in events:
+                self._add(event.worker_id, event.workstation_id, float(event.confidence))
+
+    def reset(self) -> None:
+        """Forget everything; the next read reloads from the database."""
+        with self._lock:
+            self._reset()
+            self._loaded = False
+
+    def _drifting(self, scope: str) -> List[Dict[str, Any]]:
+        alpha = settings.health_ewma_alpha
+        eligible = {
+            entity_id: stats for entity_id, stats in self.entities[scope].items()
+            if stats.samples >= settings.health_min_samples
+        }
+        pooled_var = (
+            sum(stats.variance for stats in eligible.values()) / len(eligible) if eligible else 0.0
+        )
+        # Standard deviation of an EWMA of independent samples
+        ewma_std = math.sqrt(pooled_var * alpha / (2 - alpha))
+
+        means_total = sum(stats.mean for stats in eligible.values())
+        flagged = []
+        for entity_id, stats in sorted(eligible.items()):
+            z_score = None
+            if len(eligible) > 1 and ewma_std > 0:
+                peer_mean = (means_total - stats.mean) / (len(eligible) - 1)
+                z_score = (stats.ewma - peer_mean) / ewma_std
+            below_peers = z_score is not None and z_score <= -settings.health_drift_z
+            if stats.mean < WARNING_CONFIDENCE or below_peers:
+                flagged.append({
+                    "scope": scope,
+                    "id": entity_id,
+                    **stats.summary(),
+                    "z_score": round(z_score, 2) if z_score is not None else None,
+                })
+        return flagged
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "overall": self.overall.summary(),
+                "workstations": {k: s.summary() for k, s in sorted(self.entities["workstation"].items())},
+                "workers": {k: s.summary() for k, s in sorted(self.entities["worker"].items())},
+                "drifting": [entry for scope in SCOPES for entry in self._drifting(scope)],
+            }
+
+
+tracker = ModelHealthTracker()
@@ -3,83 +3,149 @@ Metrics service layer.
 
 Calculates worker, workstation, and factory metrics using chronological event ordering
 so out-of-order arrivals are handled correctly.
+
+Windows are answered from the minute/hour/day state rollups (see rollup_service);
+setting `metrics_use_rollups=False` falls back to one raw scan per request, reduced
+by the columnar duration kernel (see duration_kernel).
+Factory metrics and `metrics_summary` build worker, workstation and factory
+aggregates from a single shared pass over the window.
+Public entry points record their compute time (see telemetry_service.timed).
 """
 
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict
+import itertools
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional, Dict, Sequence
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-
-from .. import crud, models, schemas
-
-
-def _compute_durations(events: List[models.AIEvent], window_start: Optional[datetime], window_end: Optional[datetime]):
-    """
-    Compute time spent in each state (working, idle, absent) for a worker within a time window.
-    
-    **Algorithm**: State Machine with Chronological Ordering
-    
-    **Key Innovation**: Handles out-of-order event arrivals by sorting by event.timestamp
-    before calculating state transitions. This ensures deterministic results even if
-    events arrive late due to network delays.
-    
-    **Mathematical Formula**:
-    For each state S and time window [start, end]:
-      hours[S] = Σ(transition_i+1.time - transition_i.time) where state[i] = S
-    
-    **Example**:
-    Events (unsorted arrival):
-      Event 1: 14:30:00 working   (arrived at 14:30:05)
-      Event 2: 14:20:00 idle      (arrived at 14:35:00, out-of-order!)
-      Event 3: 14:40:00 working   (arrived at 14:40:10)
-    
-    After sorting by timestamp:
-      Event 2: 14:20:00 idle      → idle duration = (14:30:00 - 14:20:00) = 10 min
-      Event 1: 14:30:00 working   → working duration = (14:40:00 - 14:30:00) = 10 min
-      Event 3: 14:40:00 working   → working duration from 14:40:00 → now
-    
-    **Design Rationale**:
-    - Sorting is O(n log n), but ensures correct accounting even with network jitter
-    - Tail state (last event to window_end) assumes worker remains in that state
-    - Edges: if window_start > oldest_event, only count time after window_start
-    
-    **Parameters**:
-    - events: List of AIEvent objects for one worker
-    - window_start: Metric calculation start time (None = use earliest event)
-    - window_end: Metric calculation end time (None = now)
-    
-    **Returns**:
-    - (durations_dict, actual_start, actual_end)
-      - durations_dict: {"working": 7.2, "idle": 0.5, "absent": 0.0, "product_count": 0}
-      - actual_start, actual_end: Normalized window after applying events
+from sqlalchemy import func, select, union_all
+from fastapi import HTTPException
+
+from .. import models, schemas
+from ..config import settings
+from ..database import read_snapshot
+from . import duration_kernel, health_service, rollup_service
+from .archive_service import archive
+from .telemetry_service import timed
+from .registry_service import registry
+
+# Rows fetched per round trip when scanning raw events.
+STREAM_CHUNK_SIZE = 5000
+# Largest heatmap grid (7 days of 5-minute buckets)
+HEATMAP_MAX_BUCKETS = 2016
+
+TIMELINE_COLUMNS = {"worker": models.AIEvent.worker_id, "workstation": models.AIEvent.workstation_id}
+
+# /api/metrics/aggregate dimensions: name -> dimension table column
+AGGREGATE_DIMENSIONS = {
+    "department": models.Worker.department,
+    "shift": models.Worker.shift,
+    "location": models.Workstation.location,
+    "type": models.Workstation.type,
+}
+WORKSTATION_DIMENSIONS = ("location", "type")
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Normalize query datetimes to the naive UTC form stored in the database."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@timed
+def scan_window_totals(
+    db: Session,
+    timelines: Sequence[str],
+    entity_id: Optional[str],
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    span_end: datetime,
+) -> Dict[str, Dict[str, rollup_service.WindowTotals]]:
     """
-    if not events:
-        return {"working": 0.0, "idle": 0.0, "absent": 0.0, "product_count": 0.0}, window_start, window_end
+    Window totals per entity of each timeline from one raw scan, via the columnar kernel.
 
-    ordered = sorted(events, key=lambda e: e.timestamp)
-    start = window_start or ordered[0].timestamp
-    end = window_end or datetime.utcnow()
-
-    durations = {"working": 0.0, "idle": 0.0, "absent": 0.0, "product_count": 0.0}
+    Events are read once as plain columns in timeline order (timestamp, then most
+    recently inserted first) and every requested timeline is computed from the
+    same columns. `entity_id` restricts a single timeline to one entity. Archived
+    events are read first when the window starts below the archive horizon.
+    """
+    stmt = select(
+        models.AIEvent.worker_id,
+        models.AIEvent.workstation_id,
+        models.AIEvent.timestamp,
+        models.AIEvent.event_type,
+        models.AIEvent.count,
+    )
+    if entity_id:
+        stmt = stmt.where(TIMELINE_COLUMNS[timelines[0]] == entity_id)
+    if start_time:
+        stmt = stmt.where(models.AIEvent.timestamp >= start_time)
+    if end_time:
+        stmt = stmt.where(models.AIEvent.timestamp <= end_time)
+    stmt = stmt.order_by(models.AIEvent.timestamp, models.AIEvent.id.desc())
+    rows = db.execute(stmt.execution_options(yield_per=STREAM_CHUNK_SIZE))
+
+    horizon = archive.horizon(db)
+    if horizon is not None and (start_time is None or start_time < horizon):
+        entity = {TIMELINE_COLUMNS[timelines[0]].key: entity_id} if entity_id else {}
+        archived = (
+            (r.worker_id, r.workstation_id, r.timestamp, r.event_type, r.count)
+            for chunk in archive.partition_chunks(db, start_time, end_time, **entity)
+            for r in chunk
+        )
+        rows = itertools.chain(archived, rows)  # archived events all precede the hot ones
+
+    to_micros, state_codes = duration_kernel.to_micros, duration_kernel.STATE_CODES
+    entity_ids: Dict[str, Dict[str, int]] = {timeline: {} for timeline in timelines}
+    entities: Dict[str, List[int]] = {timeline: [] for timeline in timelines}
+    timestamps: List[int] = []
+    states: List[int] = []
+    counts: List[int] = []
+    for worker_id, station_id, timestamp, event_type, count in rows:
+        for timeline, entity in (("worker", worker_id), ("workstation", station_id)):
+            if timeline in entity_ids:
+                index = entity_ids[timeline].setdefault(entity, len(entity_ids[timeline]))
+                entities[timeline].append(index)
+        timestamps.append(to_micros(timestamp))
+        states.append(state_codes[event_type])
+        counts.append(count)
+
+    window_start = to_micros(start_time) if start_time else None
+    results: Dict[str, Dict[str, rollup_service.WindowTotals]] = {}
+    for timeline, ids in entity_ids.items():
+        hours, units, first_us, last_us = duration_kernel.state_durations(
+            entities[timeline], timestamps, states, counts, len(ids), window_start, to_micros(span_end)
+        )
+        totals = results[timeline] = {}
+        for entity, i in ids.items():
+            entry = totals[entity] = rollup_service.WindowTotals()
+            for code, state in enumerate(duration_kernel.STATES[:3]):
+                entry.seconds[state] = float(hours[i][code]) * 3600
+            entry.add_facts(int(units[i]), duration_kernel.from_micros(first_us[i]), duration_kernel.from_micros(last_us[i]))
+    return results
 
-    prev_time = max(start, ordered[0].timestamp)
-    prev_state = ordered[0].event_type
 
-    for ev in ordered[1:]:
-        current_time = ev.timestamp
-        if current_time < prev_time:  # type: ignore
-            continue  # out-of-order safeguard
-        delta_hours = (current_time - prev_time).total_seconds() / 3600
-        durations[str(prev_state)] = durations.get(str(prev_state), 0.0) + max(delta_hours, 0.0)  # type: ignore
-        prev_time = current_time
-        prev_state = ev.event_type
+def _entity_totals(
+    db: Session,
+    timelines: Sequence[str],
+    entity_id: Optional[str],
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+):
+    """
+    Per-entity window totals (durations, units, first/last seen) for each timeline, and the window end.
 
-    tail_hours = (end - prev_time).total_seconds() / 3600
-    durations[str(prev_state)] = durations.get(str(prev_state), 0.0) + max(tail_hours, 0.0)  # type: ignore
+    Values come from the rollups, or from a raw ordered scan when rollups are
+    disabled; both expose the same attributes. Requesting several timelines
+    shares one pass over the window.
+    """
+    span_end = end_time or datetime.utcnow()
+    if settings.metrics_use_rollups:
+        return rollup_service.window_totals(db, timelines, start_time, span_end, entity_id), span_end
 
-    return durations, start, end
+    return scan_window_totals(db, timelines, entity_id, start_time, end_time, span_end), span_end
 
 
+@timed
 def worker_metrics(
     db: Session,
     worker_id: Optional[str] = None,
@@ -150,7 +216,13 @@ def worker_metrics(
       }
     ]
     """
-    workers = [crud.get_worker(db, worker_id)] if worker_id else crud.get_workers(db)
+    start_time, end_time = _naive_utc(start_time), _naive_utc(end_time)
+    workers = [registry.get_worker(db, worker_id)] if worker_id else registry.workers(db)
+    totals, span_end = _entity_totals(db, ("worker",), worker_id, start_time, end_time)
+    return _worker_results(workers, totals["worker"], start_time, span_end)
+
+
+def _worker_results(workers, totals: Dict[str, Any], start_time: Optional[datetime], span_end: datetime) -> List[schemas.WorkerMetrics]:
     results: List[schemas.WorkerMetrics] = []
 
     for worker in workers:
@@ -159,27 +231,24 @@ def worker_metrics(
         # Convert Column objects to Python types
         wid = str(worker.id)
         wname = str(worker.name)
-        
-        events = crud.get_events(db, worker_id=wid, start_time=start_time, end_time=end_time, limit=10000)
-        ordered_events = sorted(events, key=lambda e: e.timestamp)
-        durations, span_start, span_end = _compute_durations(ordered_events, start_time, end_time)
+
+        entry = totals.get(wid) or rollup_service.WindowTotals()
+        durations = entry.durations
         working_h = durations.get("working", 0.0)
         idle_h = durations.get("idle", 0.0)
-        
-        # Safe datetime comparison
-        if span_start and span_end:  # type: ignore
+
+        # Elapsed window runs from the requested start (or first event) to the end
+        span_start = start_time or entry.first_seen
+        if span_start:
             elapsed_h = max((span_end - span_start).total_seconds() / 3600, 0.0)
         else:
             elapsed_h = working_h + idle_h
-            
-        # Convert count to int and filter properly
-        total_units = sum(int(e.count) for e in events if str(e.event_type) == "product_count")  # type: ignore
+
+        total_units = entry.units
 
         utilization = (working_h / elapsed_h * 100) if elapsed_h > 0 else 0.0
         units_per_hour = (total_units / working_h) if working_h > 0 else 0.0
 
-        last_seen = ordered_events[-1].timestamp if ordered_events else None
-
         results.append(
             schemas.WorkerMetrics(
                 worker_id=wid,
@@ -189,20 +258,27 @@ def worker_metrics(
                 utilization_percentage=round(utilization, 2),
                 total_units_produced=total_units,
                 units_per_hour=round(units_per_hour, 2),
-                last_seen=last_seen,  # type: ignore
+                last_seen=entry.last_seen,
             )
         )
 
     return results
 
 
+@timed
 def workstation_metrics(
     db: Session,
     workstation_id: Optional[str] = None,
     start_time: Optional[datetime] = None,
     end_time: Optional[datetime] = None,
 ) -> List[schemas.WorkstationMetrics]:
-    stations = [crud.get_workstation(db, workstation_id)] if workstation_id else crud.get_workstations(db)
+    start_time, end_time = _naive_utc(start_time), _naive_utc(end_time)
+    stations = [registry.get_workstation(db, workstation_id)] if workstation_id else registry.workstations(db)
+    totals, span_end = _entity_totals(db, ("workstation",), workstation_id, start_time, end_time)
+    return _workstation_results(stations, totals["workstation"])
+
+
+def _workstation_results(stations, totals: Dict[str, Any]) -> List[schemas.WorkstationMetrics]:
     results: List[schemas.WorkstationMetrics] = []
 
     for station in stations:
@@ -211,20 +287,17 @@ def workstation_metrics(
         # Convert Column objects to Python types
         sid = str(station.id)
         sname = str(station.name)
-        
-        events = crud.get_events(db, workstation_id=sid, start_time=start_time, end_time=end_time, limit=10000)
-        ordered_events = sorted(events, key=lambda e: e.timestamp)
-        durations, span_start, span_end = _compute_durations(ordered_events, start_time, end_time)
+
+        entry = totals.get(sid) or rollup_service.WindowTotals()
+        durations = entry.durations
         working_h = durations.get("working", 0.0)
         idle_h = durations.get("idle", 0.0)
         occupancy = working_h + idle_h
-        
-        # Convert count to int and filter properly
-        total_units = sum(int(e.count) for e in events if str(e.event_type) == "product_count")  # type: ignore
+
+        total_units = entry.units
 
         utilization = (working_h / occupancy * 100) if occupancy > 0 else 0.0
         throughput = (total_units / occupancy) if occupancy > 0 else 0.0
-        last_activity = ordered_events[-1].timestamp if ordered_events else None
 
         results.append(
             schemas.WorkstationMetrics(
@@ -234,19 +307,51 @@ def workstation_metrics(
                 utilization_percentage=round(utilization, 2),
                 total_units_produced=total_units,
                 throughput_rate=round(throughput, 2),
-                last_activity=last_activity,  # type: ignore
+                last_activity=entry.last_seen,
             )
         )
 
     return results
 
 
+@timed
+def metrics_summary(
+    db: Session,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+) -> schemas.MetricsSummary:
+    """
+    Factory, worker and workstation metrics from one pass over the window.
+
+    Worker and workstation totals are built together (see `_entity_totals`), so
+    each event in the window is read once instead of once per endpoint.
+    """
+    window_start, window_end = _naive_utc(start_time), _naive_utc(end_time)
+    totals, span_end = _entity_totals(db, ("worker", "workstation"), None, window_start, window_end)
+    worker_stats = _worker_results(registry.workers(db), totals["worker"], window_start, span_end)
+    station_stats = _workstation_results(registry.workstations(db), totals["workstation"])
+    return schemas.MetricsSummary(
+        factory=_factory_result(worker_stats, station_stats, start_time, end_time),
+        workers=worker_stats,
+        workstations=station_stats,
+    )
+
+
+@timed
 def factory_metrics(
     db: Session,
     start_time: Optional[datetime] = None,
     end_time: Optional[datetime] = None,
 ) -> schemas.FactoryMetrics:
-    worker_stats = worker_metrics(db, start_time=start_time, end_time=end_time)
+    return metrics_summary(db, start_time, end_time).factory
+
+
+def _factory_result(
+    worker_stats: List[schemas.WorkerMetrics],
+    station_stats: List[schemas.WorkstationMetrics],
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+) -> schemas.FactoryMetrics:
     if not worker_stats:
         return schemas.FactoryMetrics(
             total_productive_time_hours=0.0,
@@ -269,7 +374,6 @@ def factory_metrics(
         if productive_workers else 0.0
     )
 
-    station_stats = workstation_metrics(db, start_time=start_time, end_time=end_time)
     active_stations = len([s for s in station_stats if s.last_activity])
 
     return schemas.FactoryMetrics(
@@ -284,26 +388,30 @@ def factory_metrics(
     )
 
 
+@timed
 def get_model_health_status(db: Session) -> Dict:
     """
     Monitor AI model health by analyzing confidence scores.
     
-    Detects potential model drift by tracking rolling average confidence
-    of the last 100 events. This directly addresses the assessment's
-    theoretical question about model drift detection.
+    Detects potential model drift from confidence statistics that the health
+    tracker maintains at ingest time (see health_service): a rolling window of
+    the last `health_window` events plus an EWMA, overall and per workstation
+    (camera) and worker. Answers without querying events once the tracker is warm.
     
     Returns:
-        - status: "Healthy" or "Warning"
+        - status: "Healthy", "Caution" or "Warning"
         - message: Explanation of the status
         - avg_confidence: Rolling average confidence score
         - samples: Number of events analyzed
+        - ewma_confidence / std_confidence: Overall EWMA and window spread
+        - drifting: Workstations / workers whose confidence is drifting
+        - workstations / workers: Per-entity statistics
     """
-    # Get last 100 events ordered by timestamp
-    recent_events = db.query(models.AIEvent).order_by(
-        models.AIEvent.timestamp.desc()
-    ).limit(100).all()
+    health_service.tracker.ensure_loaded(db)
+    snapshot = health_service.tracker.snapshot()
+    overall = snapshot["overall"]
     
-    if not recent_events:
+    if not overall["samples"]:
         return {
             "status": "Unknown",
             "message": "No events available for analysis",
@@ -311,91 +419,398 @@ def get_model_health_status(db: Session) -> Dict:
             "samples": 0
         }
     
-    # Calculate average confidence - convert to float for proper comparison
-    avg_conf = float(sum(float(e.confidence) for e in recent_events) / len(recent_events))  # type: ignore
+    details = {
+        "ewma_confidence": overall["ewma_confidence"],
+        "std_confidence": overall["std_confidence"],
+        "drifting": snapshot["drifting"],
+        "workstations": snapshot["workstations"],
+        "workers": snapshot["workers"],
+    }
+    avg_conf = overall["avg_confidence"]
     
     # Detect drift: If average confidence drops below 0.75, model may be drifting
-    if avg_conf < 0.75:
+    if avg_conf < health_service.WARNING_CONFIDENCE:
         return {
             "status": "Warning",
             "message": "Low Confidence Detected: Potential Model Drift",
-            "avg_confidence": round(avg_conf, 4),
-            "samples": len(recent_events),
-            "recommendation": "Consider retraining the model or reviewing recent camera conditions"
+            "avg_confidence": avg_conf,
+            "samples": overall["samples"],
+            "recommendation": "Consider retraining the model or reviewing recent camera conditions",
+            **details,
+        }
+    # A single camera or worker can drift while the global average still looks fine
+    if snapshot["drifting"]:
+        names = ", ".join(f"{entry['scope']} {entry['id']}" for entry in snapshot["drifting"])
+        return {
+            "status": "Warning",
+            "message": f"Confidence drift detected on {names}",
+            "avg_confidence": avg_conf,
+            "samples": overall["samples"],
+            "recommendation": "Review camera conditions (lighting, position, lens) at the flagged stations",
+            **details,
         }
-    elif avg_conf < 0.85:
+    elif avg_conf < health_service.CAUTION_CONFIDENCE:
         return {
             "status": "Caution",
             "message": "Confidence slightly below optimal threshold",
-            "avg_confidence": round(avg_conf, 4),
-            "samples": len(recent_events)
+            "avg_confidence": avg_conf,
+            "samples": overall["samples"],
+            **details,
         }
     
     return {
         "status": "Healthy",
         "message": "Model confidence is within acceptable range",
-        "avg_confidence": round(avg_conf, 4),
-        "samples": len(recent_events)
+        "avg_confidence": avg_conf,
+        "samples": overall["samples"],
+        **details,
     }
 
 
-def get_efficiency_heatmap(db: Session) -> Dict:
+def _heatmap_resolution(first_bucket: datetime, width: timedelta):
     """
-    Generate time-series heatmap data showing productivity patterns by hour.
-    
+    Coarsest rollup table whose buckets tile `width`-sized buckets from `first_bucket` on.
+
+    Sub-hour widths need minute rollups, which only cover the minute horizon; an
+    older range is widened to the next resolution that covers it. Returns
+    (table, width actually used).
+    """
+    cutoffs = rollup_service.horizons()
+    for size, table, _ in rollup_service.RESOLUTIONS:
+        cutoff = cutoffs[table]
+        if width % size == timedelta(0) and (cutoff is None or first_bucket >= cutoff):
+            return table, width
+    for size, table, _ in reversed(rollup_service.RESOLUTIONS):
+        cutoff = cutoffs[table]
+        widened = size * -(-width // size)
+        if cutoff is None or rollup_service.floor_bucket(first_bucket, widened) >= cutoff:
+            return table, widened
+    raise AssertionError("day rollups have no horizon")
+
+
+@timed
+def get_efficiency_heatmap(
+    db: Session,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    bucket_minutes: int = 60,
+    group_by: Optional[str] = None,
+) -> Dict:
+    """
+    Generate time-weighted utilization per time bucket from the state rollups.
+
     This helps factory managers identify shift bottlenecks and peak productivity times.
-    Groups events by hour to visualize when workers are most active.
-    
+    Utilization of a bucket is working time / observed (working + idle + absent) time
+    inside it, so a 2-hour working stretch weighs 2 hours, not one event.
+
+    The database sums rollup rows per bucket; only the open tail (latest event of
+    each entity -> end) is added in Python. Bucket width must be tileable by a
+    rollup resolution covering the range; sub-hour widths older than the minute
+    horizon are widened to whole hours (see `bucket_minutes` in the result).
+
+    **Parameters**:
+    - start_time / end_time: Range (default: last 24 hours)
+    - bucket_minutes: Bucket width; buckets are aligned to multiples of it (UTC)
+    - group_by: None (all workers), "worker", "workstation" or "location"
+      (Workstation.location); worker-level series use worker time,
+      workstation/location series use workstation time
+
     Returns:
-        - labels: Hour labels (e.g., "08:00", "10:00")
-        - data: Utilization percentages for each hour
-        - peaks: Identified peak productivity hours
+        - labels: Bucket start labels (e.g., "08:00", or "01-21 08:00" for multi-day ranges)
+        - data: Utilization percentages for each bucket (all groups combined)
+        - peaks: Buckets above 80% utilization
+        - avg_utilization: Time-weighted utilization over the whole range
+        - series: [{"group", "data"}] per group when group_by is set
     """
-    # Get events from last 24 hours
-    cutoff = datetime.utcnow() - timedelta(hours=24)
-    events = db.query(models.AIEvent).filter(
-        models.AIEvent.timestamp >= cutoff
-    ).all()
-    
-    if not events:
-        return {
-            "labels": [],
-            "data": [],
-            "peaks": []
-        }
-    
-    # Group events by hour
-    hourly_data: Dict[int, Dict] = {}
-    
-    for event in events:
-        hour = event.timestamp.hour
-        if hour not in hourly_data:
-            hourly_data[hour] = {"working": 0, "idle": 0, "total": 0}
-        
-        hourly_data[hour]["total"] += 1
-        # Convert to string for proper comparison
-        event_type_str = str(event.event_type)
-        if event_type_str == "working":
-            hourly_data[hour]["working"] += 1
-        elif event_type_str == "idle":
-            hourly_data[hour]["idle"] += 1
-    
-    # Calculate utilization per hour
-    labels = []
-    data = []
-    
-    for hour in sorted(hourly_data.keys()):
-        stats = hourly_data[hour]
-        utilization = (stats["working"] / stats["total"] * 100) if stats["total"] > 0 else 0
-        labels.append(f"{hour:02d}:00")
-        data.append(round(utilization, 2))
-    
-    # Identify peak hours (>80% utilization)
-    peaks = [labels[i] for i, val in enumerate(data) if val > 80]
-    
-    return {
+    end = _naive_utc(end_time) or datetime.utcnow()
+    start = _naive_utc(start_time) or end - timedelta(hours=24)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start_time must be before end_time")
+
+    first = rollup_service.floor_bucket(start, timedelta(minutes=bucket_minutes))
+    table, width = _heatmap_resolution(first, timedelta(minutes=bucket_minutes))
+    first = rollup_service.floor_bucket(start, width)
+    n_buckets = -(-(end - first) // width)
+    if n_buckets > HEATMAP_MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Range needs {n_buckets} buckets; the maximum is {HEATMAP_MAX_BUCKETS}")
+
+    timeline = "worker" if group_by in (None, "worker") else "workstation"
+    locations: Dict[str, str] = {}
+    if group_by == "location":
+        locations = {str(s.id): str(s.location or "Unassigned") for s in registry.workstations(db)}
+
+    def group_of(worker_id: str, station_id: str) -> str:
+        if group_by == "worker":
+            return worker_id
+        if group_by == "workstation":
+            return station_id
+        if group_by == "location":
+            return locations.get(station_id, "Unassigned")
+        return "all"
+
+    # Seconds per group and bucket: [working, idle, absent]
+    grid: Dict[str, List[List[float]]] = {}
+
+    def cell(group: str, index: int) -> List[float]:
+        if group not in grid:
+            grid[group] = [[0.0, 0.0, 0.0] for _ in range(n_buckets)]
+        return grid[group][index]
+
+    stmt = (
+        select(
+            table.bucket_start,
+            table.worker_id,
+            table.workstation_id,
+            func.sum(table.working_seconds),
+            func.sum(table.idle_seconds),
+            func.sum(table.absent_seconds),
+        )
+        .where(table.timeline == timeline, table.bucket_start >= first, table.bucket_start < end)
+        .group_by(table.bucket_start, table.worker_id, table.workstation_id)
+    )
+    for bucket_start, worker_id, station_id, working, idle, absent in db.execute(stmt):
+        target = cell(group_of(worker_id, station_id), (bucket_start - first) // width)
+        target[0] += working or 0.0
+        target[1] += idle or 0.0
+        target[2] += absent or 0.0
+
+    # Open tails are not in the rollups yet: latest state continues until `end`
+    state_index = {"working": 0, "idle": 1, "absent": 2}
+    for last in rollup_service.latest_events(db, timeline).values():
+        if last.event_type not in state_index or last.timestamp >= end:
+            continue
+        begin = max(last.timestamp, first)
+        index = (begin - first) // width
+        while begin < end:
+            bucket_end = min(first + width * (index + 1), end)
+            cell(group_of(last.worker_id, last.workstation_id), index)[state_index[last.event_type]] += (bucket_end - begin).total_seconds()
+            begin, index = bucket_end, index + 1
+
+    def utilization(cells: List[List[float]]) -> List[float]:
+        return [round(c[0] / sum(c) * 100, 2) if sum(c) > 0 else 0.0 for c in cells]
+
+    combined = [[sum(grid[g][i][k] for g in grid) for k in range(3)] for i in range(n_buckets)]
+    label_format = "%H:%M" if end - start <= timedelta(days=1) else "%m-%d %H:%M"
+    labels = [(first + width * i).strftime(label_format) for i in range(n_buckets)]
+    data = utilization(combined)
+    observed = sum(sum(c) for c in combined)
+
+    result = {
         "labels": labels,
         "data": data,
-        "peaks": peaks,
-        "avg_utilization": round(sum(data) / len(data), 2) if data else 0
+        "peaks": [labels[i] for i, val in enumerate(data) if val > 80],
+        "avg_utilization": round(sum(c[0] for c in combined) / observed * 100, 2) if observed > 0 else 0,
+        "bucket_minutes": int(width.total_seconds() // 60),
+        "start": first,
+        "end": end,
+        "group_by": group_by,
+    }
+    if group_by:
+        result["series"] = [{"group": group, "data": utilization(grid[group])} for group in sorted(grid)]
+    return result
+
+
+def _exact_group_totals(db: Session, timeline: str, start: datetime, end: datetime, group_of) -> Dict[tuple, List[float]]:
+    """
+    [working, idle, absent, units] per group for exactly [start, end].
+
+    Each entity's totals come from `rollup_service.window_totals`, so the raw
+    edges, carry-in and open tail are handled as in the summary. A worker's
+    time is split across workstations only where the whole rollup buckets
+    record it; the edge remainder goes to its latest workstation. All reads
+    share one snapshot (see `database.read_snapshot`).
+    """
+    with read_snapshot(db) as snapshot:
+        return _group_totals(snapshot, timeline, start, end, group_of)
+
+
+def _group_totals(db: Session, timeline: str, start: datetime, end: datetime, group_of) -> Dict[tuple, List[float]]:
+    exact = rollup_service.window_totals(db, (timeline,), start, end)[timeline]
+    key = rollup_service.TIMELINES[timeline][0].key
+    credited: Dict[str, List[float]] = {}
+    totals: Dict[tuple, List[float]] = {}
+
+    def credit(group: tuple, entity: str, values: Sequence[float]) -> None:
+        target = totals.setdefault(group, [0.0, 0.0, 0.0, 0])
+        done = credited.setdefault(entity, [0.0, 0.0, 0.0, 0])
+        for k, value in enumerate(values):
+            target[k] += value
+            done[k] += value
+
+    buckets, _ = rollup_service.plan_window(start, end)
+    for table, ranges in buckets.items():
+        branches = [
+            select(table).where(table.timeline == timeline, table.bucket_start >= lo, table.bucket_start < hi)
+            for lo, hi in ranges
+        ]
+        rows = (union_all(*branches) if len(branches) > 1 else branches[0]).subquery()
+        stmt = select(
+            rows.c.worker_id,
+            rows.c.workstation_id,
+            func.sum(rows.c.working_seconds),
+            func.sum(rows.c.idle_seconds),
+            func.sum(rows.c.absent_seconds),
+            func.sum(rows.c.units),
+        ).group_by(rows.c.worker_id, rows.c.workstation_id)
+        for row in db.execute(stmt):
+            credit(group_of(row.worker_id, row.workstation_id), getattr(row, key), [value or 0 for value in row[2:]])
+
+    latest = rollup_service.latest_events(db, timeline)
+    for entity, entry in exact.items():
+        done = credited.get(entity, [0.0, 0.0, 0.0, 0])
+        rest = [entry.seconds["working"], entry.seconds["idle"], entry.seconds["absent"], entry.units]
+        rest = [value - done[k] for k, value in enumerate(rest)]
+        if not any(rest):
+            continue
+        last = latest.get(entity)
+        pair = (entity, None) if timeline == "worker" else (None, entity)
+        if last is not None:
+            pair = (last.worker_id, last.workstation_id)
+        credit(group_of(*pair), entity, rest)
+    return totals
+
+
+def _aggregate_values(working: float, idle: float, absent: float, units: int) -> Dict[str, Any]:
+    observed = working + idle + absent
+    return {
+        "working_hours": round(working / 3600, 2),
+        "idle_hours": round(idle / 3600, 2),
+        "absent_hours": round(absent / 3600, 2),
+        "utilization_percentage": round(working / observed * 100, 2) if observed > 0 else 0.0,
+        "total_units_produced": int(units),
+        "units_per_hour": round(units / (working / 3600), 2) if working > 0 else 0.0,
+    }
+
+
+@timed
+def aggregate_metrics(
+    db: Session,
+    group_by: Sequence[str] = (),
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    bucket_minutes: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Utilization, units and units/hour per group of worker / workstation dimensions.
+
+    Utilization is time-weighted as in the heatmap: working time / observed
+    (working + idle + absent) time.
+
+    Without `bucket_minutes` the window is exactly [start, end]: each entity's
+    totals are those of `/api/metrics/summary` (whole rollup buckets plus the
+    raw edges, see `_exact_group_totals`), summed per group. With it, the state
+    rollups are summed per entity and bucket, joined to the dimension tables and
+    summed per group in SQL, so the cost depends on the rollup rows in the
+    window, not on how many workers a group holds; only the open tails (latest
+    event of each entity -> end) are added in Python. Buckets are aligned to
+    multiples of the width (UTC), as in the heatmap.
+
+    **Parameters**:
+    - group_by: Any of "department", "shift" (Worker), "location", "type"
+      (Workstation); none = one factory-wide group. Workstation-only groupings
+      use workstation time, any worker dimension uses worker time
+    - start_time / end_time: Range (default: last 24 hours)
+    - bucket_minutes: Optional bucket width
+    """
+    end = _naive_utc(end_time) or datetime.utcnow()
+    start = _naive_utc(start_time) or end - timedelta(hours=24)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start_time must be before end_time")
+    unknown = [d for d in group_by if d not in AGGREGATE_DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by dimension(s): {', '.join(unknown)}")
+    group_by = list(dict.fromkeys(group_by))
+    timeline = "workstation" if group_by and all(d in WORKSTATION_DIMENSIONS for d in group_by) else "worker"
+
+    width: Optional[timedelta] = None
+    if bucket_minutes:
+        first = rollup_service.floor_bucket(start, timedelta(minutes=bucket_minutes))
+        table, width = _heatmap_resolution(first, timedelta(minutes=bucket_minutes))
+        first = rollup_service.floor_bucket(start, width)
+        n_buckets = -(-(end - first) // width)
+        if n_buckets > HEATMAP_MAX_BUCKETS:
+            raise HTTPException(status_code=400, detail=f"Range needs {n_buckets} buckets; the maximum is {HEATMAP_MAX_BUCKETS}")
+    else:
+        first, n_buckets = start, 1
+
+    # Seconds and units per group and bucket: [working, idle, absent, units]
+    grid: Dict[tuple, List[List[float]]] = {}
+
+    def cell(group: tuple, index: int) -> List[float]:
+        if group not in grid:
+            grid[group] = [[0.0, 0.0, 0.0, 0] for _ in range(n_buckets)]
+        return grid[group][index]
+
+    workers = {w.id: w for w in registry.workers(db)}
+    stations = {s.id: s for s in registry.workstations(db)}
+
+    def group_of(worker_id: str, station_id: str) -> tuple:
+        values = []
+        for dimension in group_by:
+            entity = stations.get(station_id) if dimension in WORKSTATION_DIMENSIONS else workers.get(worker_id)
+            values.append(getattr(entity, dimension, None) or "Unassigned")
+        return tuple(values)
+
+    if not width:
+        for group, values in _exact_group_totals(db, timeline, start, end, group_of).items():
+            target = cell(group, 0)
+            for k, value in enumerate(values):
+                target[k] += value
+    else:
+        keys = [func.coalesce(AGGREGATE_DIMENSIONS[d], "Unassigned") for d in group_by]
+        by_worker = any(d not in WORKSTATION_DIMENSIONS for d in group_by)
+        by_station = any(d in WORKSTATION_DIMENSIONS for d in group_by)
+        rows = select(table).where(table.timeline == timeline, table.bucket_start >= first, table.bucket_start < end).subquery()
+        # Sum per entity and bucket first, so the dimension join sees one row per entity instead of per pair
+        entity = [rows.c.worker_id] * by_worker + [rows.c.workstation_id] * by_station + [rows.c.bucket_start]
+        per_entity = select(
+            *entity,
+            func.sum(rows.c.working_seconds).label("working"),
+            func.sum(rows.c.idle_seconds).label("idle"),
+            func.sum(rows.c.absent_seconds).label("absent"),
+            func.sum(rows.c.units).label("units"),
+        ).group_by(*entity).subquery()
+        stmt = select(
+            *keys,
+            per_entity.c.bucket_start,
+            func.sum(per_entity.c.working),
+            func.sum(per_entity.c.idle),
+            func.sum(per_entity.c.absent),
+            func.sum(per_entity.c.units),
+        ).select_from(per_entity)
+        if by_worker:
+            stmt = stmt.join(models.Worker, models.Worker.id == per_entity.c.worker_id)
+        if by_station:
+            stmt = stmt.join(models.Workstation, models.Workstation.id == per_entity.c.workstation_id)
+        for row in db.execute(stmt.group_by(*keys, per_entity.c.bucket_start)):
+            target = cell(tuple(row[: len(keys)]), (row[len(keys)] - first) // width)
+            for k, value in enumerate(row[len(keys) + 1:]):
+                target[k] += value or 0
+
+        # Open tails are not in the rollups yet: latest state continues until `end`
+        state_index = {"working": 0, "idle": 1, "absent": 2}
+        for latest in rollup_service.latest_events(db, timeline).values():
+            if latest.event_type not in state_index or latest.timestamp >= end:
+                continue
+            begin = max(latest.timestamp, first)
+            index = (begin - first) // width
+            while begin < end:
+                bucket_end = min(first + width * (index + 1), end)
+                cell(group_of(latest.worker_id, latest.workstation_id), index)[state_index[latest.event_type]] += (bucket_end - begin).total_seconds()
+                begin, index = bucket_end, index + 1
+
+    groups = []
+    for group in sorted(grid):
+        cells = grid[group]
+        entry = {"group": dict(zip(group_by, group)), **_aggregate_values(*(sum(c[k] for c in cells) for k in range(4)))}
+        if width:
+            entry["buckets"] = [{"bucket_start": first + width * i, **_aggregate_values(*c)} for i, c in enumerate(cells)]
+        groups.append(entry)
+    return {
+        "group_by": group_by,
+        "timeline": timeline,
+        "start": first,
+        "end": end,
+        "bucket_minutes": int(width.total_seconds() // 60) if width else None,
+        "groups": groups,
     }
@@ -0,0 +1,128 @@
+"""
+Write-behind ingestion queue.
+
+SQLite admits one writer at a time, so letting every request commit on its own
+makes requests queue on the database lock anyway. Instead, endpoints enqueue
+validated events and a single writer task drains the queue in group commits:
+a batch is written with `events_service.ingest_many` (one transaction) as soon
+as it holds `INGEST_BATCH_MAX` events or `INGEST_FLUSH_MS` has passed since its
+first event, whichever comes first.
+
+Acknowledgement (`INGEST_ACK`):
+- "commit": the request waits until its batch is committed and gets its own
+  outcome (created / duplicate / error).
+- "enqueue": the request returns once the event is queued; outcomes are only
+  logged. Faster, but queued events are lost if the process dies.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from .. import database, schemas
+from ..config import settings
+from . import events_service, telemetry_service
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class IngestQueue:
+    """Single-writer group-commit queue; one instance per process."""
+
+    def __init__(self) -> None:
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.batches_written = 0
+        self.events_written = 0
+
+    def start(self) -> None:
+        """Start the writer on the running loop (no-op when already running there)."""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=settings.ingest_queue_max)
+        self._task = loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Write everything already queued, then stop the writer."""
+        if self._task is None or self._task.done() or self._loop is not asyncio.get_running_loop():
+            return
+        await self._queue.put(_STOP)  # type: ignore
+        await self._task
+
+    async def submit(self, events: List[schemas.AIEventCreate]) -> List[Dict[str, Any]]:
+        """Queue events and wait for their committed outcomes (ingest_many format)."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in events]
+        for event, future in zip(events, futures):
+            await self._queue.put((event, future))  # type: ignore
+        return list(await asyncio.gather(*futures))
+
+    async def enqueue(self, events: List[schemas.AIEventCreate]) -> None:
+        """Queue events without waiting for the write."""
+        self.start()
+        for event in events:
+            await self._queue.put((event, None))  # type: ignore
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _run(self) -> None:
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await queue.get()  # type: ignore
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = loop.time() + settings.ingest_flush_ms / 1000
+            while len(batch) < settings.ingest_batch_max:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)  # type: ignore
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[schemas.AIEventCreate, Optional[asyncio.Future]]]) -> None:
+        events = [event for event, _ in batch]
+        try:
+            results = await self._write(events)
+        except Exception as exc:
+            logger.error(f"Ingest writer failed on a batch of {len(events)}: {exc}")
+            results = [{"status": "error", "detail": str(exc), "code": 500, "reason": "storage_error"} for _ in events]
+            telemetry_service.record_ingest(results)
+
+        self.batches_written += 1
+        self.events_written += sum(1 for r in results if r["status"] == "created")
+        for (event, future), result in zip(batch, results):
+            if future is not None:
+                if not future.done():
+                    future.set_result(result)
+            elif result["status"] == "error":
+                logger.warning(f"Queued event dropped: {event.worker_id}@{event.workstation_id} {event.timestamp}: {result['detail']}")
+
+    async def _write(self, events: List[schemas.AIEventCreate]) -> List[Dict[str, Any]]:
+        if database.AsyncSessionLocal is not None:
+            async with database.AsyncSessionLocal() as db:
+                return await events_service.ingest_many_async(db, events)
+        db = database.SessionLocal()
+        try:
+            return await events_service.ingest_many_async(db, events)
+        finally:
+            db.close()
+
+
+ingest_queue = IngestQueue()
@@ -0,0 +1,98 @@
+"""
+In-memory worker / workstation registry.
+
+Every ingested event references a worker and a workstation, and the same
+handful of IDs repeat across every request. The registry keeps a process-local
+copy of both tables (IDs and listing metadata) so ingest validation is a set
+lookup and `/api/workers` / `/api/workstations` are served without a query.
+
+It is loaded at startup (or on first use) and kept coherent by
+`crud.create_worker` / `crud.create_workstation` and the seed clear paths.
+An ID the registry does not know is re-checked against the database once
+before it is rejected, so rows written by another process are picked up on
+first sight; unknown IDs are not cached.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from .. import crud, schemas
+
+
+class Registry:
+    """Known workers and workstations, keyed by ID, as response schemas."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._workers: Dict[str, schemas.Worker] = {}
+        self._workstations: Dict[str, schemas.Workstation] = {}
+
+    def load(self, db: Session) -> None:
+        """Replace the registry contents with the current tables."""
+        workers = {str(w.id): schemas.Worker.model_validate(w) for w in crud.get_workers(db)}
+        stations = {str(s.id): schemas.Workstation.model_validate(s) for s in crud.get_workstations(db)}
+        with self._lock:
+            self._workers, self._workstations = workers, stations
+            self._loaded = True
+
+    def ensure_loaded(self, db: Session) -> None:
+        if not self._loaded:
+            self.load(db)
+
+    def clear(self) -> None:
+        """Forget everything; the next use reloads from the database."""
+        with self._lock:
+            self._workers, self._workstations = {}, {}
+            self._loaded = False
+
+    def add_worker(self, worker) -> None:
+        """Register a stored worker row (call after its commit)."""
+        entry = schemas.Worker.model_validate(worker)
+        with self._lock:
+            self._workers[entry.id] = entry
+
+    def add_workstation(self, workstation) -> None:
+        """Register a stored workstation row (call after its commit)."""
+        entry = schemas.Workstation.model_validate(workstation)
+        with self._lock:
+            self._workstations[entry.id] = entry
+
+    def workers(self, db: Session) -> List[schemas.Worker]:
+        self.ensure_loaded(db)
+        return [self._workers[k] for k in sorted(self._workers)]
+
+    def workstations(self, db: Session) -> List[schemas.Workstation]:
+        self.ensure_loaded(db)
+        return [self._workstations[k] for k in sorted(self._workstations)]
+
+    def get_worker(self, db: Session, worker_id: str) -> Optional[schemas.Worker]:
+        self.ensure_loaded(db)
+        return self._workers.get(worker_id)
+
+    def get_workstation(self, db: Session, workstation_id: str) -> Optional[schemas.Workstation]:
+        self.ensure_loaded(db)
+        return self._workstations.get(workstation_id)
+
+    def known_worker_ids(self, db: Session, worker_ids: Iterable[str]) -> Set[str]:
+        """Subset of worker_ids that exist; queries only for IDs not yet registered."""
+        self.ensure_loaded(db)
+        ids = set(worker_ids)
+        missing = ids.difference(self._workers)
+        if missing and crud.get_existing_worker_ids(db, missing):
+            self.load(db)
+        return ids.intersection(self._workers)
+
+    def known_workstation_ids(self, db: Session, workstation_ids: Iterable[str]) -> Set[str]:
+        """Subset of workstation_ids that exist; queries only for IDs not yet registered."""
+        self.ensure_loaded(db)
+        ids = set(workstation_ids)
+        missing = ids.difference(self._workstations)
+        if missing and crud.get_existing_workstation_ids(db, missing):
+            self.load(db)
+        return ids.intersection(self._workstations)
+
+
+registry = Registry()
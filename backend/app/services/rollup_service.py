@@ -0,0 +1,693 @@
+"""
+Rollup service layer.
+
+Maintains minute/hour/day state-duration rollups as events are ingested, and answers
+metric windows by summing whole buckets, reading raw events only for the partial
+buckets at the window edges. Query cost depends on window length and bucket size,
+not on how many events were ingested.
+
+Minute and hour buckets only cover a trailing horizon (see config) so that long gaps
+and long histories stay cheap; older windows use day buckets and read raw events for
+the partial hours/days at their edges instead.
+
+**Window semantics** match the raw state machine in metrics_service exactly:
+- every closed interval clipped to [start, end) (whole buckets + raw edges)
+- minus the carry-in: the part of the interval opened before `start` that runs until
+  the first event inside the window (the raw engine starts at the first event)
+- plus the open tail: latest event -> `end`, when the latest event is inside the window
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, aliased
+
+from .. import crud, models
+from ..config import settings
+from ..database import read_snapshot
+from . import watermark_service
+from .archive_service import archive
+from .watermark_service import watermarks
+
+EPOCH = datetime(1970, 1, 1)
+
+# Timeline name -> (event column that partitions it, entity table)
+TIMELINES = {
+    "worker": (models.AIEvent.worker_id, models.Worker),
+    "workstation": (models.AIEvent.workstation_id, models.Workstation),
+}
+
+# Coarsest first: window planning carves whole days, then hours, then minutes.
+# Third element is how far back the table is maintained (None = forever).
+RESOLUTIONS = (
+    (timedelta(days=1), models.StateRollupDay, None),
+    (timedelta(hours=1), models.StateRollupHour, timedelta(days=settings.rollup_hour_retention_days)),
+    (timedelta(minutes=1), models.StateRollupMinute, timedelta(hours=settings.rollup_minute_retention_hours)),
+)
+
+RESOLUTION_SIZES = {table: size for size, table, _ in RESOLUTIONS}
+RESOLUTION_NAMES = {table: table.__tablename__.rsplit("_", 1)[1] for _, table, _ in RESOLUTIONS}
+
+STATE_COLUMNS = {"working": "working_seconds", "idle": "idle_seconds", "absent": "absent_seconds"}
+
+# Pending rollup rows held in memory before they are written during a rebuild
+REBUILD_FLUSH_ROWS = 50000
+
+_EVENT_COLUMNS = (
+    models.AIEvent.id,
+    models.AIEvent.timestamp,
+    models.AIEvent.worker_id,
+    models.AIEvent.workstation_id,
+    models.AIEvent.event_type,
+    models.AIEvent.count,
+)
+
+
+# ========================================
+# Bucket arithmetic
+# ========================================
+
+def _micros(value: timedelta) -> int:
+    return (value.days * 86400 + value.seconds) * 1_000_000 + value.microseconds
+
+
+def floor_bucket(value: datetime, size: timedelta) -> datetime:
+    """Start of the bucket of width `size` containing `value` (epoch aligned)."""
+    offset = _micros(value - EPOCH)
+    return EPOCH + timedelta(microseconds=offset - offset % _micros(size))
+
+
+def ceil_bucket(value: datetime, size: timedelta) -> datetime:
+    """First bucket boundary at or after `value`."""
+    floored = floor_bucket(value, size)
+    return floored if floored == value else floored + size
+
+
+def horizons(now: Optional[datetime] = None) -> Dict[Any, Optional[datetime]]:
+    """
+    Oldest bucket each table is maintained for, as of `now`.
+
+    Horizons only move forward, so any bucket at or after a reader's horizon was
+    also at or after the writer's horizon when its events were applied.
+    """
+    now = now or datetime.utcnow()
+    return {
+        table: floor_bucket(now - retention, size) if retention is not None else None
+        for size, table, retention in RESOLUTIONS
+    }
+
+
+def plan_window(
+    start: Optional[datetime], end: datetime, cutoffs: Optional[Dict[Any, Optional[datetime]]] = None
+) -> Tuple[Dict[Any, List[Tuple[Optional[datetime], datetime]]], List[Tuple[datetime, datetime]]]:
+    """
+    Split [start, end] into whole buckets per rollup table plus raw edge ranges.
+
+    Returns:
+        - {table: [(lo, hi), ...]}: half-open bucket_start ranges (lo None = unbounded)
+        - [(lo, hi), ...]: ranges to read from raw events (sub-minute within the
+          minute horizon); the one ending at `end` is inclusive so events stamped
+          exactly at `end` are counted
+
+    Example: 09:30:15 → 12:00:00 on the same day yields raw [09:30:15, 09:31),
+    minutes [09:31, 10:00), hours [10:00, 12:00) and raw [12:00, 12:00].
+    A table is skipped for ranges older than its horizon in `cutoffs`.
+    """
+    cutoffs = cutoffs if cutoffs is not None else horizons()
+    buckets: Dict[Any, List[Tuple[Optional[datetime], datetime]]] = defaultdict(list)
+    raw: List[Tuple[datetime, datetime]] = []
+
+    def carve(lo: Optional[datetime], hi: datetime, level: int) -> None:
+        if level == len(RESOLUTIONS):
+            raw.append((lo, hi))  # type: ignore[arg-type]
+            return
+        size, table, _ = RESOLUTIONS[level]
+        cutoff = cutoffs.get(table)
+        first = ceil_bucket(lo, size) if lo is not None else None
+        last = floor_bucket(hi, size)
+        if cutoff is not None and (first is None or first < cutoff):
+            carve(lo, hi, level + 1)  # older than this table's horizon
+            return
+        if first is not None and first >= last:
+            carve(lo, hi, level + 1)
+            return
+        if lo is not None and first is not None and lo < first:
+            carve(lo, first, level + 1)
+        buckets[table].append((first, last))
+        if last < hi or hi == end:
+            carve(last, hi, level + 1)
+
+    carve(start, end, 0)
+    return dict(buckets), raw
+
+
+# ========================================
+# Incremental maintenance
+# ========================================
+
+class RollupDelta:
+    """Pending additive changes to rollup rows, keyed by (table, primary key)."""
+
+    def __init__(self) -> None:
+        self.rows: Dict[Tuple[Any, Tuple[str, str, str, datetime]], Dict[str, Any]] = {}
+        self.cutoffs = horizons()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _row(self, table, key: Tuple[str, str, str, datetime]) -> Dict[str, Any]:
+        row = self.rows.get((table, key))
+        if row is None:
+            row = self.rows[(table, key)] = {
+                "working_seconds": 0.0,
+                "idle_seconds": 0.0,
+                "absent_seconds": 0.0,
+                "units": 0,
+                "event_count": 0,
+                "first_event_at": None,
+                "last_event_at": None,
+            }
+        return row
+
+    def add_interval(self, timeline: str, opening, end: datetime, sign: int = 1) -> None:
+        """Spread [opening.timestamp, end) in opening's state across every resolution."""
+        column = STATE_COLUMNS.get(opening.event_type)
+        begin = opening.timestamp
+        if column is None or end <= begin:
+            return
+        for size, table, _ in RESOLUTIONS:
+            bucket = floor_bucket(begin, size)
+            cutoff = self.cutoffs[table]
+            if cutoff is not None and bucket < cutoff:
+                bucket = cutoff
+            while bucket < end:
+                following = bucket + size
+                seconds = (min(end, following) - max(begin, bucket)).total_seconds()
+                key = (timeline, opening.worker_id, opening.workstation_id, bucket)
+                self._row(table, key)[column] += sign * seconds
+                bucket = following
+
+    def add_sequence(self, timeline: str, rows: List, sign: int = 1) -> None:
+        """Add the closed intervals between consecutive rows of one ordered timeline."""
+        for opening, closing in zip(rows, rows[1:]):
+            self.add_interval(timeline, opening, closing.timestamp, sign)
+
+    def add_event(self, timeline: str, event) -> None:
+        """Record an event's count/first/last facts in its bucket at every resolution."""
+        for size, table, _ in RESOLUTIONS:
+            bucket = floor_bucket(event.timestamp, size)
+            cutoff = self.cutoffs[table]
+            if cutoff is not None and bucket < cutoff:
+                continue
+            row = self._row(table, (timeline, event.worker_id, event.workstation_id, bucket))
+            row["event_count"] += 1
+            if event.event_type == "product_count":
+                row["units"] += int(event.count)
+            if row["first_event_at"] is None or event.timestamp < row["first_event_at"]:
+                row["first_event_at"] = event.timestamp
+            if row["last_event_at"] is None or event.timestamp > row["last_event_at"]:
+                row["last_event_at"] = event.timestamp
+
+    def absorb(self, other: "RollupDelta") -> None:
+        """Add another delta's pending rows onto this one."""
+        for (table, key), values in other.rows.items():
+            row = self._row(table, key)
+            for column in ("working_seconds", "idle_seconds", "absent_seconds", "units", "event_count"):
+                row[column] += values[column]
+            if values["first_event_at"] and (row["first_event_at"] is None or values["first_event_at"] < row["first_event_at"]):
+                row["first_event_at"] = values["first_event_at"]
+            if values["last_event_at"] and (row["last_event_at"] is None or values["last_event_at"] > row["last_event_at"]):
+                row["last_event_at"] = values["last_event_at"]
+
+    def changed(self) -> Iterator[Tuple[Any, Tuple[str, str, str, datetime]]]:
+        """(table, key) of every pending row that changes its bucket."""
+        for (table, key), values in self.rows.items():
+            # Skips intervals that cancelled out (late event inside an unchanged state)
+            if values["event_count"] or any(abs(values[c]) > 1e-9 for c in STATE_COLUMNS.values()):
+                yield table, key
+
+    def flush(self, db: Session) -> None:
+        """Upsert pending rows (additively) and clear the buffer."""
+        by_table: Dict[Any, List[Dict[str, Any]]] = defaultdict(list)
+        for table, (timeline, worker_id, workstation_id, bucket) in self.changed():
+            values = self.rows[(table, (timeline, worker_id, workstation_id, bucket))]
+            by_table[table].append(
+                dict(values, timeline=timeline, worker_id=worker_id, workstation_id=workstation_id, bucket_start=bucket)
+            )
+        for table, rows in by_table.items():
+            _upsert(db, table, rows)
+        self.rows.clear()
+
+
+def _upsert(db: Session, table, rows: List[Dict[str, Any]]) -> None:
+    """Add `rows` onto existing rollup rows, inserting the ones that do not exist yet."""
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("sqlite", "postgresql"):
+        # Core table, so the rows go out as one executemany (the ORM bulk path
+        # compiles and executes an upsert with SQL expressions row by row)
+        core = table.__table__
+        if dialect == "sqlite":
+            stmt = sqlite.insert(core)
+            least, greatest = func.min, func.max  # two-argument scalar forms in SQLite
+        else:
+            stmt = postgresql.insert(core)
+            least, greatest = func.least, func.greatest
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["timeline", "worker_id", "workstation_id", "bucket_start"],
+            set_={
+                "working_seconds": core.c.working_seconds + excluded.working_seconds,
+                "idle_seconds": core.c.idle_seconds + excluded.idle_seconds,
+                "absent_seconds": core.c.absent_seconds + excluded.absent_seconds,
+                "units": core.c.units + excluded.units,
+                "event_count": core.c.event_count + excluded.event_count,
+                "first_event_at": least(
+                    func.coalesce(core.c.first_event_at, excluded.first_event_at),
+                    func.coalesce(excluded.first_event_at, core.c.first_event_at),
+                ),
+                "last_event_at": greatest(
+                    func.coalesce(core.c.last_event_at, excluded.last_event_at),
+                    func.coalesce(excluded.last_event_at, core.c.last_event_at),
+                ),
+            },
+        )
+        db.execute(stmt, rows)
+        return
+
+    # Portable fallback: read-modify-write through the ORM
+    for row in rows:
+        existing = db.get(table, (row["timeline"], row["worker_id"], row["workstation_id"], row["bucket_start"]))
+        if existing is None:
+            db.add(table(**row))
+            continue
+        for column in ("working_seconds", "idle_seconds", "absent_seconds", "units", "event_count"):
+            setattr(existing, column, getattr(existing, column) + row[column])
+        if row["first_event_at"] and (not existing.first_event_at or row["first_event_at"] < existing.first_event_at):
+            existing.first_event_at = row["first_event_at"]
+        if row["last_event_at"] and (not existing.last_event_at or row["last_event_at"] > existing.last_event_at):
+            existing.last_event_at = row["last_event_at"]
+    db.flush()
+
+
+def _span_rows(db: Session, column, entity: str, lo: datetime, hi: datetime) -> List:
+    """
+    Events of one timeline from the event before `lo` to the event after `hi`.
+
+    These neighbours bound every interval that an event in [lo, hi] can change.
+    """
+    before = (
+        select(func.max(models.AIEvent.timestamp))
+        .where(column == entity, models.AIEvent.timestamp < lo)
+        .scalar_subquery()
+    )
+    after = (
+        select(func.min(models.AIEvent.timestamp))
+        .where(column == entity, models.AIEvent.timestamp > hi)
+        .scalar_subquery()
+    )
+    stmt = (
+        select(*_EVENT_COLUMNS)
+        .where(
+            column == entity,
+            models.AIEvent.timestamp >= func.coalesce(before, lo),
+            models.AIEvent.timestamp <= func.coalesce(after, hi),
+        )
+        .order_by(models.AIEvent.timestamp, models.AIEvent.id.desc())
+    )
+    rows = db.execute(stmt).all()
+    if (not rows or rows[0].timestamp >= lo) and archive.horizon(db) is not None:
+        # The event before `lo` may have been archived
+        previous = archive.last_before(db, column.key, [entity], lo).get(entity)
+        if previous is not None:
+            rows.insert(0, previous)
+    return rows
+
+
+def _neighbour_spans(db: Session, column, entity: str, stamps: List[datetime], mark: Optional[datetime]) -> List[List]:
+    """
+    Stored events around the new events of one timeline, as ordered spans that
+    share no interval.
+
+    New events at or after `mark` (the entity's watermark) form one span from
+    the event before them. Older ones are grouped into runs of adjacent
+    minutes, each read between its own stored neighbours through the
+    (entity, timestamp) index, so a late event never pulls in the history
+    between it and the rest of the batch. Spans that turn out to touch (no
+    stored event between two runs) are merged.
+    """
+    step = RESOLUTIONS[-1][0]
+    ordered = sorted(stamps)
+    behind = [stamp for stamp in ordered if mark is not None and stamp < mark]
+    ranges: List[List[datetime]] = []
+    for stamp in behind:
+        if ranges and floor_bucket(stamp, step) <= floor_bucket(ranges[-1][1], step) + step:
+            ranges[-1][1] = stamp
+        else:
+            ranges.append([stamp, stamp])
+    if len(behind) < len(ordered):
+        ranges.append([ordered[len(behind)], ordered[-1]])
+
+    spans: List[List] = []
+    for lo, hi in ranges:
+        rows = _span_rows(db, column, entity, lo, hi)
+        if spans and spans[-1][-1].timestamp >= rows[0].timestamp:
+            seen = {row.id for row in spans[-1]}
+            spans[-1] = sorted(spans[-1] + [row for row in rows if row.id not in seen], key=lambda row: (row.timestamp, -row.id))
+        else:
+            spans.append(rows)
+    return spans
+
+
+def _apply_span(delta: RollupDelta, timeline: str, rows: List, new_keys: set) -> None:
+    """Add a span's intervals with the new events and subtract them without."""
+    is_new = [crud.event_key(r.timestamp, r.worker_id, r.event_type) in new_keys for r in rows]
+    delta.add_sequence(timeline, rows, 1)
+    delta.add_sequence(timeline, [r for r, new in zip(rows, is_new) if not new], -1)
+    for row, new in zip(rows, is_new):
+        if new:
+            delta.add_event(timeline, row)
+
+
+def apply_events(db: Session, events: Iterable) -> watermark_service.Arrivals:
+    """
+    Fold newly inserted events into the rollups. Call inside the inserting
+    transaction, after the rows are written and before commit; load the
+    watermarks before the insert and hand the returned arrivals to
+    `watermarks.observe` once it commits.
+
+    Per worker and workstation touched, each span of stored events around the
+    new ones (see `_neighbour_spans`) is re-read and the difference between its
+    intervals with and without the new events is applied. For in-order
+    arrivals that is simply the intervals the new events close; a late event
+    only rewrites the interval it splits. Buckets that were already final when
+    a late event changed them are counted as stale.
+    """
+    events = list(events)
+    arrivals = watermarks.classify(events)
+    new_keys = {crud.event_key(e.timestamp, e.worker_id, e.event_type) for e in events}
+    if not new_keys:
+        return arrivals
+    late_keys = arrivals.keys("late")
+
+    delta = RollupDelta()
+    for timeline, (column, _) in TIMELINES.items():
+        spans: Dict[str, List[datetime]] = defaultdict(list)
+        for event in events:
+            spans[getattr(event, column.key)].append(event.timestamp.replace(tzinfo=None))
+
+        for entity, stamps in spans.items():
+            for rows in _neighbour_spans(db, column, entity, stamps, watermarks.mark(timeline, entity)):
+                if not late_keys or not any(crud.event_key(r.timestamp, r.worker_id, r.event_type) in late_keys for r in rows):
+                    _apply_span(delta, timeline, rows, new_keys)
+                    continue
+                late = RollupDelta()
+                _apply_span(late, timeline, rows, new_keys)
+                for table, key in late.changed():
+                    if key[3] + RESOLUTION_SIZES[table] <= arrivals.final_before:
+                        arrivals.stale_buckets[(timeline, RESOLUTION_NAMES[table])] += 1
+                delta.absorb(late)
+
+    delta.flush(db)
+    return arrivals
+
+
+def clear(db: Session) -> None:
+    """Delete every rollup row (without committing)."""
+    for _, table, _ in RESOLUTIONS:
+        db.query(table).delete()
+
+
+def prune(db: Session) -> int:
+    """Delete minute/hour buckets older than their horizon and commit. Returns rows removed."""
+    removed = 0
+    for table, cutoff in horizons().items():
+        if cutoff is not None:
+            removed += db.query(table).filter(table.bucket_start < cutoff).delete()
+    db.commit()
+    return removed
+
+
+def needs_rebuild(db: Session) -> bool:
+    """True when events exist but the rollups were never built (e.g. upgraded database)."""
+    has_events = db.query(models.AIEvent.id).first() is not None
+    has_rollups = db.query(models.StateRollupDay.bucket_start).first() is not None
+    return has_events and not has_rollups
+
+
+def rebuild(db: Session) -> None:
+    """
+    Recompute all rollups from raw events in one ordered pass per timeline, then commit.
+    Archived partitions are replayed first (oldest first); they all precede the hot events.
+    """
+    clear(db)
+    for timeline, (column, _) in TIMELINES.items():
+        delta = RollupDelta()
+        last_archived: Dict[str, Any] = {}
+        for chunk in archive.partition_chunks(db, None, None):
+            for row in chunk:
+                entity = getattr(row, column.key)
+                if entity in last_archived:
+                    delta.add_interval(timeline, last_archived[entity], row.timestamp)
+                delta.add_event(timeline, row)
+                last_archived[entity] = row
+            delta.flush(db)
+
+        previous = None
+        stmt = select(*_EVENT_COLUMNS).order_by(column, models.AIEvent.timestamp, models.AIEvent.id.desc())
+        for row in db.execute(stmt.execution_options(yield_per=REBUILD_FLUSH_ROWS)):
+            entity = getattr(row, column.key)
+            if previous is None or getattr(previous, column.key) != entity:
+                previous = last_archived.get(entity)
+            if previous is not None:
+                delta.add_interval(timeline, previous, row.timestamp)
+            delta.add_event(timeline, row)
+            previous = row
+            if len(delta) >= REBUILD_FLUSH_ROWS:
+                delta.flush(db)
+        delta.flush(db)
+    db.commit()
+
+
+# ========================================
+# Window queries
+# ========================================
+
+class WindowTotals:
+    """
+    Per-entity totals for a window: state seconds (`durations` in hours),
+    `units`, `first_seen`, `last_seen`. Also produced by the raw scan in
+    metrics_service, so both paths feed the same metric builders.
+    """
+
+    __slots__ = ("seconds", "units", "first_seen", "last_seen")
+
+    def __init__(self) -> None:
+        self.seconds: Dict[str, float] = {"working": 0.0, "idle": 0.0, "absent": 0.0}
+        self.units = 0
+        self.first_seen: Optional[datetime] = None
+        self.last_seen: Optional[datetime] = None
+
+    @property
+    def durations(self) -> Dict[str, float]:
+        return {state: seconds / 3600 for state, seconds in self.seconds.items()}
+
+    def add_clipped(self, state: str, begin: datetime, end: datetime, lo: datetime, hi: datetime, sign: int = 1) -> None:
+        """Add the part of [begin, end) inside [lo, hi) to `state`."""
+        if state not in self.seconds:
+            return
+        seconds = (min(end, hi) - max(begin, lo)).total_seconds()
+        if seconds > 0:
+            self.seconds[state] += sign * seconds
+
+    def add_facts(self, units: int, first: Optional[datetime], last: Optional[datetime]) -> None:
+        self.units += int(units or 0)
+        if first is not None and (self.first_seen is None or first < self.first_seen):
+            self.first_seen = first
+        if last is not None and (self.last_seen is None or last > self.last_seen):
+            self.last_seen = last
+
+
+def _boundary_rows(db: Session, timeline: str, entity_id: Optional[str], before: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Last event (in timeline order) strictly before `before` — or overall — per entity.
+
+    One statement: a correlated lookup per entity row, each answered by an index
+    seek on (entity, timestamp) rather than a scan of its history.
+    """
+    column, entity_table = TIMELINES[timeline]
+    inner = aliased(models.AIEvent)
+    inner_column = getattr(inner, column.key)
+
+    last_ts = select(func.max(inner.timestamp)).where(inner_column == entity_table.id)
+    if before is not None:
+        last_ts = last_ts.where(inner.timestamp < before)
+    last_id = (
+        select(func.min(models.AIEvent.id))
+        .where(column == entity_table.id, models.AIEvent.timestamp == last_ts.correlate(entity_table).scalar_subquery())
+        .correlate(entity_table)
+        .scalar_subquery()
+    )
+    ids = select(last_id).select_from(entity_table)
+    if entity_id:
+        ids = ids.where(entity_table.id == entity_id)
+
+    rows = db.execute(select(*_EVENT_COLUMNS).where(models.AIEvent.id.in_(ids)))
+    found = {getattr(row, column.key): row for row in rows}
+
+    if archive.horizon(db) is not None:
+        # Every hot event is newer than every archived one, so only entities
+        # without a hot event before `before` can have their boundary archived
+        entities = [entity_id] if entity_id else db.scalars(select(entity_table.id)).all()
+        missing = [e for e in entities if e not in found]
+        for entity, row in archive.last_before(db, column.key, missing, before).items():
+            found[entity] = row
+    return found
+
+
+def latest_events(db: Session, timeline: str) -> Dict[str, Any]:
+    """Latest event per entity of `timeline` (its state is still open until the next event)."""
+    return _boundary_rows(db, timeline, None)
+
+
+def _range_rows(
+    db: Session, lo: datetime, hi: datetime, inclusive: bool, column=None, entity_id: Optional[str] = None
+) -> List:
+    """
+    Raw events in [lo, hi) (or [lo, hi]) in global timeline order; partitions keep that order.
+    Archived events are read first when the range starts below the archive horizon.
+    """
+    stmt = select(*_EVENT_COLUMNS).where(
+        models.AIEvent.timestamp >= lo,
+        models.AIEvent.timestamp <= hi if inclusive else models.AIEvent.timestamp < hi,
+    )
+    if entity_id:
+        stmt = stmt.where(column == entity_id)
+    rows = db.execute(stmt.order_by(models.AIEvent.timestamp, models.AIEvent.id.desc())).all()
+    horizon = archive.horizon(db)
+    if horizon is not None and lo < horizon:
+        entity = {column.key: entity_id} if entity_id else {}
+        # Archived events all precede the hot ones
+        rows = archive.rows(db, lo, hi, inclusive, **entity) + rows
+    return rows
+
+
+def window_totals(
+    db: Session,
+    timelines: Sequence[str],
+    start: Optional[datetime],
+    end: datetime,
+    entity_id: Optional[str] = None,
+) -> Dict[str, Dict[str, WindowTotals]]:
+    """
+    State hours, units and first/last event per entity of each timeline for [start, end].
+
+    All requested timelines share one pass: one grouped SUM per rollup table and
+    one range read per raw edge, partitioned by worker and by workstation in
+    memory. Only the per-entity boundary lookups are issued per timeline.
+    `entity_id` restricts a single timeline to one entity.
+
+    The reads share one snapshot (see `database.read_snapshot`), so an event
+    committed meanwhile is either in all of them or in none.
+
+    Returns {timeline: {entity_id: WindowTotals}}.
+    """
+    if entity_id is not None and len(timelines) != 1:
+        raise ValueError("entity_id filters exactly one timeline")
+    with read_snapshot(db) as snapshot:
+        return _window_totals(snapshot, timelines, start, end, entity_id)
+
+
+def _window_totals(
+    db: Session,
+    timelines: Sequence[str],
+    start: Optional[datetime],
+    end: datetime,
+    entity_id: Optional[str],
+) -> Dict[str, Dict[str, WindowTotals]]:
+    totals: Dict[str, Dict[str, WindowTotals]] = {timeline: defaultdict(WindowTotals) for timeline in timelines}
+    if start is not None and start > end:
+        return {timeline: {} for timeline in timelines}
+    buckets, raw_ranges = plan_window(start, end)
+    columns = {timeline: TIMELINES[timeline][0] for timeline in timelines}
+
+    # 1. Whole buckets: one grouped query per table covers every timeline. Each bucket
+    #    range is its own UNION ALL branch so it is an index range search (an OR of
+    #    ranges would read every bucket of the timeline)
+    for table, ranges in buckets.items():
+        branches = []
+        for lo, hi in ranges:
+            branch = select(table).where(table.timeline.in_(list(timelines)), table.bucket_start < hi)
+            if lo is not None:
+                branch = branch.where(table.bucket_start >= lo)
+            if entity_id:
+                branch = branch.where(getattr(table, columns[timelines[0]].key) == entity_id)
+            branches.append(branch)
+        rows = (union_all(*branches) if len(branches) > 1 else branches[0]).subquery()
+        stmt = select(
+            rows.c.timeline,
+            rows.c.worker_id,
+            rows.c.workstation_id,
+            func.sum(rows.c.working_seconds),
+            func.sum(rows.c.idle_seconds),
+            func.sum(rows.c.absent_seconds),
+            func.sum(rows.c.units),
+            func.min(rows.c.first_event_at),
+            func.max(rows.c.last_event_at),
+        ).group_by(rows.c.timeline, rows.c.worker_id, rows.c.workstation_id)
+        for row in db.execute(stmt):
+            timeline, working, idle, absent, units, first, last = row[0], *row[3:]
+            entry = totals[timeline][getattr(row, columns[timeline].key)]
+            entry.seconds["working"] += working or 0.0
+            entry.seconds["idle"] += idle or 0.0
+            entry.seconds["absent"] += absent or 0.0
+            entry.add_facts(units, first, last)
+
+    latest = {timeline: _boundary_rows(db, timeline, entity_id) for timeline in timelines}
+
+    # 2. Partial buckets at the edges, from raw events read once for all timelines
+    before_start: Dict[str, Dict[str, Any]] = {}
+    for lo, hi in raw_ranges:
+        rows = _range_rows(db, lo, hi, hi == end, columns[timelines[0]], entity_id)
+        for timeline, column in columns.items():
+            previous = _boundary_rows(db, timeline, entity_id, before=lo)
+            if lo == start:
+                before_start[timeline] = previous
+            entries = totals[timeline]
+            sequences: Dict[str, List] = {entity: [row] for entity, row in previous.items()}
+            for row in rows:
+                entity = getattr(row, column.key)
+                sequences.setdefault(entity, []).append(row)
+                entries[entity].add_facts(row.count if row.event_type == "product_count" else 0, row.timestamp, row.timestamp)
+            for entity, sequence in sequences.items():
+                entry = entries[entity]
+                for opening, closing in zip(sequence, sequence[1:]):
+                    entry.add_clipped(opening.event_type, opening.timestamp, closing.timestamp, lo, hi)
+                last = sequence[-1]
+                if last.id != latest[timeline][entity].id:  # closed by a later event beyond this range
+                    entry.add_clipped(last.event_type, last.timestamp, hi, lo, hi)
+
+    for timeline in timelines:
+        entries = totals[timeline]
+
+        # 3. Carry-in: the raw engine does not count time before the first event in the window
+        if start is not None:
+            previous_rows = before_start.get(timeline)
+            if previous_rows is None:
+                previous_rows = _boundary_rows(db, timeline, entity_id, before=start)
+            for entity, previous_row in previous_rows.items():
+                if previous_row.id == latest[timeline][entity].id:
+                    continue  # still open, never stored
+                entry = entries[entity]
+                first_inside = entry.first_seen if entry.first_seen is not None else end
+                entry.add_clipped(previous_row.event_type, start, first_inside, start, end, sign=-1)
+
+        # 4. Open tail: the latest event's state continues until the window end
+        for entity, last in latest[timeline].items():
+            if last.timestamp <= end and (start is None or last.timestamp >= start):
+                entries[entity].add_clipped(last.event_type, last.timestamp, end, last.timestamp, end)
+
+    return {timeline: dict(entries) for timeline, entries in totals.items()}
@@ -0,0 +1,347 @@
+"""
+Background pre-aggregation scheduler.
+
+Expensive aggregates over the standard windows (factory / worker /
+workstation metrics for the last 1h, 8h, 24h, 7d and all history, worker
+leaderboards, and the hourly efficiency heatmaps) are refreshed every
+`precompute_interval_seconds` and stored as their JSON responses in
+`precomputed_results`. Endpoints called with `window=...` read them from
+there and compute in the request only when no result younger than
+`precompute_max_age_seconds` exists.
+
+The broker is the `scheduled_jobs` table: a runner claims a due job with a
+conditional UPDATE (due, and not leased or the lease expired), so several
+API processes can run the loop against one database and each job still runs
+once per interval. Backends (SCHEDULER_BACKEND):
+- "local": an asyncio task in every API process ticks the loop (default)
+- "celery": Celery beat schedules `run_job` on workers (app/celery_app.py)
+- "off": nothing in the API; `python -m app.services.scheduler_service`
+  runs the loop as its own process (or `--once` from cron)
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from .. import models
+from ..config import settings
+from ..database import SessionLocal
+from . import metrics_service, telemetry_service
+
+logger = logging.getLogger(__name__)
+
+# Standard windows ending now; None = all history
+WINDOWS: Dict[str, Optional[timedelta]] = {
+    "1h": timedelta(hours=1),
+    "8h": timedelta(hours=8),
+    "24h": timedelta(hours=24),
+    "7d": timedelta(days=7),
+    "all": None,
+}
+WINDOW_PATTERN = "^(" + "|".join(WINDOWS) + ")$"
+HEATMAP_WINDOW_PATTERN = "^(" + "|".join(w for w, span in WINDOWS.items() if span is not None) + ")$"
+# Heatmaps kept precomputed (hourly buckets); other windows and widths are computed in the request
+HEATMAP_WINDOWS = ("24h", "7d")
+HEATMAP_GROUPS = (None, "worker", "workstation", "location")
+LEADERBOARD_METRICS = ("units_per_hour", "utilization_percentage")
+
+# (key, window_start, JSON-ready result)
+Result = Tuple[str, Optional[datetime], Any]
+
+job_runs = telemetry_service.register(telemetry_service.Counter(
+    "scheduler_job_runs_total", "Background pre-aggregation job runs by outcome (ok, error).", ("job", "outcome")
+))
+job_seconds = telemetry_service.register(telemetry_service.Histogram(
+    "scheduler_job_duration_seconds", "Duration of each background pre-aggregation job run.", ("job",)
+))
+precomputed_reads = telemetry_service.register(telemetry_service.Counter(
+    "precomputed_reads_total", "Standard-window reads served from a precomputed result (hit) or computed in the request (miss).", ("outcome",)
+))
+
+
+def window_start(window: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    span = WINDOWS[window]
+    return None if span is None else (now or datetime.utcnow()) - span
+
+
+def heatmap_key(window: str, bucket_minutes: int, group_by: Optional[str]) -> Optional[str]:
+    """Results key of a heatmap request, or None when that heatmap is not precomputed."""
+    if window not in HEATMAP_WINDOWS or bucket_minutes != 60:
+        return None
+    return f"heatmap:{window}:{group_by or 'all'}"
+
+
+def leaderboard(workers: List[Dict[str, Any]], window: str, metric: str, computed_at: datetime, limit: Optional[int] = None) -> Dict[str, Any]:
+    """Workers (WorkerMetrics as dicts) ranked by `metric`, best first; ties by worker id."""
+    ranked = sorted(workers, key=lambda w: (-w[metric], w["worker_id"]))[:limit]
+    return {
+        "window": window,
+        "metric": metric,
+        "computed_at": computed_at,
+        "entries": [
+            {
+                "rank": rank,
+                "worker_id": w["worker_id"],
+                "worker_name": w["worker_name"],
+                "units_per_hour": w["units_per_hour"],
+                "utilization_percentage": w["utilization_percentage"],
+                "total_units_produced": w["total_units_produced"],
+            }
+            for rank, w in enumerate(ranked, 1)
+        ],
+    }
+
+
+# ========================================
+# Jobs
+# ========================================
+
+def _summaries(db: Session, now: datetime) -> Iterator[Result]:
+    """Metrics summary of every standard window, and the leaderboards ranked from it."""
+    for window in WINDOWS:
+        start = window_start(window, now)
+        summary = jsonable_encoder(metrics_service.metrics_summary(db, start))
+        yield f"summary:{window}", start, summary
+        for metric in LEADERBOARD_METRICS:
+            yield f"leaderboard:{window}:{metric}", start, jsonable_encoder(leaderboard(summary["workers"], window, metric, now))
+
+
+def _heatmaps(db: Session, now: datetime) -> Iterator[Result]:
+    for window in HEATMAP_WINDOWS:
+        start = window_start(window, now)
+        for group_by in HEATMAP_GROUPS:
+            yield heatmap_key(window, 60, group_by), start, jsonable_encoder(
+                metrics_service.get_efficiency_heatmap(db, start, None, 60, group_by)
+            )
+
+
+JOBS: Dict[str, Callable[[Session, datetime], Iterator[Result]]] = {
+    "summaries": _summaries,
+    "heatmaps": _heatmaps,
+}
+
+
+# ========================================
+# Broker (scheduled_jobs leases)
+# ========================================
+
+_jobs_registered = False
+
+
+def ensure_jobs(db: Session) -> None:
+    """Insert a schedule row for every job that has none (due immediately)."""
+    global _jobs_registered
+    if _jobs_registered:
+        return
+    existing = set(db.scalars(select(models.ScheduledJob.name)))
+    for name in JOBS:
+        if name in existing:
+            continue
+        db.add(models.ScheduledJob(name=name, next_run_at=datetime.utcnow(), run_count=0))
+        try:
+            db.commit()
+        except IntegrityError:  # another process registered it first
+            db.rollback()
+    _jobs_registered = True
+
+
+def claim(db: Session, name: str, owner: str, now: datetime, due_only: bool = True) -> bool:
+    """Lease `name` to `owner` unless another runner holds it (and, with due_only, unless it is not due)."""
+    job = models.ScheduledJob
+    stmt = (
+        update(job)
+        .where(job.name == name, or_(job.leased_until.is_(None), job.leased_until < now))
+        .values(leased_until=now + timedelta(seconds=settings.scheduler_lease_seconds), leased_by=owner)
+    )
+    if due_only:
+        stmt = stmt.where(job.next_run_at <= now)
+    claimed = db.execute(stmt).rowcount == 1
+    db.commit()
+    return claimed
+
+
+def _run_claimed(db: Session, name: str) -> Dict[str, Any]:
+    """Run a leased job, store its results, release the lease and schedule the next run."""
+    now = datetime.utcnow()
+    started = mark = time.perf_counter()
+    written, error = 0, None
+    try:
+        for key, start, result in JOBS[name](db, now):
+            db.merge(models.PrecomputedResult(
+                key=key,
+                payload=json.dumps(result, separators=(",", ":")),
+                window_start=start,
+                window_end=now,
+                computed_at=now,
+                compute_ms=round((time.perf_counter() - mark) * 1000, 3),
+            ))
+            written += 1
+            mark = time.perf_counter()
+        db.commit()
+    except Exception as exc:
+        db.rollback()
+        error = str(exc)[:500]
+        logger.exception(f"Scheduled job {name} failed")
+
+    seconds = time.perf_counter() - started
+    db.execute(
+        update(models.ScheduledJob)
+        .where(models.ScheduledJob.name == name)
+        .values(
+            next_run_at=now + timedelta(seconds=settings.precompute_interval_seconds),
+            leased_until=None,
+            leased_by=None,
+            last_finished_at=datetime.utcnow(),
+            last_duration_ms=round(seconds * 1000, 3),
+            last_error=error,
+            run_count=models.ScheduledJob.run_count + 1,
+        )
+    )
+    db.commit()
+    job_runs.inc((name, "error" if error else "ok"))
+    job_seconds.observe(seconds, (name,))
+    return {"job": name, "status": "error" if error else "ok", "results": written, "seconds": round(seconds, 3), "error": error}
+
+
+def run_due(owner: str) -> List[Dict[str, Any]]:
+    """Run every due job this runner can claim."""
+    db = SessionLocal()
+    try:
+        ensure_jobs(db)
+        return [_run_claimed(db, name) for name in JOBS if claim(db, name, owner, datetime.utcnow())]
+    finally:
+        db.close()
+
+
+def run_job(name: str, owner: Optional[str] = None) -> Dict[str, Any]:
+    """Run `name` now whether or not it is due (Celery task, CLI); skipped while another runner holds it."""
+    db = SessionLocal()
+    try:
+        ensure_jobs(db)
+        if not claim(db, name, owner or runner_id(), datetime.utcnow(), due_only=False):
+            return {"job": name, "status": "busy"}
+        return _run_claimed(db, name)
+    finally:
+        db.close()
+
+
+def runner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ========================================
+# Results
+# ========================================
+
+class Stored:
+    """A precomputed result as stored (JSON text), decoded on first use."""
+
+    __slots__ = ("computed_at", "raw", "_payload")
+
+    def __init__(self, computed_at: datetime, raw: str):
+        self.computed_at, self.raw, self._payload = computed_at, raw, None
+
+    def payload(self) -> Any:
+        if self._payload is None:
+            self._payload = json.loads(self.raw)
+        return self._payload
+
+
+# key -> last result read: a hit on an unchanged result reads one timestamp, not the JSON
+_stored: Dict[str, Stored] = {}
+
+
+def read(db: Session, key: Optional[str]) -> Optional[Stored]:
+    """The result stored under `key` if computed within precompute_max_age_seconds, else None."""
+    computed_at = None
+    if key is not None and settings.precompute_max_age_seconds > 0:
+        computed_at = db.scalar(select(models.PrecomputedResult.computed_at).where(models.PrecomputedResult.key == key))
+    if computed_at is None or computed_at < datetime.utcnow() - timedelta(seconds=settings.precompute_max_age_seconds):
+        precomputed_reads.inc(("miss",))
+        return None
+    precomputed_reads.inc(("hit",))
+    stored = _stored.get(key)
+    if stored is None or stored.computed_at != computed_at:
+        raw = db.scalar(select(models.PrecomputedResult.payload).where(models.PrecomputedResult.key == key))
+        if raw is None:  # invalidated in between
+            return None
+        stored = _stored[key] = Stored(computed_at, raw)
+    return stored
+
+
+def invalidate(db: Session) -> None:
+    """Drop every result and make every job due (after clearing or reseeding data). The caller commits."""
+    db.query(models.PrecomputedResult).delete()
+    db.execute(update(models.ScheduledJob).values(next_run_at=datetime.utcnow()))
+    _stored.clear()
+
+
+# ========================================
+# Local backend
+# ========================================
+
+class LocalScheduler:
+    """Ticks `run_due` from an asyncio task, running the jobs in the threadpool."""
+
+    def __init__(self) -> None:
+        self._task: Optional[asyncio.Task] = None
+        self.owner = runner_id()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None or self._task.done():
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await run_in_threadpool(run_due, self.owner)
+            except Exception as exc:
+                logger.error(f"Scheduler tick failed: {exc}")
+            await asyncio.sleep(settings.scheduler_tick_seconds)
+
+
+scheduler = LocalScheduler()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the pre-aggregation jobs outside the API (SCHEDULER_BACKEND=off)")
+    parser.add_argument("--once", action="store_true", help="Run every job once and exit")
+    args = parser.parse_args(argv)
+
+    from ..bootstrap import init_schema
+
+    logging.basicConfig(level=getattr(logging, settings.log_level))
+    init_schema()
+    if args.once:
+        for name in JOBS:
+            print(run_job(name))
+        return
+    owner = runner_id()
+    while True:
+        for result in run_due(owner):
+            logger.info(f"Scheduled job: {result}")
+        time.sleep(settings.scheduler_tick_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Live dashboard stream (Server-Sent Events).
+
+One broadcaster task serves every `/api/stream` subscriber. Each tick it
+compares the metrics cache ETag (ingest generation + time slot, see
+cache_service) with the last one it sent; when it changed, it computes one
+metrics summary (shared with the polling endpoints through the cache) and,
+if events were ingested, reads the events stored since the oldest subscriber
+cursor (page by page, until a short page). Both are fanned out to all
+subscribers, each filtered by its own worker / workstation selection and by
+its cursor: the last event id it has been sent, starting at the newest id when
+it connected. With no subscribers the task stops.
+
+Ids are not committed in order: on PostgreSQL a sequence value is taken at
+insert, so a transaction that commits late makes a smaller id visible after a
+larger one was sent. Each read therefore starts below the cursor, at the
+newest id that had been read `stream_overlap_seconds` ago, and events already
+sent (remembered by id down to that point) are dropped. An event whose
+transaction commits more than the overlap after a larger id was read is not
+streamed; clients that need every event re-poll /api/events.
+
+Message types:
+- `snapshot`: {"factory", "workers", "workstations"} as in /api/metrics/summary
+- `events`: list of newly stored events (AIEventResponse), oldest first
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+
+from .. import crud, schemas
+from ..config import settings
+from ..database import SessionLocal
+from . import cache_service, metrics_service
+
+logger = logging.getLogger(__name__)
+
+# Cache key shared with GET /api/metrics/summary (no query parameters).
+SNAPSHOT_CACHE_KEY = ("/api/metrics/summary", ())
+# Events sent with the initial state, and the page size of a tick's delta read.
+INITIAL_EVENTS = 60
+MAX_EVENT_DELTA = 500
+# Messages buffered per subscriber; a slow client drops its oldest messages.
+SUBSCRIBER_QUEUE_SIZE = 32
+
+
+def _format(kind: str, payload: Any) -> str:
+    return f"event: {kind}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+def _serialize_events(rows) -> List[Dict[str, Any]]:
+    return [jsonable_encoder(schemas.AIEventResponse.model_validate(row)) for row in rows]
+
+
+class Subscriber:
+    """One connected client: its message queue, optional filters and event cursor."""
+
+    __slots__ = ("queue", "worker_id", "workstation_id", "after_id", "initial_ids")
+
+    def __init__(self, worker_id: Optional[str] = None, workstation_id: Optional[str] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.worker_id = worker_id
+        self.workstation_id = workstation_id
+        self.after_id = 0  # id of the last event this client has been sent (or had stored when it connected)
+        self.initial_ids: Set[int] = set()  # sent with the initial state
+
+    @property
+    def filters(self) -> Tuple[Optional[str], Optional[str]]:
+        return self.worker_id, self.workstation_id
+
+    def offer(self, message: str) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    def select_snapshot(self, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "factory": snapshot["factory"],
+            "workers": [w for w in snapshot["workers"] if not self.worker_id or w["worker_id"] == self.worker_id],
+            "workstations": [
+                s for s in snapshot["workstations"] if not self.workstation_id or s["workstation_id"] == self.workstation_id
+            ],
+        }
+
+    def select_events(self, events: List[Dict[str, Any]], late: Set[int]) -> List[Dict[str, Any]]:
+        """Events past the cursor, plus the `late` ones (committed below it since they were last read)."""
+        return [
+            e for e in events
+            if (e["id"] > self.after_id or e["id"] in late)
+            and e["id"] not in self.initial_ids
+            and (not self.worker_id or e["worker_id"] == self.worker_id)
+            and (not self.workstation_id or e["workstation_id"] == self.workstation_id)
+        ]
+
+
+class Broadcaster:
+    """Computes one snapshot per change and fans it out to every subscriber."""
+
+    def __init__(self) -> None:
+        self.subscribers: Set[Subscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._etag: Optional[str] = None
+        self._generation: Optional[int] = None
+        self._last_event_id = 0  # newest event id read so far
+        self._cursors: Deque[Tuple[float, int]] = deque()  # (monotonic time, newest id read by then)
+        self._sent: Set[int] = set()  # ids read above the overlap floor
+
+    async def connect(self, worker_id: Optional[str] = None, workstation_id: Optional[str] = None) -> Subscriber:
+        """Register a subscriber, queue its initial state, and make sure the tick task runs."""
+        subscriber = Subscriber(worker_id, workstation_id)
+        snapshot, events = await run_in_threadpool(self._initial_state, subscriber)
+        subscriber.offer(_format("snapshot", subscriber.select_snapshot(snapshot)))
+        subscriber.offer(_format("events", events))
+        self.subscribers.add(subscriber)
+
+        if self._task is None or self._task.done():
+            self._etag = self._generation = None
+            self._last_event_id = subscriber.after_id
+            self._cursors = deque([(time.monotonic(), subscriber.after_id)])
+            self._sent = set()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return subscriber
+
+    def disconnect(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+
+    async def _run(self) -> None:
+        while self.subscribers:
+            try:
+                await self._tick()
+            except Exception as exc:
+                logger.error(f"Live stream tick failed: {exc}")
+            await asyncio.sleep(settings.stream_tick_seconds)
+
+    async def _tick(self) -> None:
+        etag = cache_service.etag_for()
+        generation = cache_service.current_generation()
+        subscribers = list(self.subscribers)
+        after = min((s.after_id for s in subscribers), default=self._last_event_id)
+        # A client that connected while a delta was being read has not been sent it yet
+        lagging = after < self._last_event_id
+        if etag == self._etag and not lagging:
+            return
+        floor = self._overlap_floor()
+        read_from = min(after, floor) if generation != self._generation or lagging else None
+        snapshot, events = await run_in_threadpool(self._compute, etag, read_from)
+        send_snapshot = etag != self._etag
+        self._etag, self._generation = etag, generation
+        late = {e["id"] for e in events if floor < e["id"] <= self._last_event_id and e["id"] not in self._sent}
+        self._sent.update(e["id"] for e in events if e["id"] > floor)
+        if events:
+            self._last_event_id = max(self._last_event_id, max(e["id"] for e in events))
+            self._cursors.append((time.monotonic(), self._last_event_id))
+
+        encoded: Dict[Tuple[Optional[str], Optional[str], int, int], Tuple[str, Optional[str]]] = {}
+        for subscriber in subscribers:
+            key = (*subscriber.filters, subscriber.after_id, id(subscriber) if subscriber.initial_ids & late else 0)
+            if key not in encoded:
+                selected = subscriber.select_events(events, late)
+                encoded[key] = (
+                    _format("snapshot", subscriber.select_snapshot(snapshot)),
+                    _format("events", selected) if selected else None,
+                )
+            snapshot_message, events_message = encoded[key]
+            if send_snapshot:
+                subscriber.offer(snapshot_message)
+            if events_message:
+                subscriber.offer(events_message)
+            if events:
+                subscriber.after_id = max(subscriber.after_id, self._last_event_id)
+
+    def _overlap_floor(self) -> int:
+        """Newest id read at least `stream_overlap_seconds` ago; ids sent at or below it are forgotten."""
+        cutoff = time.monotonic() - settings.stream_overlap_seconds
+        while len(self._cursors) > 1 and self._cursors[1][0] <= cutoff:
+            self._cursors.popleft()
+        floor = self._cursors[0][1] if self._cursors else self._last_event_id
+        self._sent = {event_id for event_id in self._sent if event_id > floor}
+        return floor
+
+    def _snapshot(self, db, etag: str) -> Dict[str, Any]:
+        summary = cache_service.metrics_cache.get_or_compute(
+            SNAPSHOT_CACHE_KEY, etag, lambda: metrics_service.metrics_summary(db)
+        )
+        return jsonable_encoder(summary)
+
+    def _compute(self, etag: str, after_id: Optional[int]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """The snapshot, and every event stored after `after_id` (none when it is None)."""
+        db = SessionLocal()
+        try:
+            snapshot = self._snapshot(db, etag)
+            rows: List = []
+            while after_id is not None:
+                page = crud.get_events_after(db, after_id, MAX_EVENT_DELTA)
+                rows.extend(page)
+                after_id = page[-1].id if len(page) == MAX_EVENT_DELTA else None
+            return snapshot, _serialize_events(rows)
+        finally:
+            db.close()
+
+    def _initial_state(self, subscriber: Subscriber) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Snapshot and recent events; sets the subscriber's cursor so later events come from the ticks."""
+        db = SessionLocal()
+        try:
+            snapshot = self._snapshot(db, cache_service.etag_for())
+            # Cursor first: an event stored meanwhile is left to the ticks, not sent twice
+            subscriber.after_id = crud.get_max_event_id(db)
+            rows = crud.get_events(db, subscriber.worker_id, subscriber.workstation_id, limit=INITIAL_EVENTS)
+            rows = [row for row in rows if row.id <= subscriber.after_id]
+            subscriber.initial_ids = {row.id for row in rows}
+            return snapshot, list(reversed(_serialize_events(rows)))
+        finally:
+            db.close()
+
+
+broadcaster = Broadcaster()
+
+
+async def sse_messages(request: Request, subscriber: Subscriber):
+    """Yield a subscriber's messages as SSE text, with keep-alive comments, until it disconnects."""
+    try:
+        yield f"retry: {settings.stream_retry_ms}\n\n"
+        while not await request.is_disconnected():
+            try:
+                yield await asyncio.wait_for(subscriber.queue.get(), timeout=settings.stream_keepalive_seconds)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+    finally:
+        broadcaster.disconnect(subscriber)
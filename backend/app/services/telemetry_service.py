@@ -0,0 +1,273 @@
+"""
+Prometheus-style instrumentation.
+
+A small in-process registry of counters and histograms rendered in the
+Prometheus text exposition format by `GET /metrics`, without a client library:
+
+- HTTP: request count and latency per route template (RequestMetricsMiddleware)
+- SQL: query count and time per statement type, and per request, through
+  engine event hooks (`instrument_engine`); pool usage at scrape time
+- ingest: events created / duplicate / rejected (by reason)
+- metrics_service: compute time per function (`timed`)
+- queue depth, dedup filter and result cache figures, read at scrape time
+
+Hot-path cost is a perf_counter pair plus a few dict updates under a lock per
+request, per query and per ingest call.
+"""
+
+import bisect
+import functools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.label_names = name, help_text, tuple(labels)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help_text, tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            row[index] += 1
+            row[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((labels, list(row)) for labels, row in self._values.items())
+        for labels, row in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), row[:-1]):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(row[-1])}"
+            yield f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}"
+
+
+class Gauge:
+    """Value read from a callback at scrape time: () -> {labels: value}."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], Dict[Labels, float]], labels: Sequence[str] = ()):
+        self.name, self.help, self.label_names = name, help_text, tuple(labels)
+        self.read = read
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in sorted(self.read().items()):
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+_metrics: List[Any] = []
+
+
+def register(metric):
+    _metrics.append(metric)
+    return metric
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text format (version 0.0.4)."""
+    lines: List[str] = []
+    for metric in _metrics:
+        try:
+            samples = list(metric.samples())
+        except Exception as exc:  # a broken gauge callback must not fail the scrape
+            lines.append(f"# {metric.name} unavailable: {exc}")
+            continue
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+# ========================================
+# HTTP
+# ========================================
+
+http_requests = register(Counter("http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")))
+http_latency = register(Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route")))
+http_db_queries = register(Histogram(
+    "http_request_db_queries", "SQL queries issued while serving one request.", ("route",), QUERY_COUNT_BUCKETS
+))
+http_db_seconds = register(Histogram("http_request_db_seconds", "SQL time spent while serving one request.", ("route",)))
+
+# [query count, seconds] of the request being served in this context
+_request_db: ContextVar[Optional[List[float]]] = ContextVar("request_db", default=None)
+
+
+def start_request() -> Any:
+    """Begin attributing SQL to the current request; pass the token to `finish_request`."""
+    return _request_db.set([0, 0.0])
+
+
+def finish_request(token: Any, method: str, route: str, status: int, seconds: float) -> None:
+    stats = _request_db.get()
+    _request_db.reset(token)
+    http_requests.inc((method, route, str(status)))
+    http_latency.observe(seconds, (method, route))
+    if stats is not None:
+        http_db_queries.observe(stats[0], (route,))
+        http_db_seconds.observe(stats[1], (route,))
+
+
+# ========================================
+# SQL
+# ========================================
+
+db_queries = register(Counter("db_queries_total", "SQL statements executed, by statement type.", ("statement",)))
+db_seconds = register(Counter("db_query_seconds_total", "Time spent executing SQL, by statement type.", ("statement",)))
+_pools: List[Tuple[str, Any]] = []
+
+
+def _pool_usage() -> Dict[Labels, float]:
+    values: Dict[Labels, float] = {}
+    for name, pool in _pools:
+        for stat in ("size", "checkedout", "overflow", "checkedin"):
+            reader = getattr(pool, stat, None)
+            if callable(reader):
+                values[(name, stat)] = reader()
+    return values
+
+
+register(Gauge("db_pool_connections", "Connection pool usage (size, checkedout, overflow, checkedin).", _pool_usage, ("engine", "stat")))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    elapsed = time.perf_counter() - started
+    kind = statement.lstrip()[:6].upper()
+    kind = kind if kind in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+    db_queries.inc((kind,))
+    db_seconds.inc((kind,), elapsed)
+    stats = _request_db.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def _handle_error(context):
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine, name: str = "default") -> None:
+    """Count and time every statement on `engine` (a sync Engine or an AsyncEngine's sync_engine)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    _pools.append((name, engine.pool))
+
+
+# ========================================
+# Ingest
+# ========================================
+
+ingest_events = register(Counter(
+    "ingest_events_total", "Ingested events by outcome (created, duplicate, rejected) and rejection reason.", ("outcome", "reason")
+))
+
+
+def record_ingest(results: Iterable[Dict[str, Any]]) -> None:
+    """Count `ingest_many`-style outcomes ({"status", "reason"?})."""
+    counts: Dict[Labels, int] = {}
+    for result in results:
+        if result["status"] == "error":
+            key = ("rejected", result.get("reason", "error"))
+        else:
+            key = (result["status"], "")
+        counts[key] = counts.get(key, 0) + 1
+    for key, count in counts.items():
+        ingest_events.inc(key, count)
+
+
+def record_rejected(reason: str, count: int = 1) -> None:
+    if count:
+        ingest_events.inc(("rejected", reason), count)
+
+
+# ========================================
+# Metrics computation
+# ========================================
+
+metrics_compute = register(Histogram(
+    "metrics_compute_duration_seconds", "Time spent in metrics_service functions.", ("function",)
+))
+
+
+def timed(fn):
+    """Record each call's duration in metrics_compute_duration_seconds{function=...}."""
+    labels = (fn.__name__,)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            metrics_compute.observe(time.perf_counter() - started, labels)
+
+    return wrapper
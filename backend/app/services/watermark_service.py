@@ -0,0 +1,227 @@
+"""
+Ingest watermark and late-data accounting.
+
+The watermark is the newest event time ingested, kept per worker, per
+workstation and overall. Every stored event is classified against the marks
+as they were before its transaction:
+
+- in_order: at or after the newest event of its worker. The rollups only
+  close the interval the worker was in (the common case)
+- reordered: behind its worker, but within `allowed_lateness_seconds` of the
+  overall watermark (network jitter, small edge-device buffers)
+- late: older than watermark - allowed lateness. The minute/hour/day buckets
+  it changes were already final; each one rewritten counts as a stale bucket
+
+Reordered and late events recompute only the intervals around them:
+`rollup_service.apply_events` reads each one's stored neighbours on the
+entity's timeline (idx_worker_timeline / idx_workstation_timeline) and
+re-applies the intervals it splits, instead of re-reading everything between
+the oldest and the newest event of the batch.
+
+Marks are per process and only a hint. A mark behind another process's ingest
+can count an event as in order when it is not; that skews the counts, never
+the rollups, whose spans are always bounded by stored neighbours. The tracker
+loads itself from the latest stored events before the first insert it has to
+judge (so never from the batch being judged); `events_service` feeds it after
+each commit, seed data only advances the marks, and the clear paths reset it.
+"""
+
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .. import crud
+from ..config import settings
+from . import telemetry_service
+
+ARRIVALS = ("in_order", "reordered", "late")
+SCOPES = ("worker", "workstation")
+
+# Seconds behind the watermark: jitter through day-old edge-device backlogs
+LATENESS_BUCKETS = (1.0, 10.0, 60.0, 300.0, 900.0, 3600.0, 14400.0, 86400.0)
+
+arrivals_total = telemetry_service.register(telemetry_service.Counter(
+    "ingest_arrivals_total", "Stored events by arrival order against the ingest watermark (in_order, reordered, late).", ("arrival",)
+))
+lateness_seconds = telemetry_service.register(telemetry_service.Histogram(
+    "ingest_event_lateness_seconds", "How far behind the watermark reordered and late events arrived.", (), LATENESS_BUCKETS
+))
+watermark_lag = telemetry_service.register(telemetry_service.Gauge(
+    "ingest_watermark_lag_seconds", "Wall-clock time minus the ingest watermark (newest event time stored).",
+    lambda: {} if watermarks.watermark is None else {(): (datetime.utcnow() - watermarks.watermark).total_seconds()},
+))
+stale_buckets_total = telemetry_service.register(telemetry_service.Counter(
+    "rollup_stale_buckets_total", "Final rollup buckets rewritten by late events.", ("timeline", "resolution")
+))
+
+
+def _naive(timestamp: datetime) -> datetime:
+    return timestamp.replace(tzinfo=None)  # stored naive, as crud.event_key
+
+
+class Arrivals:
+    """How the events of one ingest transaction arrived; recorded once it commits."""
+
+    __slots__ = ("events", "final_before", "stale_buckets")
+
+    def __init__(self) -> None:
+        # Buckets ending at or before this were final (watermark - allowed lateness)
+        self.final_before: Optional[datetime] = None
+        # (event, arrival, seconds behind the watermark)
+        self.events: List[Tuple[Any, str, float]] = []
+        # (timeline, resolution) -> final buckets rewritten
+        self.stale_buckets: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def keys(self, arrival: str) -> set:
+        """Dedup keys of the events that arrived as `arrival`."""
+        return {crud.event_key(e.timestamp, e.worker_id, e.event_type) for e, kind, _ in self.events if kind == arrival}
+
+
+class DeviceLateness:
+    """Reordered / late counts of one edge device (workstation camera)."""
+
+    __slots__ = ("reordered", "late", "max_lateness")
+
+    def __init__(self) -> None:
+        self.reordered = 0
+        self.late = 0
+        self.max_lateness = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "reordered": self.reordered,
+            "late": self.late,
+            "max_lateness_seconds": round(self.max_lateness, 3),
+        }
+
+
+class Watermarks:
+    """Newest event time per worker, per workstation and overall, plus late-data counts."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self.marks: Dict[str, Dict[str, datetime]] = {scope: {} for scope in SCOPES}
+        self.watermark: Optional[datetime] = None
+        self.counts: Dict[str, int] = dict.fromkeys(ARRIVALS, 0)
+        self.stale: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.devices: Dict[str, DeviceLateness] = defaultdict(DeviceLateness)
+
+    def _advance(self, scope: str, entity_id: str, timestamp: datetime) -> None:
+        marks = self.marks[scope]
+        if entity_id not in marks or timestamp > marks[entity_id]:
+            marks[entity_id] = timestamp
+        if self.watermark is None or timestamp > self.watermark:
+            self.watermark = timestamp
+
+    def load(self, db: Session) -> None:
+        """Set the marks from the latest stored event of every worker and workstation (counts are kept)."""
+        from .rollup_service import latest_events
+
+        latest = {scope: latest_events(db, scope) for scope in SCOPES}
+        with self._lock:
+            self.marks = {scope: {} for scope in SCOPES}
+            self.watermark = None
+            for scope, rows in latest.items():
+                for entity_id, row in rows.items():
+                    self._advance(scope, entity_id, row.timestamp)
+            self._loaded = True
+
+    def ensure_loaded(self, db: Session) -> None:
+        if not self._loaded:
+            self.load(db)
+
+    def mark(self, scope: str, entity_id: str) -> Optional[datetime]:
+        """Newest event time seen for one worker or workstation (None = none yet)."""
+        return self.marks[scope].get(entity_id)
+
+    def classify(self, events: List[Any]) -> Arrivals:
+        """
+        Arrival of each event against the marks as they stand. The watermark
+        includes the batch itself, so one backlog upload is judged as a whole.
+        """
+        arrivals = Arrivals()
+        if not events:
+            return arrivals
+        with self._lock:
+            watermark = max(_naive(e.timestamp) for e in events)
+            if self.watermark is not None and self.watermark > watermark:
+                watermark = self.watermark
+            allowed = timedelta(seconds=settings.allowed_lateness_seconds)
+            arrivals.final_before = watermark - allowed
+            for event in events:
+                timestamp = _naive(event.timestamp)
+                mark = self.marks["worker"].get(event.worker_id)
+                behind = (watermark - timestamp).total_seconds()
+                if mark is None or timestamp >= mark:
+                    arrivals.events.append((event, "in_order", behind))
+                elif timestamp >= arrivals.final_before:
+                    arrivals.events.append((event, "reordered", behind))
+                else:
+                    arrivals.events.append((event, "late", behind))
+        return arrivals
+
+    def observe(self, arrivals: Arrivals, count: bool = True) -> None:
+        """
+        Advance the marks and count the arrivals of a committed transaction
+        (count=False: marks only, for seed data).
+        """
+        with self._lock:
+            for event, arrival, behind in arrivals.events:
+                if self._loaded:
+                    self._advance("worker", event.worker_id, _naive(event.timestamp))
+                    self._advance("workstation", event.workstation_id, _naive(event.timestamp))
+                if not count:
+                    continue
+                self.counts[arrival] += 1
+                arrivals_total.inc((arrival,))
+                if arrival != "in_order":
+                    device = self.devices[event.workstation_id]
+                    setattr(device, arrival, getattr(device, arrival) + 1)
+                    device.max_lateness = max(device.max_lateness, behind)
+                    lateness_seconds.observe(behind)
+            if not count:
+                return
+            for (timeline, resolution), buckets in arrivals.stale_buckets.items():
+                self.stale[(timeline, resolution)] += buckets
+                stale_buckets_total.inc((timeline, resolution), buckets)
+
+    def reset(self) -> None:
+        """Forget marks and counts; the next ingest reloads the marks from the database."""
+        with self._lock:
+            self._reset()
+            self._loaded = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Compact figures for /health."""
+        with self._lock:
+            return {
+                "watermark": self.watermark,
+                "allowed_lateness_seconds": settings.allowed_lateness_seconds,
+                "events": dict(self.counts),
+                "stale_buckets": sum(n for (timeline, _), n in self.stale.items() if timeline == "worker"),
+            }
+
+    def report(self) -> Dict[str, Any]:
+        """Late-data report: totals, stale buckets by resolution and per edge device, most late first."""
+        with self._lock:
+            stale: Dict[str, Dict[str, int]] = defaultdict(dict)
+            for (timeline, resolution), buckets in self.stale.items():
+                stale[timeline][resolution] = buckets
+            devices = sorted(self.devices.items(), key=lambda item: (-item[1].late, -item[1].reordered, item[0]))
+            return {
+                "watermark": self.watermark,
+                "allowed_lateness_seconds": settings.allowed_lateness_seconds,
+                "events": dict(self.counts),
+                "stale_buckets": dict(stale),
+                "workstations": [dict(workstation_id=station, **device.summary()) for station, device in devices],
+            }
+
+
+watermarks = Watermarks()
@@ -0,0 +1,11 @@
+"""
+Performance benchmarks.
+
+Builds a synthetic factory at configurable scale, measures ingest throughput
+and metrics endpoint latency against a throwaway SQLite database, and writes a
+JSON report that `benchmarks.compare` diffs between commits.
+
+    cd backend
+    python -m benchmarks.run --workers 50 --days 7 --output before.json
+    python -m benchmarks.compare before.json after.json
+"""
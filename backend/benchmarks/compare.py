@@ -0,0 +1,77 @@
+"""
+Compare two benchmark reports.
+
+Prints every throughput and latency figure side by side and exits with
+status 1 when any of them regressed by more than --threshold (default 20%).
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.1
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# (label, value, True when higher is better)
+Figure = Tuple[str, float, bool]
+
+
+def figures(report: Dict[str, Any]) -> Iterator[Figure]:
+    for mode, result in sorted(report.get("ingest", {}).items()):
+        if result.get("events_per_second") is not None:
+            yield f"ingest.{mode}.events_per_second", result["events_per_second"], True
+        for stat in ("p50_ms", "p99_ms"):
+            if stat in result.get("latency", {}):
+                yield f"ingest.{mode}.{stat}", result["latency"][stat], False
+    for path, result in sorted(report.get("metrics", {}).items()):
+        for mode in ("cold", "warm"):
+            for stat in ("p50_ms", "p99_ms"):
+                if stat in result.get(mode, {}):
+                    yield f"{path}.{mode}.{stat}", result[mode][stat], False
+    peak = report.get("memory", {}).get("after_metrics", {}).get("peak_rss_mb")
+    if peak is not None:
+        yield "memory.peak_rss_mb", peak, False
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> List[str]:
+    """Print the comparison table and return the labels that regressed."""
+    base = {label: (value, higher) for label, value, higher in figures(baseline)}
+    regressions = []
+    print(f"{'figure':<58} {'baseline':>12} {'candidate':>12} {'change':>8}")
+    for label, value, higher_is_better in figures(candidate):
+        if label not in base or not base[label][0]:
+            continue
+        before = base[label][0]
+        change = (value - before) / before
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > threshold:
+            regressions.append(label)
+            flag = "  REGRESSED"
+        print(f"{label:<58} {before:>12.2f} {value:>12.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    with open(args.candidate) as handle:
+        candidate = json.load(handle)
+
+    if baseline.get("meta", {}).get("spec") != candidate.get("meta", {}).get("spec"):
+        print("warning: reports were produced with different factory specs", file=sys.stderr)
+    regressions = compare(baseline, candidate, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} figure(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Synthetic factory generator for benchmarks.
+
+Produces workers, workstations and a stream of AI events shaped like the edge
+traffic: each worker follows a working/idle/absent Markov chain at its own
+workstation, emits product_count events while working, and the stream is
+delivered with a configurable share of late (out-of-order) events and retried
+duplicates.
+"""
+
+import random
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+# state -> (next state, cumulative probability)
+TRANSITIONS = {
+    "working": (("working", 0.70), ("idle", 0.92), ("absent", 1.0)),
+    "idle": (("working", 0.55), ("idle", 0.90), ("absent", 1.0)),
+    "absent": (("working", 0.60), ("idle", 0.85), ("absent", 1.0)),
+}
+PRODUCT_CHANCE = 0.5  # product_count event alongside a working observation
+LATE_MAX_POSITIONS = 500  # How far back in the stream a late event can land
+
+
+@dataclass
+class FactorySpec:
+    """Scale and shape of a synthetic factory."""
+    workers: int = 20
+    workstations: int = 20
+    days: float = 2.0
+    events_per_minute: float = 1.0  # State observations per worker per minute
+    out_of_order_ratio: float = 0.02  # Share of events delivered late
+    duplicate_ratio: float = 0.01  # Share of events delivered twice
+    seed: int = 42
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def worker_rows(spec: FactorySpec) -> List[Dict[str, Any]]:
+    shifts = ("morning", "evening", "night")
+    return [
+        {"id": f"W{i}", "name": f"Worker {i}", "shift": shifts[i % 3], "department": f"Line {i % 5 + 1}"}
+        for i in range(1, spec.workers + 1)
+    ]
+
+
+def workstation_rows(spec: FactorySpec) -> List[Dict[str, Any]]:
+    types = ("assembly", "inspection", "packaging")
+    return [
+        {"id": f"S{i}", "name": f"Station {i}", "location": f"Floor {chr(65 + i % 4)}", "type": types[i % 3]}
+        for i in range(1, spec.workstations + 1)
+    ]
+
+
+def _next_state(rng: random.Random, state: str) -> str:
+    roll = rng.random()
+    for candidate, threshold in TRANSITIONS[state]:
+        if roll < threshold:
+            return candidate
+    return state
+
+
+def timeline(spec: FactorySpec, end: datetime) -> List[Dict[str, Any]]:
+    """All events of the factory in timestamp order (before late delivery / duplicates)."""
+    rng = random.Random(spec.seed)
+    step = timedelta(minutes=1 / spec.events_per_minute)
+    start = end - timedelta(days=spec.days)
+    states = {f"W{i}": "absent" for i in range(1, spec.workers + 1)}
+    stations = {f"W{i}": f"S{(i - 1) % spec.workstations + 1}" for i in range(1, spec.workers + 1)}
+
+    events: List[Dict[str, Any]] = []
+    ts = start
+    while ts < end:
+        for worker_id, state in states.items():
+            state = states[worker_id] = _next_state(rng, state)
+            # Spread observations inside the step so timestamps do not collide across workers
+            at = ts + timedelta(microseconds=rng.randrange(int(step.total_seconds() * 1e6)))
+            base = {"worker_id": worker_id, "workstation_id": stations[worker_id]}
+            events.append({**base, "timestamp": at, "event_type": state, "confidence": round(rng.uniform(0.8, 0.99), 3), "count": 1})
+            if state == "working" and rng.random() < PRODUCT_CHANCE:
+                events.append({
+                    **base, "timestamp": at, "event_type": "product_count",
+                    "confidence": round(rng.uniform(0.85, 0.99), 3), "count": rng.randint(1, 3),
+                })
+        ts += step
+    events.sort(key=lambda e: e["timestamp"])
+    return events
+
+
+def delivery_order(spec: FactorySpec, events: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Events as the edge would deliver them: some late, some twice."""
+    rng = random.Random(spec.seed + 1)
+    keyed: List[Tuple[float, Dict[str, Any]]] = []
+    for position, event in enumerate(events):
+        delay = rng.randint(1, LATE_MAX_POSITIONS) if rng.random() < spec.out_of_order_ratio else 0
+        keyed.append((position + delay, event))
+        if rng.random() < spec.duplicate_ratio:
+            keyed.append((position + rng.randint(1, LATE_MAX_POSITIONS) + 0.5, event))
+    keyed.sort(key=lambda item: item[0])
+    return (event for _, event in keyed)
+
+
+def to_json(event: Dict[str, Any]) -> Dict[str, Any]:
+    return {**event, "timestamp": event["timestamp"].isoformat()}
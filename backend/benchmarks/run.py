@@ -0,0 +1,269 @@
+"""
+Ingest and metrics benchmark.
+
+Runs the real application (in-process, through TestClient) against a fresh
+SQLite database in a temporary directory:
+
+1. batch ingest: the generated stream through POST /api/events/batch
+2. single ingest: the newest events one by one through POST /api/events
+3. metrics: every GET /api/metrics/* route over the generated range, cold
+   (result cache cleared before each request) and warm (cached)
+
+and writes a JSON report (throughput, p50/p99 latency, peak RSS).
+
+    python -m benchmarks.run --workers 50 --workstations 20 --days 7 --output report.json
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from .factory import FactorySpec, delivery_order, timeline, to_json, worker_rows, workstation_rows
+
+try:
+    import resource
+except ImportError:
+    # Fallback if not on a Unix platform: RSS is not reported
+    resource = None
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(max(math.ceil(pct / 100 * len(ordered)) - 1, 0), len(ordered) - 1)
+    return ordered[index]
+
+
+def _latency(samples: List[float]) -> Dict[str, Any]:
+    """Latency summary in milliseconds for per-request durations in seconds."""
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+        "p99_ms": round(_percentile(samples, 99) * 1000, 3),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+    }
+
+
+def _rss_mb() -> Dict[str, Optional[float]]:
+    current = None
+    try:
+        with open("/proc/self/statm") as statm:
+            current = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    peak = None
+    if resource is not None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = maxrss / 2**20 if sys.platform == "darwin" else maxrss / 2**10
+    return {
+        "rss_mb": round(current, 1) if current is not None else None,
+        "peak_rss_mb": round(peak, 1) if peak is not None else None,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_batch(client, events: List[Dict[str, Any]], batch_size: int) -> Dict[str, Any]:
+    samples: List[float] = []
+    totals = {"success_count": 0, "duplicate_count": 0, "error_count": 0}
+    started = time.perf_counter()
+    for offset in range(0, len(events), batch_size):
+        payload = {"events": [to_json(e) for e in events[offset:offset + batch_size]]}
+        t0 = time.perf_counter()
+        response = client.post("/api/events/batch", json=payload)
+        samples.append(time.perf_counter() - t0)
+        response.raise_for_status()
+        body = response.json()
+        for key in totals:
+            totals[key] += body.get(key, 0)
+    elapsed = time.perf_counter() - started
+    return {
+        "events": len(events),
+        "batch_size": batch_size,
+        "seconds": round(elapsed, 3),
+        "events_per_second": round(len(events) / elapsed, 1) if elapsed else None,
+        "latency": _latency(samples),
+        **totals,
+    }
+
+
+def bench_single(client, events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    samples: List[float] = []
+    statuses: Dict[str, int] = {}
+    started = time.perf_counter()
+    for event in events:
+        t0 = time.perf_counter()
+        response = client.post("/api/events", json=to_json(event))
+        samples.append(time.perf_counter() - t0)
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+    elapsed = time.perf_counter() - started
+    return {
+        "events": len(events),
+        "seconds": round(elapsed, 3),
+        "events_per_second": round(len(events) / elapsed, 1) if elapsed else None,
+        "latency": _latency(samples),
+        "status_codes": statuses,
+    }
+
+
+def metric_queries(app, start: datetime, end: datetime) -> Dict[str, Dict[str, Any]]:
+    """Query parameters for every GET /api/metrics/* route, covering [start, end]."""
+    from fastapi.routing import APIRoute
+
+    from app.services.metrics_service import HEATMAP_MAX_BUCKETS
+
+    queries: Dict[str, Dict[str, Any]] = {}
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or "GET" not in route.methods or not route.path.startswith("/api/metrics"):
+            continue
+        params = {p.name for p in route.dependant.query_params}
+        query: Dict[str, Any] = {}
+        if "start_time" in params:
+            query.update(start_time=start.isoformat(), end_time=end.isoformat())
+        if "bucket_minutes" in params:
+            minutes = (end - start).total_seconds() / 60
+            query["bucket_minutes"] = max(60, math.ceil(minutes / HEATMAP_MAX_BUCKETS))
+        queries[route.path] = query
+    return queries
+
+
+def bench_metrics(client, app, start: datetime, end: datetime, repeats: int) -> Dict[str, Any]:
+    from app.services import cache_service
+
+    results: Dict[str, Any] = {}
+    for path, query in sorted(metric_queries(app, start, end).items()):
+        cold: List[float] = []
+        warm: List[float] = []
+        status = None
+        for _ in range(repeats):
+            cache_service.metrics_cache.clear()
+            t0 = time.perf_counter()
+            response = client.get(path, params=query)
+            cold.append(time.perf_counter() - t0)
+            status = response.status_code
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            client.get(path, params=query)
+            warm.append(time.perf_counter() - t0)
+        results[path] = {"params": query, "status": status, "cold": _latency(cold), "warm": _latency(warm)}
+    return results
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    defaults = FactorySpec()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=defaults.workers)
+    parser.add_argument("--workstations", type=int, default=defaults.workstations)
+    parser.add_argument("--days", type=float, default=defaults.days)
+    parser.add_argument("--events-per-minute", type=float, default=defaults.events_per_minute,
+                        help="State observations per worker per minute")
+    parser.add_argument("--out-of-order-ratio", type=float, default=defaults.out_of_order_ratio)
+    parser.add_argument("--duplicate-ratio", type=float, default=defaults.duplicate_ratio)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--single-events", type=int, default=500, help="Newest events sent one by one")
+    parser.add_argument("--repeats", type=int, default=20, help="Requests per metrics route and mode")
+    parser.add_argument("--output", default="benchmark-report.json")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    spec = FactorySpec(
+        workers=args.workers,
+        workstations=args.workstations,
+        days=args.days,
+        events_per_minute=args.events_per_minute,
+        out_of_order_ratio=args.out_of_order_ratio,
+        duplicate_ratio=args.duplicate_ratio,
+        seed=args.seed,
+    )
+
+    # The engine is created from DATABASE_URL at import, so point it at a scratch file first
+    workdir = tempfile.mkdtemp(prefix="productivity-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    from fastapi.testclient import TestClient
+
+    from app import crud, schemas
+    from app.bootstrap import init_schema
+    from app.database import SessionLocal
+    from app.main import app
+    from app.middleware import limiter
+
+    limiter.enabled = False
+    # Per-request INFO lines would dominate the single-event timings
+    for name in ("app", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    end = datetime.utcnow().replace(microsecond=0)
+    start = end - timedelta(days=spec.days)
+    t0 = time.perf_counter()
+    events = timeline(spec, end)
+    split = max(len(events) - args.single_events, 0)
+    bulk, single = list(delivery_order(spec, events[:split])), events[split:]
+    generate_seconds = time.perf_counter() - t0
+    print(f"Generated {len(events)} events ({len(bulk)} deliveries for batch ingest) in {generate_seconds:.1f}s", file=sys.stderr)
+
+    # Entities exist before startup, so the demo seed is skipped
+    init_schema()
+    db = SessionLocal()
+    try:
+        for row in worker_rows(spec):
+            crud.create_worker(db, schemas.WorkerCreate(**row))
+        for row in workstation_rows(spec):
+            crud.create_workstation(db, schemas.WorkstationCreate(**row))
+    finally:
+        db.close()
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "spec": spec.as_dict(),
+            "events": len(events),
+            "generate_seconds": round(generate_seconds, 3),
+        },
+        "ingest": {},
+        "metrics": {},
+        "memory": {"start": _rss_mb()},
+    }
+
+    with TestClient(app) as client:
+        print("Batch ingest...", file=sys.stderr)
+        report["ingest"]["batch"] = bench_batch(client, bulk, args.batch_size)
+        report["memory"]["after_batch_ingest"] = _rss_mb()
+        print("Single-event ingest...", file=sys.stderr)
+        report["ingest"]["single"] = bench_single(client, single)
+        report["memory"]["after_single_ingest"] = _rss_mb()
+        print("Metrics endpoints...", file=sys.stderr)
+        report["metrics"] = bench_metrics(client, app, start, end, args.repeats)
+        report["memory"]["after_metrics"] = _rss_mb()
+
+    with open(args.output, "w") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Report written to {args.output}", file=sys.stderr)
+    return report
+
+
+if __name__ == "__main__":
+    main()
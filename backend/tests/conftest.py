@@ -0,0 +1,61 @@
+"""
+Shared fixtures for the service behaviour tests.
+
+The application binds its engine to DATABASE_URL when `app.database` is
+imported, so it is pointed at a throwaway SQLite file here, before any test
+module imports the app. `db` hands each test an empty database (schema kept,
+data and in-memory services cleared).
+"""
+
+import os
+import shutil
+import tempfile
+
+DATA_DIR = tempfile.mkdtemp(prefix="productivity-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DATA_DIR, 'test.db')}"
+os.environ["EVENT_ARCHIVE_DIR"] = os.path.join(DATA_DIR, "archive")
+
+from datetime import datetime, timedelta  # noqa: E402
+from typing import List, Optional  # noqa: E402
+
+import pytest  # noqa: E402
+
+from app import schemas  # noqa: E402
+from app.bootstrap import init_schema  # noqa: E402
+from app.database import SessionLocal, engine  # noqa: E402
+from app.seed_data import clear_all_data  # noqa: E402
+from app.services import generator_service  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def schema():
+    init_schema()
+    yield
+    engine.dispose()
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def db(schema):
+    session = SessionLocal()
+    clear_all_data(session)
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def generated_events(db):
+    """
+    make(hours, seed, end): store the workers and workstations of a small
+    generated data set and return its events (not stored), oldest first.
+    """
+    def make(hours: float = 6, seed: int = 1, end: Optional[datetime] = None) -> List[schemas.AIEventCreate]:
+        end = end or datetime.utcnow().replace(second=0, microsecond=0) - timedelta(minutes=1)
+        spec = generator_service.GeneratorSpec(workers=4, workstations=2, hours=hours, seed=seed, end=end)
+        generator_service.ensure_entities(db, spec)
+        db.commit()
+        rows = generator_service.generate_rows(spec, generator_service.worker_ids(spec))
+        events = [schemas.AIEventCreate(**dict(zip(generator_service.EVENT_COLUMNS, row))) for row in rows]
+        return sorted(events, key=lambda e: e.timestamp)
+
+    return make
@@ -0,0 +1,49 @@
+"""
+Admin seeding counts.
+
+A repeated seed must report the events it skipped as duplicates, not as
+created, whichever path (ingest or bulk generator) stored them; the ingest
+path writes one bounded chunk per transaction.
+
+    cd backend && python -m pytest tests/test_admin_seed.py -q
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app import models
+from app.config import settings
+from app.services import events_service, seed_service
+from app.services.generator_service import GeneratorSpec
+
+SPEC = GeneratorSpec(workers=8, workstations=3, hours=6, seed=1, end=datetime(2026, 10, 16, 12))
+
+
+@pytest.mark.parametrize("mode", ["ingest", "bulk"])
+def test_reseeding_reports_duplicates(db, mode):
+    first = seed_service.admin_seed(db, spec=SPEC, mode=mode)
+    stored = db.query(models.AIEvent).count()
+    assert first["events_created"] == stored > 0
+    assert (first["duplicates"], first["errors"]) == (0, 0)
+
+    again = seed_service.admin_seed(db, spec=SPEC, mode=mode)
+    assert (again["events_created"], again["duplicates"], again["errors"]) == (0, stored, 0)
+    assert db.query(models.AIEvent).count() == stored
+
+    cleared = seed_service.admin_seed(db, clear_existing=True, spec=SPEC, mode=mode)
+    assert (cleared["events_created"], cleared["duplicates"]) == (stored, 0)
+
+
+def test_ingest_mode_writes_in_bounded_chunks(db, monkeypatch):
+    monkeypatch.setattr(settings, "ingest_batch_max", 100)
+    sizes = []
+
+    def recording(db, events, record_arrivals=True):
+        sizes.append(len(events))
+        return events_service.ingest_many(db, events, record_arrivals)
+
+    monkeypatch.setattr(seed_service, "ingest_many", recording)
+    result = seed_service.admin_seed(db, spec=SPEC)
+    assert max(sizes) == 100 and len(sizes) > 1
+    assert result["events_created"] == sum(sizes) == db.query(models.AIEvent).count()
@@ -0,0 +1,38 @@
+"""
+Grouped metrics over an exact window.
+
+Without `bucket_minutes`, `aggregate_metrics` must cover exactly
+[start_time, end_time]: per group it sums what the per-worker metrics
+(`/api/metrics/summary`) report for the same window, with nothing from
+before the start or after the end of unaligned edges.
+
+    cd backend && python -m pytest tests/test_aggregate_metrics.py -q
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from app import models
+from app.services import events_service, metrics_service
+
+
+def test_unbucketed_window_matches_worker_metrics(db, generated_events):
+    events = generated_events(hours=6, seed=2)
+    events_service.ingest_many(db, events)
+    # Unaligned edges: the window starts and ends inside minute and hour buckets
+    start = events[0].timestamp + timedelta(hours=1, minutes=17, seconds=23)
+    end = events[-1].timestamp - timedelta(hours=1, minutes=41, seconds=9)
+
+    departments = {w.id: w.department or "Unassigned" for w in db.query(models.Worker)}
+    expected = defaultdict(lambda: [0.0, 0])
+    for metrics in metrics_service.worker_metrics(db, start_time=start, end_time=end):
+        expected[departments[metrics.worker_id]][0] += metrics.total_active_time_hours
+        expected[departments[metrics.worker_id]][1] += metrics.total_units_produced
+
+    result = metrics_service.aggregate_metrics(db, ["department"], start, end)
+    assert result["start"] == start and result["end"] == end
+    actual = {g["group"]["department"]: g for g in result["groups"]}
+    assert set(actual) == set(expected)
+    for department, (hours, units) in expected.items():
+        assert actual[department]["total_units_produced"] == units
+        assert abs(actual[department]["working_hours"] - hours) < 0.02 * len(departments)
@@ -0,0 +1,97 @@
+"""
+Event archive round trip.
+
+Compacting raw events past the retention window into partition files must not
+change any metric (rollups or raw scan) or what the event listing and export
+return; a rollup rebuild afterwards reads the archived events back.
+
+    cd backend && python -m pytest tests/test_archive.py -q
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+import pytest
+
+from app import models
+from app.config import settings
+from app.services import events_service, generator_service, metrics_service, rollup_service
+from app.services.archive_service import EventArchive, archive
+
+END = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+RETENTION_DAYS = 2
+# Oldest hot event once compacted: partitions are whole days
+HORIZON = (END - timedelta(days=RETENTION_DAYS)).replace(hour=0)
+WINDOWS = (
+    (None, END),
+    (HORIZON - timedelta(days=1, minutes=7), HORIZON - timedelta(hours=3)),  # archived only
+    (HORIZON - timedelta(hours=5, minutes=13), HORIZON + timedelta(hours=7)),  # across the horizon
+    (END - timedelta(hours=20), END),  # hot only
+)
+
+
+def observed(db, monkeypatch) -> Dict[Any, Any]:
+    """Metrics of every window from both sources, and the event listings that can reach the archive."""
+    results: Dict[Any, Any] = {}
+    for use_rollups in (True, False):
+        monkeypatch.setattr(settings, "metrics_use_rollups", use_rollups)
+        for start, end in WINDOWS:
+            results[("summary", use_rollups, start, end)] = metrics_service.metrics_summary(db, start, end).model_dump()
+    monkeypatch.setattr(settings, "metrics_use_rollups", True)
+
+    newest = events_service.fetch_events(db, limit=100)
+    results["newest"] = [tuple(row) for row in newest]
+    results["all"] = [tuple(row) for row in events_service.fetch_events(db, limit=100_000)]
+    results["keyset"] = [tuple(row) for row in events_service.fetch_events(db, limit=2000, before=(newest[-1][1], newest[-1][0]))]
+    results["worker"] = [tuple(row) for row in events_service.fetch_events(
+        db, worker_id="W2", start_time=HORIZON - timedelta(days=1), end_time=HORIZON + timedelta(hours=12), chronological=True,
+    )]
+    results["export"] = "".join(events_service.export_events("csv", workstation_id="S1"))
+    return results
+
+
+@pytest.fixture
+def stored(db):
+    spec = generator_service.GeneratorSpec(workers=4, workstations=2, hours=24 * 4, interval_minutes=15, seed=9, end=END)
+    generator_service.bulk_generate(db, spec)
+    return db.query(models.AIEvent).count()
+
+
+def test_compact_round_trip_keeps_metrics_and_events(db, stored, monkeypatch, tmp_path):
+    before = observed(db, monkeypatch)
+    monkeypatch.setattr(settings, "event_retention_days", RETENTION_DAYS)
+    monkeypatch.setattr(settings, "event_archive_dir", str(tmp_path))
+
+    result = archive.compact(db, now=END)
+    assert result["partitions"] >= 2
+    assert db.query(models.AIEvent).count() == stored - result["events"]
+    assert archive.horizon(db) == HORIZON
+    after = observed(db, monkeypatch)
+    assert [k for k in before if before[k] != after[k]] == []
+
+    rollup_service.rebuild(db)  # from the archive plus the hot rows
+    assert [k for k in before if before[k] != observed(db, monkeypatch)[k]] == []
+
+    assert archive.compact(db, now=END) == {"partitions": 0, "events": 0}
+
+
+def test_rearchived_partition_is_a_new_file_seen_by_other_processes(db, stored, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "event_retention_days", RETENTION_DAYS)
+    monkeypatch.setattr(settings, "event_archive_dir", str(tmp_path))
+    archive.compact(db, now=END)
+    other = EventArchive()  # another worker process's copy of the manifest
+    day = HORIZON - timedelta(days=1)
+    before = other.rows(db, day, HORIZON, inclusive=False)
+    old_path = db.get(models.EventPartition, day).path
+
+    # A row that reached the table after its partition was archived
+    late = datetime.combine(day.date(), datetime.min.time()) + timedelta(hours=5, seconds=31)
+    db.add(models.AIEvent(timestamp=late, worker_id="W1", workstation_id="S1", event_type="idle", confidence=0.9, count=0))
+    db.commit()
+    assert archive.compact(db, now=END) == {"partitions": 1, "events": 1}
+
+    new_path = db.get(models.EventPartition, day).path
+    assert new_path != old_path and os.path.exists(new_path) and not os.path.exists(old_path)
+    after = other.rows(db, day, HORIZON, inclusive=False)
+    assert len(after) == len(before) + 1 and late in {row.timestamp for row in after}
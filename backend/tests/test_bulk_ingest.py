@@ -0,0 +1,69 @@
+"""
+Streaming bulk ingestion: per-chunk outcomes.
+
+Every chunk entry must list exactly the errors it counts, each naming the NDJSON
+line (or MessagePack record) it came from, whether the record failed to decode,
+to validate, or to be stored.
+
+    cd backend && python -m pytest tests/test_bulk_ingest.py -q
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from app.config import settings
+from app.services import bulk_ingest_service, events_service
+
+
+def ingest(db, body: bytes, fmt: str, piece: int = 7):
+    async def chunks():
+        for i in range(0, len(body), piece):  # arrives in small pieces, split mid-record
+            yield body[i:i + piece]
+
+    async def ingest_chunk(events):
+        return await events_service.ingest_many_async(db, events)
+
+    return asyncio.run(bulk_ingest_service.ingest_stream(chunks(), fmt, ingest_chunk))
+
+
+@pytest.fixture
+def records(generated_events):
+    events = generated_events(hours=1, seed=10)
+    good = [e.model_dump(mode="json") for e in events[:3]]
+    return [
+        good[0],
+        good[1],
+        dict(good[2], worker_id="W404"),  # unknown worker: fails to store
+        dict(good[2], confidence=2),  # fails to validate
+        good[0],  # duplicate
+        good[2],
+    ]
+
+
+def test_ndjson_chunk_errors_carry_line_numbers(db, records, monkeypatch):
+    monkeypatch.setattr(settings, "ingest_stream_chunk", 3)
+    lines = [json.dumps(r) for r in records]
+    lines.insert(2, "")  # blank line 3 is skipped but still counted
+    lines.insert(4, "{not json")  # line 5
+    result = ingest(db, ("\n".join(lines) + "\n").encode(), "ndjson")
+
+    assert (result.success_count, result.duplicate_count, result.error_count) == (3, 1, 3)
+    for chunk in result.chunks:
+        assert chunk.error_count == len(chunk.errors)
+    assert [error.split(":")[0] for chunk in result.chunks for error in chunk.errors] == ["line 4", "line 5", "line 6"]
+    assert "W404" in result.chunks[0].errors[0]
+    assert "confidence" in result.chunks[1].errors[1]
+    assert result.errors == [error for chunk in result.chunks for error in chunk.errors]
+
+
+def test_msgpack_chunk_errors_carry_record_numbers(db, records, monkeypatch):
+    msgpack = pytest.importorskip("msgpack")
+    monkeypatch.setattr(settings, "ingest_stream_chunk", 2)
+    body = b"".join(msgpack.packb(r) for r in records)
+    result = ingest(db, body, "msgpack")
+
+    assert (result.success_count, result.duplicate_count, result.error_count) == (3, 1, 2)
+    assert [chunk.error_count for chunk in result.chunks] == [len(chunk.errors) for chunk in result.chunks] == [0, 2, 0]
+    assert [error.split(":")[0] for error in result.chunks[1].errors] == ["record 3", "record 4"]
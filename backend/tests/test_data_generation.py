@@ -0,0 +1,37 @@
+"""
+Shared data generation.
+
+Ingest transactions only mark themselves as changing data; the shared
+`data_generation` row is incremented after they commit, in a transaction of
+its own, so no writer holds its lock for the length of an ingest.
+
+    cd backend && python -m pytest tests/test_data_generation.py -q
+"""
+
+from sqlalchemy import select
+
+from app import models
+from app.database import engine
+from app.services import cache_service, events_service
+
+
+GENERATION = select(models.DataGeneration.generation).where(models.DataGeneration.id == 1)
+
+
+def shared_generation() -> int:
+    with engine.connect() as connection:
+        return connection.scalar(GENERATION)
+
+
+def test_generation_moves_after_the_commit_only(db, generated_events):
+    events = generated_events(hours=1)
+    before = shared_generation()
+
+    cache_service.bump_generation(db)
+    assert db.scalar(GENERATION) == before  # the row is not written (nor locked) inside the transaction
+    db.rollback()
+    assert shared_generation() == before
+
+    events_service.ingest_many(db, events)
+    assert shared_generation() == before + 1
+    assert cache_service.current_generation() == before + 1  # this process sees it at once
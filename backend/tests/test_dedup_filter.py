@@ -0,0 +1,86 @@
+"""
+Recent dedup-key filter.
+
+The filter answers SEEN for keys it knows are stored, NEW for keys it knows
+are not, and MAYBE when only the database can tell; ingestion must report the
+same outcome (created / duplicate) whichever answer it got.
+
+    cd backend && python -m pytest tests/test_dedup_filter.py -q
+"""
+
+from datetime import timedelta
+
+from app import crud, models
+from app.config import settings
+from app.database import engine
+from app.services import dedup_service, events_service, generator_service
+from app.services.dedup_service import recent_keys
+
+
+def key(event):
+    return crud.event_key(event.timestamp, event.worker_id, event.event_type)
+
+
+def unstored(event):
+    """A key next to `event`'s that is never stored (generated events fall on whole minutes)."""
+    return crud.event_key(event.timestamp + timedelta(seconds=1), event.worker_id, event.event_type)
+
+
+def check(db, *keys):
+    statuses = recent_keys.check(db, keys)
+    return [statuses[k] for k in keys]
+
+
+def test_recent_stored_keys_are_seen_and_others_new(db, generated_events):
+    events = generated_events(hours=1, seed=6)
+    events_service.ingest_many(db, events)
+    newest = events[-1]
+    assert check(db, key(newest), unstored(newest)) == [dedup_service.SEEN, dedup_service.NEW]
+
+
+def test_older_stored_keys_are_maybe_and_still_duplicates(db, generated_events):
+    events = generated_events(hours=1, seed=6)
+    events_service.ingest_many(db, events)
+    oldest = events[0]  # an hour behind the newest: past the exact window, in the Bloom filter
+    assert oldest.timestamp < events[-1].timestamp - timedelta(minutes=settings.dedup_recent_minutes)
+    assert check(db, key(oldest), unstored(oldest)) == [dedup_service.MAYBE, dedup_service.NEW]
+
+    false_positives = recent_keys.false_positives
+    assert events_service.ingest_many(db, [oldest])[0]["status"] == "duplicate"
+    assert recent_keys.false_positives == false_positives
+
+
+def test_keys_below_the_preload_floor_are_maybe(db, generated_events, monkeypatch):
+    events = generated_events(hours=1, seed=7)
+    events_service.ingest_many(db, events)
+    monkeypatch.setattr(settings, "dedup_preload_keys", 5)
+    recent_keys.reset()  # reload from the 5 newest stored keys, as a restarted process would
+
+    oldest, newest = events[0], events[-1]
+    assert check(db, unstored(oldest), key(oldest), key(newest)) == [
+        dedup_service.MAYBE, dedup_service.MAYBE, dedup_service.SEEN,
+    ]
+    false_positives = recent_keys.false_positives
+    assert events_service.ingest_many(db, [oldest])[0]["status"] == "duplicate"
+    created = events_service.ingest_many(db, [oldest.model_copy(update={"timestamp": oldest.timestamp + timedelta(seconds=1)})])
+    assert created[0]["status"] == "created"
+    assert recent_keys.false_positives == false_positives + 1  # the lookup for the MAYBE found nothing
+
+
+def test_disabled_filter_answers_maybe(db, generated_events, monkeypatch):
+    events = generated_events(hours=1, seed=6)
+    events_service.ingest_many(db, events)
+    monkeypatch.setattr(settings, "dedup_filter_enabled", False)
+    assert check(db, key(events[-1]), unstored(events[-1])) == [dedup_service.MAYBE, dedup_service.MAYBE]
+
+
+def test_new_answer_for_a_key_stored_elsewhere_is_a_duplicate(db, generated_events):
+    events = generated_events(hours=1, seed=8)
+    events_service.ingest_many(db, events[:-1])
+    last = events[-1]
+    with engine.connect() as connection:  # another process: this filter never learns the key
+        generator_service.write_rows(connection, iter([tuple(getattr(last, c) for c in generator_service.EVENT_COLUMNS)]))
+    assert check(db, key(last)) == [dedup_service.NEW]
+
+    assert events_service.ingest_many(db, [last])[0]["status"] == "duplicate"
+    assert db.query(models.AIEvent).count() == len(events)
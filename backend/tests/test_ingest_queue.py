@@ -0,0 +1,108 @@
+"""
+Write-behind ingest queue, through the API, in both acknowledgement modes.
+
+- INGEST_ACK=commit: each request gets its own outcome once its group commit
+  is written (created / duplicate / error)
+- INGEST_ACK=enqueue: requests are answered 202 once queued; the writer stores
+  them on its next flush (at the latest on shutdown) and only logs errors
+
+    cd backend && python -m pytest tests/test_ingest_queue.py -q
+"""
+
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models, schemas
+from app.config import settings
+from app.main import app
+from app.services import events_service
+
+
+def payload(event: schemas.AIEventCreate) -> dict:
+    return event.model_dump(mode="json")
+
+
+def unknown_worker(event: schemas.AIEventCreate) -> schemas.AIEventCreate:
+    return event.model_copy(update={"worker_id": "W404"})
+
+
+@pytest.fixture
+def events(generated_events):
+    return generated_events(hours=1, seed=2)[:10]
+
+
+@pytest.fixture
+def start_client(db, monkeypatch):
+    """Start the app (lifespan included) with the queue on and the given ack mode."""
+    monkeypatch.setattr(settings, "seed_on_startup", False)
+    monkeypatch.setattr(settings, "scheduler_backend", "off")
+    monkeypatch.setattr(settings, "ingest_queue_enabled", True)
+
+    def start(ack: str) -> TestClient:
+        monkeypatch.setattr(settings, "ingest_ack", ack)
+        return TestClient(app)
+
+    return start
+
+
+def test_commit_ack_reports_each_outcome(db, events, start_client):
+    with start_client("commit") as client:
+        response = client.post("/api/events/batch", json={"events": [payload(events[0])]})
+        assert response.status_code == 200
+        assert response.json()["success_count"] == 1
+
+        batch = [events[1], events[0], events[1], unknown_worker(events[2])]  # new, stored, repeated, unknown
+        response = client.post("/api/events/batch", json={"events": [payload(e) for e in batch]})
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["success_count"], body["duplicate_count"], body["error_count"]) == (1, 2, 1)
+        assert len(body["errors"]) == 1 and "W404" in body["errors"][0]
+
+        response = client.post("/api/events", json=payload(events[0]))
+        assert response.status_code == 201
+        stored = db.query(models.AIEvent).filter_by(
+            timestamp=events[0].timestamp, worker_id=events[0].worker_id, event_type=events[0].event_type
+        ).one()
+        assert response.json()["id"] == stored.id  # a duplicate answers with the stored row
+
+        response = client.post("/api/events", json=payload(unknown_worker(events[3])))
+        assert response.status_code == 404
+
+    assert db.query(models.AIEvent).count() == 2
+
+
+def test_commit_ack_reports_storage_errors(db, events, start_client, monkeypatch):
+    async def failing(db, events):
+        raise RuntimeError("disk I/O error")
+
+    monkeypatch.setattr(events_service, "ingest_many_async", failing)
+    with start_client("commit") as client:
+        response = client.post("/api/events/batch", json={"events": [payload(e) for e in events[:3]]})
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["success_count"], body["error_count"]) == (0, 3)
+        assert all("disk I/O error" in error for error in body["errors"])
+
+        response = client.post("/api/events", json=payload(events[3]))
+        assert response.status_code == 500
+
+
+def test_enqueue_ack_answers_before_the_write(db, events, start_client, caplog):
+    batch = [events[0], events[1], events[0], unknown_worker(events[2])]
+    with caplog.at_level(logging.WARNING, logger="app.services.queue_service"):
+        with start_client("enqueue") as client:
+            response = client.post("/api/events/batch", json={"events": [payload(e) for e in batch]})
+            assert response.status_code == 202
+            assert response.json()["queued"] == 4
+
+            response = client.post("/api/events", json=payload(events[1]))
+            assert response.status_code == 202
+            assert response.json()["queued"] == 1
+        # Shutdown flushed the queue
+
+    stored = {(e.timestamp, e.worker_id, e.event_type) for e in db.query(models.AIEvent)}
+    assert stored == {(e.timestamp, e.worker_id, e.event_type) for e in events[:2]}
+    dropped = [r.getMessage() for r in caplog.records if "Queued event dropped" in r.getMessage()]
+    assert len(dropped) == 1 and "W404" in dropped[0]
@@ -0,0 +1,201 @@
+"""
+Query-plan regression tests.
+
+Each hot query is captured by running the real crud / service function against a
+small SQLite database built from the models, then checked with EXPLAIN QUERY PLAN:
+no event or rollup table may be read by a full table scan, and the queries the
+index set was designed around must use their index.
+
+    cd backend && python -m pytest tests/test_query_plans.py -q
+"""
+
+import contextlib
+import re
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from app.services import generator_service, metrics_service, rollup_service
+
+# Recent, so the window falls inside the minute and hour rollup horizons
+END = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+START = END - timedelta(hours=5, minutes=7)
+WINDOW_END = END - timedelta(hours=1, minutes=3)
+
+# Fact tables that must never be read row by row from the table itself
+FACT_TABLES = ("ai_events", "state_rollups_minute", "state_rollups_hour", "state_rollups_day")
+TABLE_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+# Whole result sorted after the fact (an ordered index would stop early instead)
+FULL_SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+
+@pytest.fixture(scope="module")
+def db(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    models.Base.metadata.create_all(engine)
+    session = Session(engine)
+    spec = generator_service.GeneratorSpec(workers=8, workstations=4, hours=12, seed=1, end=END)
+    generator_service.ensure_entities(session, spec)
+    with engine.connect() as connection:
+        generator_service.write_rows(connection, generator_service.generate_rows(spec, generator_service.worker_ids(spec)))
+    rollup_service.rebuild(session)
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@contextlib.contextmanager
+def captured(engine):
+    """Collect (statement, parameters) of every SELECT executed inside the block."""
+    statements: List[Tuple[str, object]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def query_plans(db: Session, run: Callable[[Session], object]) -> List[List[str]]:
+    """EXPLAIN QUERY PLAN detail lines of each SELECT that `run` issues."""
+    engine = db.get_bind()
+    with captured(engine) as statements:
+        run(db)
+    assert statements, "the function issued no SELECT"
+    with engine.connect() as connection:
+        return [
+            [row[3] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+            for statement, parameters in statements
+        ]
+
+
+def assert_no_table_scan(plans: List[List[str]]) -> None:
+    for plan in plans:
+        for line in plan:
+            match = TABLE_SCAN.match(line)
+            assert not (match and match.group(1) in FACT_TABLES), f"full table scan: {line}\n" + "\n".join(plan)
+
+
+def uses(plans: List[List[str]], fragment: str) -> bool:
+    return any(fragment in line for plan in plans for line in plan)
+
+
+NEW_EVENT = schemas.AIEventCreate(
+    timestamp=START, worker_id="W1", workstation_id="S1", event_type="working", confidence=0.9, count=1
+)
+
+# name -> (query, fragment its plan must contain)
+HOT_QUERIES: Dict[str, Tuple[Callable[[Session], object], str]] = {
+    "events_newest_page": (lambda db: crud.get_events(db, limit=100), "USING INDEX uix_event_dedup_worker_type"),
+    "events_keyset_page": (
+        lambda db: crud.get_events(db, limit=100, before=(START, 50)),
+        "SEARCH ai_events USING INDEX uix_event_dedup_worker_type (timestamp<?)",
+    ),
+    "events_rows_page": (
+        lambda db: crud.get_event_rows(db, limit=100, before=(START, 50)),
+        "SEARCH ai_events USING INDEX uix_event_dedup_worker_type (timestamp<?)",
+    ),
+    "events_by_worker": (
+        lambda db: crud.get_events(db, "W1", None, START, WINDOW_END),
+        "SEARCH ai_events USING INDEX idx_worker_timeline (worker_id=? AND timestamp>? AND timestamp<?)",
+    ),
+    "events_by_workstation": (
+        lambda db: crud.get_events(db, None, "S1"), "SEARCH ai_events USING INDEX idx_workstation_timeline",
+    ),
+    "event_by_identity": (
+        lambda db: crud.get_event_by_identity(db, START, "W1", "working"),
+        "(timestamp=? AND worker_id=? AND event_type=?)",
+    ),
+    "batch_duplicate_lookup": (
+        lambda db: crud.get_existing_event_keys(db, [NEW_EVENT]),
+        "SEARCH ai_events USING COVERING INDEX idx_worker_timeline",
+    ),
+    "dedup_preload": (lambda db: list(crud.get_recent_event_keys(db, 100)), "USING COVERING INDEX"),
+    "export_range": (
+        lambda db: list(crud.stream_event_rows(db, None, None, START, WINDOW_END)),
+        "SEARCH ai_events USING INDEX uix_event_dedup_worker_type (timestamp>? AND timestamp<?)",
+    ),
+    "export_by_worker": (
+        lambda db: list(crud.stream_event_rows(db, "W2", None, START, WINDOW_END)),
+        "SEARCH ai_events USING INDEX idx_worker_timeline",
+    ),
+    "model_health_overall": (lambda db: crud.get_recent_confidences(db, None, 100), "USING INDEX"),
+    "model_health_per_worker": (
+        lambda db: crud.get_recent_confidences(db, "worker_id", 100), "USING INDEX idx_worker_timeline",
+    ),
+    "model_health_per_workstation": (
+        lambda db: crud.get_recent_confidences(db, "workstation_id", 100), "USING INDEX idx_workstation_timeline",
+    ),
+    "rollup_window": (
+        lambda db: rollup_service.window_totals(db, ("worker", "workstation"), START, WINDOW_END),
+        "SEARCH state_rollups_minute USING INDEX idx_state_rollups_minute_bucket",
+    ),
+    "rollup_window_one_worker": (
+        lambda db: rollup_service.window_totals(db, ("worker",), START, WINDOW_END, "W1"),
+        "SEARCH ai_events USING COVERING INDEX idx_worker_timeline (worker_id=? AND timestamp>? AND timestamp<?)",
+    ),
+    "rollup_span": (
+        lambda db: rollup_service._span_rows(db, models.AIEvent.worker_id, "W1", START, WINDOW_END),
+        "SEARCH ai_events USING COVERING INDEX idx_worker_timeline",
+    ),
+    "late_event_neighbours": (
+        lambda db: rollup_service._neighbour_spans(db, models.AIEvent.worker_id, "W1", [START, START + timedelta(minutes=1)], END),
+        "SEARCH ai_events USING COVERING INDEX idx_worker_timeline",
+    ),
+    "raw_metrics_scan": (
+        lambda db: metrics_service.scan_window_totals(db, ("worker", "workstation"), None, START, WINDOW_END, WINDOW_END),
+        "SEARCH ai_events USING INDEX uix_event_dedup_worker_type (timestamp>? AND timestamp<?)",
+    ),
+    "raw_metrics_scan_one_worker": (
+        lambda db: metrics_service.scan_window_totals(db, ("worker",), "W1", START, WINDOW_END, WINDOW_END),
+        "SEARCH ai_events USING COVERING INDEX idx_worker_timeline",
+    ),
+    "aggregate_by_department_shift": (
+        lambda db: metrics_service.aggregate_metrics(db, ["department", "shift"], START, WINDOW_END),
+        "SEARCH state_rollups_hour USING INDEX idx_state_rollups_hour_bucket",
+    ),
+    "aggregate_by_location_bucketed": (
+        lambda db: metrics_service.aggregate_metrics(db, ["location"], START, WINDOW_END, 60),
+        "SEARCH state_rollups_hour USING INDEX idx_state_rollups_hour_bucket",
+    ),
+    "heatmap": (
+        lambda db: metrics_service.get_efficiency_heatmap(db, START, WINDOW_END, 60, "location"),
+        "SEARCH state_rollups_hour USING INDEX idx_state_rollups_hour_bucket",
+    ),
+}
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_avoids_table_scans(db, name):
+    run, _ = HOT_QUERIES[name]
+    assert_no_table_scan(query_plans(db, run))
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_its_index(db, name):
+    run, fragment = HOT_QUERIES[name]
+    plans = query_plans(db, run)
+    # SQLite names the dedup constraint's index sqlite_autoindex_<table>_<n>
+    plans = [[re.sub(r"sqlite_autoindex_ai_events_\d+", "uix_event_dedup_worker_type", line) for line in plan] for plan in plans]
+    assert uses(plans, fragment), f"expected {fragment!r} in:\n" + "\n\n".join("\n".join(plan) for plan in plans)
+
+
+@pytest.mark.parametrize("name", ["events_newest_page", "events_keyset_page", "events_rows_page", "events_by_worker", "export_range"])
+def test_event_pages_are_not_fully_sorted(db, name):
+    run, _ = HOT_QUERIES[name]
+    for plan in query_plans(db, run):
+        assert FULL_SORT not in plan, "\n".join(plan)
+
+
+def test_event_indexes_are_the_designed_set(db):
+    names = {index.name for index in models.AIEvent.__table__.indexes}
+    assert names == {"idx_worker_timeline", "idx_workstation_timeline"}
+    assert not names & set(models.RETIRED_INDEXES["ai_events"])
@@ -0,0 +1,64 @@
+"""
+Consistent window reads.
+
+`read_snapshot` must see one database state for its whole duration without
+holding up ingestion: an event committed while a snapshot is open is stored
+at once, stays invisible to that snapshot, and is visible to the next one.
+
+    cd backend && python -m pytest tests/test_read_snapshot.py -q
+"""
+
+import threading
+import time
+
+from app import models
+from app.database import SessionLocal, engine, read_snapshot
+from app.services import events_service, rollup_service
+
+
+def totals(db, start, end):
+    return {
+        worker: (t.seconds, t.units, t.first_seen, t.last_seen)
+        for worker, t in rollup_service._window_totals(db, ("worker",), start, end, None)["worker"].items()
+    }
+
+
+def test_ingest_commits_while_a_snapshot_is_open(db, generated_events):
+    events = generated_events(hours=1, seed=11)
+    events_service.ingest_many(db, events[:-5])
+    start, end = events[0].timestamp, events[-1].timestamp
+    stored = db.query(models.AIEvent).count()
+
+    with read_snapshot(db) as snapshot:
+        assert snapshot.query(models.AIEvent).count() == stored
+        before = totals(snapshot, start, end)
+
+        outcome = {}
+
+        def ingest() -> None:
+            writer = SessionLocal()
+            try:
+                started = time.perf_counter()
+                outcome["results"] = events_service.ingest_many(writer, events[-5:])
+                outcome["seconds"] = time.perf_counter() - started
+            finally:
+                writer.close()
+
+        thread = threading.Thread(target=ingest)
+        thread.start()
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+        assert [r["status"] for r in outcome["results"]] == ["created"] * 5
+        assert outcome["seconds"] < 1  # not waiting for the reader's lock
+
+        assert snapshot.query(models.AIEvent).count() == stored
+        assert totals(snapshot, start, end) == before
+
+    db.expire_all()
+    assert db.query(models.AIEvent).count() == stored + 5
+    assert totals(db, start, end) != before
+
+
+def test_sqlite_database_uses_the_write_ahead_log(schema):
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
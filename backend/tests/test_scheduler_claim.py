@@ -0,0 +1,87 @@
+"""
+Scheduler job leases.
+
+`claim` is a conditional UPDATE: only one runner may hold a job until its
+lease runs out, however many API processes or Celery workers try at once.
+
+    cd backend && python -m pytest tests/test_scheduler_claim.py -q
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.services import scheduler_service
+
+JOB = "summaries"
+
+
+@pytest.fixture
+def now(db):
+    """Every job registered, due and unleased."""
+    scheduler_service.ensure_jobs(db)
+    now = datetime.utcnow()
+    db.execute(update(models.ScheduledJob).values(next_run_at=now - timedelta(seconds=1), leased_until=None, leased_by=None))
+    db.commit()
+    return now
+
+
+def leased_by(db, name: str = JOB):
+    db.expire_all()
+    return db.get(models.ScheduledJob, name).leased_by
+
+
+def test_claim_refuses_a_leased_job(db, now):
+    assert scheduler_service.claim(db, JOB, "runner-a", now)
+    assert not scheduler_service.claim(db, JOB, "runner-b", now + timedelta(seconds=1))
+    assert not scheduler_service.claim(db, JOB, "runner-b", now + timedelta(seconds=1), due_only=False)
+    assert not scheduler_service.claim(db, JOB, "runner-a", now + timedelta(seconds=1))  # not even its holder
+    assert leased_by(db) == "runner-a"
+
+
+def test_expired_lease_can_be_claimed(db, now):
+    assert scheduler_service.claim(db, JOB, "runner-a", now)
+    later = now + timedelta(seconds=settings.scheduler_lease_seconds + 1)  # runner-a crashed
+    assert scheduler_service.claim(db, JOB, "runner-b", later)
+    assert leased_by(db) == "runner-b"
+
+
+def test_claim_refuses_a_job_that_is_not_due(db, now):
+    db.execute(update(models.ScheduledJob).where(models.ScheduledJob.name == JOB).values(next_run_at=now + timedelta(minutes=5)))
+    db.commit()
+    assert not scheduler_service.claim(db, JOB, "runner-a", now)
+    assert scheduler_service.claim(db, JOB, "runner-a", now, due_only=False)
+
+
+def test_run_job_reports_busy_while_leased(db, now):
+    assert scheduler_service.claim(db, JOB, "runner-a", datetime.utcnow())
+    assert scheduler_service.run_job(JOB, "runner-b") == {"job": JOB, "status": "busy"}
+    assert leased_by(db) == "runner-a"
+
+
+def test_concurrent_claims_lease_once(db, now):
+    runners = 8
+    barrier = threading.Barrier(runners)
+    claimed = []
+
+    def run(owner: str) -> None:
+        session = SessionLocal()
+        try:
+            barrier.wait()
+            if scheduler_service.claim(session, JOB, owner, now):
+                claimed.append(owner)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=run, args=(f"runner-{i}",)) for i in range(runners)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(claimed) == 1
+    assert leased_by(db) == claimed[0]
@@ -0,0 +1,52 @@
+"""
+Live stream cursor with out-of-order commits.
+
+Ids are taken at insert, so a smaller id can commit after a larger one has
+been streamed (PostgreSQL sequences). The broadcaster re-reads ids within
+its overlap window: the late event is sent once, and nothing is sent twice.
+
+    cd backend && python -m pytest tests/test_stream_overlap.py -q
+"""
+
+import asyncio
+import json
+
+from app import crud, models
+from app.services import cache_service, stream_service
+
+
+def commit_with_id(db, event, event_id: int) -> None:
+    db.add(models.AIEvent(id=event_id, **event.model_dump()))
+    cache_service.bump_generation(db)
+    db.commit()
+
+
+def streamed_ids(subscriber) -> list:
+    ids = []
+    while not subscriber.queue.empty():
+        message = subscriber.queue.get_nowait()
+        if message.startswith("event: events"):
+            ids.extend(e["id"] for e in json.loads(message.split("data: ", 1)[1]))
+    return ids
+
+
+def test_late_smaller_id_is_streamed_once(db, generated_events):
+    events = generated_events(hours=1, seed=5)
+    crud.bulk_create_ai_events(db, events[:-3])
+    db.commit()
+    top = crud.get_max_event_id(db)
+    late, high, next_ = events[-3:]
+
+    async def run() -> list:
+        broadcaster = stream_service.Broadcaster()
+        subscriber = await broadcaster.connect()
+        broadcaster._task.cancel()  # ticks are driven by hand below
+        streamed_ids(subscriber)  # initial state
+        ticks = []
+        for event, event_id in ((high, top + 2), (late, top + 1), (next_, top + 3)):
+            commit_with_id(db, event, event_id)
+            await broadcaster._tick()
+            ticks.append(streamed_ids(subscriber))
+        return ticks
+
+    assert asyncio.run(run()) == [[top + 2], [top + 1], [top + 3]]
@@ -11,8 +11,8 @@ import {
     Tooltip
 } from "chart.js";
 import { Bar } from "react-chartjs-2";
-import { adminSeed, getEvents, getFactoryMetrics, getWorkerMetrics, getWorkstationMetrics, seedDatabase } from "./services/api";
-import { AIEvent, FactoryMetrics, WorkerMetrics, WorkstationMetrics } from "./types";
+import { adminSeed, getEvents, getMetricsSummary, openLiveStream, seedDatabase } from "./services/api";
+import { AIEvent, FactoryMetrics, MetricsSummary, WorkerMetrics, WorkstationMetrics } from "./types";
 
 ChartJS.register(CategoryScale, LinearScale, BarElement, PointElement, LineElement, Tooltip, Legend);
 
@@ -25,6 +25,16 @@ const eventTone: Record<string, string> = {
 
 const formatNumber = (value: number, digits = 0) => value.toLocaleString(undefined, { maximumFractionDigits: digits, minimumFractionDigits: digits });
 const formatTime = (value?: string | null) => (value ? new Date(value).toLocaleString() : "–");
+const FEED_SIZE = 60;
+
+// Merge streamed event deltas into the feed: newest first, no duplicates
+const mergeEvents = (current: AIEvent[], incoming: AIEvent[]) => {
+    const byId = new Map(current.map(e => [e.id, e]));
+    incoming.forEach(e => byId.set(e.id, e));
+    return Array.from(byId.values())
+        .sort((a, b) => new Date(b.timestamp).getTime() - new Date(a.timestamp).getTime())
+        .slice(0, FEED_SIZE);
+};
 
 function App() {
     const [factory, setFactory] = useState<FactoryMetrics | null>(null);
@@ -45,16 +55,12 @@ function App() {
         }
         setError(null);
         try {
-            const [factoryRes, workersRes, workstationsRes, eventsRes] = await Promise.all([
-                getFactoryMetrics(),
-                getWorkerMetrics(),
-                getWorkstationMetrics(),
-                getEvents(60)
-            ]);
-
-            setFactory(factoryRes.data);
-            setWorkers(workersRes.data);
-            setWorkstations(workstationsRes.data);
+            // One summary request shares a single metrics pass on the backend
+            const [summaryRes, eventsRes] = await Promise.all([getMetricsSummary(), getEvents(FEED_SIZE)]);
+
+            setFactory(summaryRes.data.factory);
+            setWorkers(summaryRes.data.workers);
+            setWorkstations(summaryRes.data.workstations);
             setEvents(eventsRes.data);
         } catch (err) {
             console.error(err);
@@ -67,14 +73,41 @@ function App() {
     }, []);
 
     useEffect(() => {
-        loadData(false);
-
-        // Auto-refresh every 5 seconds for real-time dashboard feel
-        const interval = setInterval(() => {
-            loadData(true); // Pass true to indicate this is a refresh
-        }, 5000); // 5 seconds
+        let interval: ReturnType<typeof setInterval> | null = null;
+
+        // Fallback: auto-refresh every 5 seconds when the live stream is unavailable
+        const startPolling = () => {
+            if (interval) return;
+            loadData(true);
+            interval = setInterval(() => {
+                loadData(true); // Pass true to indicate this is a refresh
+            }, 5000); // 5 seconds
+        };
+
+        // Live stream: the server pushes a snapshot when metrics change and only new events
+        const source = openLiveStream(
+            (summary: MetricsSummary) => {
+                setFactory(summary.factory);
+                setWorkers(summary.workers);
+                setWorkstations(summary.workstations);
+                setError(null);
+                setLoading(false);
+            },
+            (incoming: AIEvent[]) => setEvents(current => mergeEvents(current, incoming)),
+            () => {
+                source?.close();
+                startPolling();
+            }
+        );
+        if (!source) {
+            loadData(false);
+            startPolling();
+        }
 
-        return () => clearInterval(interval);
+        return () => {
+            source?.close();
+            if (interval) clearInterval(interval);
+        };
     }, [loadData]);
 
     const handleSeed = useCallback(async (clearExisting = false) => {
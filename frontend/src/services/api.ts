@@ -1,5 +1,5 @@
 import axios from "axios";
-import { AIEvent, FactoryMetrics, SeedResponse, WorkerMetrics, WorkstationMetrics } from "../types";
+import { AIEvent, FactoryMetrics, MetricsSummary, SeedResponse, WorkerMetrics, WorkstationMetrics } from "../types";
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || "http://localhost:8000";
 
@@ -13,6 +13,7 @@ export const api = axios.create({
 export const getFactoryMetrics = () => api.get<FactoryMetrics>("/api/metrics/factory");
 export const getWorkerMetrics = () => api.get<WorkerMetrics[]>("/api/metrics/workers");
 export const getWorkstationMetrics = () => api.get<WorkstationMetrics[]>("/api/metrics/workstations");
+export const getMetricsSummary = () => api.get<MetricsSummary>("/api/metrics/summary");
 export const getEvents = (limit = 40) => api.get<AIEvent[]>("/api/events", { params: { limit } });
 export const seedDatabase = (clearExisting = false, hoursBack = 24) =>
     api.post<SeedResponse>("/api/seed", undefined, { params: { clear_existing: clearExisting, hours_back: hoursBack } });
@@ -20,4 +21,27 @@ export const seedDatabase = (clearExisting = false, hoursBack = 24) =>
 export const adminSeed = (clearExisting = false) =>
     api.post<SeedResponse>("/api/admin/seed", undefined, { params: { clear_existing: clearExisting } });
 
+/**
+ * Subscribe to the server-sent live stream. Returns null when EventSource is unavailable;
+ * `onClosed` fires when the server refuses the stream (the browser will not reconnect).
+ */
+export const openLiveStream = (
+    onSnapshot: (summary: MetricsSummary) => void,
+    onEvents: (events: AIEvent[]) => void,
+    onClosed: () => void
+): EventSource | null => {
+    if (typeof EventSource === "undefined") {
+        return null;
+    }
+    const source = new EventSource(`${API_BASE_URL}/api/stream`);
+    source.addEventListener("snapshot", (msg) => onSnapshot(JSON.parse((msg as MessageEvent).data)));
+    source.addEventListener("events", (msg) => onEvents(JSON.parse((msg as MessageEvent).data)));
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+            onClosed();
+        }
+    };
+    return source;
+};
+
 export type ApiClient = typeof api;
@@ -43,6 +43,12 @@ export interface FactoryMetrics {
     time_range_end: string | null;
 }
 
+export interface MetricsSummary {
+    factory: FactoryMetrics;
+    workers: WorkerMetrics[];
+    workstations: WorkstationMetrics[];
+}
+
 export interface SeedResponse {
     message: string;
     workers_created: number;